@@ -0,0 +1,196 @@
+# backend/admission.py
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+from collections import Counter, deque
+
+# Lower value = served first.
+INTERACTIVE = 0
+STANDARD = 1
+BULK = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", STANDARD: "standard", BULK: "bulk"}
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_MAX_QUEUE_DEPTH = int(os.getenv("LLM_MAX_QUEUE_DEPTH", "200"))
+LLM_MAX_QUEUE_WAIT_SECONDS = float(os.getenv("LLM_MAX_QUEUE_WAIT_SECONDS", "10"))
+LLM_USER_BURST = float(os.getenv("LLM_USER_BURST", "10"))
+LLM_USER_CALLS_PER_MINUTE = float(os.getenv("LLM_USER_CALLS_PER_MINUTE", "20"))
+MAX_TRACKED_USERS = 10000
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+
+    def try_take(self, cost: float) -> float:
+        """Take `cost` tokens; returns 0 on success, otherwise the seconds until they are available."""
+        now = time.monotonic()
+        self._refill(now)
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.refill_per_second
+
+    def refund(self, cost: float):
+        self.tokens = min(self.capacity, self.tokens + cost)
+
+    def is_full(self, now: float) -> bool:
+        return self.tokens + (now - self.updated) * self.refill_per_second >= self.capacity
+
+
+class Ticket:
+    """A granted LLM slot; release() is idempotent."""
+
+    def __init__(self, controller: "AdmissionController"):
+        self._controller = controller
+        self._released = False
+        self.granted_at = time.monotonic()
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._controller._release(self)
+
+
+class AdmissionController:
+    """
+    Per-user token buckets in front of a global concurrency ceiling. Callers that
+    cannot get a slot immediately wait in a priority queue for a bounded time.
+    """
+
+    def __init__(self, max_concurrency=LLM_MAX_CONCURRENCY, max_queue_depth=LLM_MAX_QUEUE_DEPTH,
+                 max_wait_seconds=LLM_MAX_QUEUE_WAIT_SECONDS, user_burst=LLM_USER_BURST,
+                 user_calls_per_minute=LLM_USER_CALLS_PER_MINUTE):
+        self.max_concurrency = max_concurrency
+        self.max_queue_depth = max_queue_depth
+        self.max_wait_seconds = max_wait_seconds
+        self.user_burst = user_burst
+        self.user_refill_per_second = user_calls_per_minute / 60.0
+        self._buckets = {}
+        self._active = 0
+        self._queued = 0
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._wait_times = deque(maxlen=1000)
+        self._service_times = deque(maxlen=200)
+        self._counters = Counter()
+
+    # --- Rate Budget ---
+    def _bucket(self, user_id: str) -> TokenBucket:
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            if len(self._buckets) >= MAX_TRACKED_USERS:
+                now = time.monotonic()
+                self._buckets = {uid: b for uid, b in self._buckets.items() if not b.is_full(now)}
+            bucket = TokenBucket(self.user_burst, self.user_refill_per_second)
+            self._buckets[user_id] = bucket
+        return bucket
+
+    # --- Concurrency Slots ---
+    def _grant(self) -> Ticket:
+        self._active += 1
+        return Ticket(self)
+
+    def _release(self, ticket: Ticket):
+        self._active -= 1
+        self._service_times.append(time.monotonic() - ticket.granted_at)
+        self._wake_next()
+
+    def _wake_next(self):
+        while self._waiters and self._active < self.max_concurrency:
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self._queued -= 1
+            future.set_result(self._grant())
+
+    def _estimated_wait(self) -> int:
+        average_service = (sum(self._service_times) / len(self._service_times)) if self._service_times else 5.0
+        return max(1, math.ceil(average_service * (self._queued + 1) / self.max_concurrency))
+
+    def charge(self, user_id: str, cost: float = 1):
+        """Take `cost` from the user's budget up front, for requests that then acquire each slot with cost=0."""
+        retry_after = self._bucket(user_id).try_take(cost)
+        if retry_after:
+            self._counters["rejected_user_budget"] += 1
+            raise AdmissionRejected("Per-user LLM budget exhausted.", math.ceil(retry_after))
+
+    async def acquire(self, user_id: str, priority: int = INTERACTIVE, cost: float = 1) -> Ticket:
+        """Wait for an LLM slot or raise AdmissionRejected with a Retry-After hint."""
+        self.charge(user_id, cost)
+        bucket = self._bucket(user_id)
+
+        if self._active < self.max_concurrency and not self._queued:
+            self._counters[f"admitted_{PRIORITY_NAMES[priority]}"] += 1
+            self._wait_times.append(0.0)
+            return self._grant()
+
+        if self._queued >= self.max_queue_depth:
+            bucket.refund(cost)
+            self._counters["rejected_queue_full"] += 1
+            raise AdmissionRejected("LLM queue is full.", self._estimated_wait())
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        self._queued += 1
+        started = time.monotonic()
+        try:
+            await asyncio.wait({future}, timeout=self.max_wait_seconds)
+        except BaseException:
+            # The caller was cancelled while queued; hand back a slot it may have just received.
+            if future.done() and not future.cancelled():
+                future.result().release()
+            elif not future.done():
+                future.cancel()
+                self._queued -= 1
+                bucket.refund(cost)
+            raise
+        if not future.done():
+            future.cancel()
+            self._queued -= 1
+            bucket.refund(cost)
+            self._counters["rejected_queue_timeout"] += 1
+            raise AdmissionRejected("Timed out waiting for an LLM slot.", self._estimated_wait())
+
+        self._wait_times.append(time.monotonic() - started)
+        self._counters[f"admitted_{PRIORITY_NAMES[priority]}"] += 1
+        return future.result()
+
+    def metrics(self) -> dict:
+        waits = sorted(self._wait_times)
+
+        def percentile(p):
+            if not waits:
+                return None
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))], 4)
+
+        return {
+            "active": self._active,
+            "queue_depth": self._queued,
+            "max_concurrency": self.max_concurrency,
+            "wait_seconds_p50": percentile(0.50),
+            "wait_seconds_p95": percentile(0.95),
+            "wait_seconds_p99": percentile(0.99),
+            "tracked_users": len(self._buckets),
+            **self._counters,
+        }
+
+
+admission_controller = AdmissionController()
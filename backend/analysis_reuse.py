@@ -0,0 +1,123 @@
+# backend/analysis_reuse.py
+import hashlib
+import os
+import re
+import zlib
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+import db
+from documents import document_hash, normalize_text
+
+ANALYSIS_REUSE_THRESHOLD = float(os.getenv("ANALYSIS_REUSE_THRESHOLD", "0.9"))
+ANALYSIS_REUSE_MAX_AGE_DAYS = int(os.getenv("ANALYSIS_REUSE_MAX_AGE_DAYS", "30"))
+SHINGLE_WORDS = 5
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16
+LSH_ROWS = MINHASH_PERMUTATIONS // LSH_BANDS
+
+# Universal hashing (a*x + b) mod p over 32-bit shingle hashes; a < 2^31 keeps a*x inside uint64.
+_PRIME = np.uint64(4294967311)
+_rng = np.random.RandomState(20240601)
+_A = _rng.randint(1, 2**31 - 1, size=MINHASH_PERMUTATIONS).astype(np.uint64)
+_B = _rng.randint(0, 2**31 - 1, size=MINHASH_PERMUTATIONS).astype(np.uint64)
+
+
+def shingles(text: str) -> set:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < SHINGLE_WORDS:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def minhash_signature(text: str) -> List[int]:
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles(text)), dtype=np.uint64)
+    permuted = (hashes[:, None] * _A[None, :] + _B[None, :]) % _PRIME
+    return permuted.min(axis=0).astype(np.int64).tolist()
+
+
+def lsh_bands(signature: List[int]) -> List[int]:
+    """One 63-bit key per band; two signatures that agree on any band become candidates."""
+    keys = []
+    for band in range(LSH_BANDS):
+        rows = signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]
+        digest = hashlib.blake2b(repr((band, rows)).encode("ascii"), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, "big") >> 1)
+    return keys
+
+
+def estimated_similarity(a: List[int], b: List[int]) -> float:
+    return sum(x == y for x, y in zip(a, b)) / MINHASH_PERMUTATIONS
+
+
+class AnalysisFingerprint:
+    """Document hashes and JD MinHash for one analysis request."""
+
+    def __init__(self, resume_text: str, jd_text: str):
+        self.resume_hash = document_hash(normalize_text(resume_text))
+        self.jd_hash = document_hash(normalize_text(jd_text))
+        self.jd_signature = minhash_signature(normalize_text(jd_text))
+        self.jd_bands = lsh_bands(self.jd_signature)
+
+
+class AnalysisReuse:
+    """
+    Finds a previous analysis of the same resume against the same or a
+    near-identical JD for the same user: exact document-hash match first, then
+    LSH candidates whose estimated Jaccard similarity clears the threshold.
+    """
+
+    def __init__(self, threshold: float = ANALYSIS_REUSE_THRESHOLD, max_age_days: int = ANALYSIS_REUSE_MAX_AGE_DAYS):
+        self.threshold = threshold
+        self.max_age_days = max_age_days
+        self.lookups = 0
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.forced_fresh = 0
+        self.latency_saved_ms = 0.0
+
+    async def find(self, conn, user_id: str, fingerprint: AnalysisFingerprint) -> Optional[Tuple[dict, float]]:
+        """Return (stored result, similarity) or None."""
+        self.lookups += 1
+        row = await db.fetch_exact_analysis_result(
+            conn, user_id, fingerprint.resume_hash, fingerprint.jd_hash, self.max_age_days
+        )
+        if row is not None:
+            self.exact_hits += 1
+            self.latency_saved_ms += row["latency_ms"] or 0.0
+            return row["result"], 1.0
+
+        best, best_similarity = None, 0.0
+        for candidate in await db.fetch_near_analysis_candidates(
+            conn, user_id, fingerprint.resume_hash, fingerprint.jd_bands, self.max_age_days
+        ):
+            similarity = estimated_similarity(fingerprint.jd_signature, candidate["jd_minhash"])
+            if similarity > best_similarity:
+                best, best_similarity = candidate, similarity
+        if best is None or best_similarity < self.threshold:
+            return None
+        self.near_hits += 1
+        self.latency_saved_ms += best["latency_ms"] or 0.0
+        return best["result"], best_similarity
+
+    async def record(self, conn, user_id: str, fingerprint: AnalysisFingerprint, resume_text: str, jd_text: str,
+                     result: dict, latency_ms: float):
+        await db.insert_analysis_result(
+            conn, user_id, resume_text, jd_text, result, fingerprint.jd_signature, fingerprint.jd_bands, latency_ms
+        )
+
+    def stats(self) -> dict:
+        hits = self.exact_hits + self.near_hits
+        return {
+            "lookups": self.lookups,
+            "exact_hits": self.exact_hits,
+            "near_hits": self.near_hits,
+            "forced_fresh": self.forced_fresh,
+            "hit_rate": round(hits / self.lookups, 4) if self.lookups else 0.0,
+            "latency_saved_seconds": round(self.latency_saved_ms / 1000, 2),
+            "threshold": self.threshold,
+        }
+
+
+analysis_reuse = AnalysisReuse()
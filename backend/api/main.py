@@ -1,11 +1,14 @@
 # backend/api/main.py
 
 # --- Core Imports ---
-import tempfile
 import sys
 import os
 import json
+import re
 import uuid
+import asyncio
+import time
+from urllib.parse import quote
 from typing import List, Optional, Dict, Any, AsyncGenerator
 import asyncpg
 
@@ -15,14 +18,17 @@ from dotenv import load_dotenv
 
 # --- Web Framework (FastAPI) ---
 from fastapi import (
-    FastAPI, UploadFile, File, Form, Body, Depends, HTTPException, status, Request
+    FastAPI, UploadFile, File, Form, Body, Depends, HTTPException, status, Request, Query, BackgroundTasks
 )
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.background import BackgroundTask
 
 # --- Security ---
-from fastapi_clerk_auth import ClerkConfig, ClerkHTTPBearer, HTTPAuthorizationCredentials
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
@@ -31,12 +37,32 @@ from slowapi.errors import RateLimitExceeded
 from pydantic import BaseModel
 
 # --- Utilities ---
-from fpdf import FPDF
-from gtts import gTTS
 
 # Add parent directory to system path for local module imports
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from utils import save_upload_to_temp, extract_text_from_path
+from reports import render_report, report_cache
+from tts_cache import TTS_CACHE_DIR, AudioCache, audio_key, run_sweeper
+import db
+from match_jobs import MATCH_ITEM_STALE_SECONDS, MATCH_MAX_FILES, MatchJobRunner
+from reverse_match import match_resume_to_jds, prepared_jds
+from auth import AuthError, ClerkTokenVerifier, JWKSCache, KeysUnavailable
+from admission import INTERACTIVE, STANDARD, AdmissionRejected, Ticket, admission_controller
+from streaming import IncrementalJSONParser, relay_until_disconnect, sse_event
+from loop_lag import loop_lag_monitor
+from resume_sections import improve_resume_sections, section_cache
+from mock_test_scoring import build_narrative_prompt, score_test
+from analysis_reuse import AnalysisFingerprint, analysis_reuse
+from prompt_compaction import compact_inputs, get_compaction_metrics
+from llm_usage import usage_recorder
+from shared_models import memory_report
+from inference_service import inference_service
+from json_patch import (
+    JSON_PATCH_CONTENT_TYPE, MERGE_PATCH_CONTENT_TYPE, PatchError, apply_json_patch, apply_merge_patch
+)
+from structured_output import (
+    StructuredOutputError, generate_structured, get_parse_metrics, json_generation_config, parse_json_text
+)
 
 # --- Environment & AI Configuration ---
 dotenv_path = os.path.join(os.path.dirname(__file__), '..', '..', '.env.local')
@@ -46,7 +72,9 @@ load_dotenv(dotenv_path=dotenv_path)
 jwks_url = os.getenv("CLERK_JWKS_URL")
 if not jwks_url:
     raise ValueError("CLERK_JWKS_URL not found in environment variables.")
-clerk_config = ClerkConfig(jwks_url=jwks_url)
+jwks_cache = JWKSCache(jwks_url)
+authorized_parties = [p.strip() for p in os.getenv("CLERK_AUTHORIZED_PARTIES", "").split(",") if p.strip()]
+token_verifier = ClerkTokenVerifier(jwks_cache, authorized_parties=authorized_parties)
 
 try:
     api_key = os.getenv("GOOGLE_API_KEY")
@@ -63,6 +91,13 @@ if not DATABASE_URL:
     raise ValueError("DATABASE_URL is not set in the environment for RDS connection.")
 
 db_pool = None
+match_runner = MatchJobRunner(lambda: db_pool)
+MATCH_PROGRESS_POLL_SECONDS = 1.0
+# A progress stream with no change for this long ends with a `stalled` event; the client can reconnect later.
+MATCH_PROGRESS_STALL_SECONDS = float(os.getenv("MATCH_PROGRESS_STALL_SECONDS", str(MATCH_ITEM_STALE_SECONDS + 60)))
+REWRITE_BATCH_MAX_ITEMS = int(os.getenv("REWRITE_BATCH_MAX_ITEMS", "20"))
+REWRITE_BATCH_CONCURRENCY = int(os.getenv("REWRITE_BATCH_CONCURRENCY", "4"))
+REVERSE_MATCH_MAX_JDS = int(os.getenv("REVERSE_MATCH_MAX_JDS", "100"))
 
 # --- App & Middleware Setup ---
 app = FastAPI(
@@ -72,16 +107,23 @@ app = FastAPI(
 @app.on_event("startup")
 async def startup():
     global db_pool
+    asyncio.create_task(run_sweeper(audio_cache))
+    asyncio.create_task(jwks_cache.run_refresher())
+    asyncio.create_task(usage_recorder.run_flusher(lambda: db_pool))
+    asyncio.create_task(loop_lag_monitor.run())
     try:
-        db_pool = await asyncpg.create_pool(dsn=DATABASE_URL)
+        db_pool = await db.create_pool(DATABASE_URL)
         print("--- Database connection pool created successfully. ---")
+        asyncio.create_task(match_runner.resume_unfinished())
     except Exception as e:
         print(f"FATAL: Could not connect to the database. Error: {e}")
         db_pool = None
 
 @app.on_event("shutdown")
 async def shutdown():
+    match_runner.shutdown()
     if db_pool:
+        await usage_recorder.flush(db_pool)
         await db_pool.close()
         print("--- Database connection pool closed. ---")
 
@@ -104,28 +146,68 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE"],
-    allow_headers=["Authorization", "Content-Type"],
+    allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE"],
+    allow_headers=["Authorization", "Content-Type", "If-Match", "If-None-Match"],
+    expose_headers=["ETag"],
 )
 
 # --- Static Files for Audio ---
-if not os.path.exists("temp_audio"):
-    os.makedirs("temp_audio")
-app.mount("/temp_audio", StaticFiles(directory="temp_audio"), name="temp_audio")
+audio_cache = AudioCache(directory=TTS_CACHE_DIR)
+app.mount("/temp_audio", StaticFiles(directory=TTS_CACHE_DIR), name="temp_audio")
+TTS_LANG = "en"
+TTS_TLD = "co.in"
+AUDIO_KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")
 
 # --- AUTHENTICATION DEPENDENCY ---
-clerk_auth_guard = ClerkHTTPBearer(config=clerk_config)
+bearer_scheme = HTTPBearer(auto_error=False)
 
-def get_current_user_id(credentials: HTTPAuthorizationCredentials = Depends(clerk_auth_guard)) -> str:
+async def get_current_user_id(credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)) -> str:
     if not credentials:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
-    user_id = credentials.decoded.get("sub")
+    try:
+        claims = await token_verifier.verify(credentials.credentials)
+    except KeysUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except AuthError as e:
+        raise HTTPException(status_code=401, detail=str(e))
+    user_id = claims.get("sub")
     
     if not user_id:
         raise HTTPException(status_code=401, detail="User ID not found in session")
     return user_id
     
+# --- LLM Admission Control ---
+async def acquire_llm_slot(user_id: str, priority: int, cost: int = 1) -> Ticket:
+    try:
+        return await admission_controller.acquire(user_id, priority, cost)
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=e.reason,
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+def charge_llm_budget(user_id: str, cost: int):
+    try:
+        admission_controller.charge(user_id, cost)
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=e.reason,
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+def llm_admission(priority: int, cost: int = 1):
+    """Dependency that holds an LLM slot for the duration of the handler; `cost` is the number of LLM calls it makes."""
+    async def dependency(user_id: str = Depends(get_current_user_id)):
+        ticket = await acquire_llm_slot(user_id, priority, cost)
+        try:
+            yield ticket
+        finally:
+            ticket.release()
+    return dependency
+
 # --- Security: File Upload Validation ---
 MAX_FILE_SIZE = 10 * 1024 * 1024
 ALLOWED_CONTENT_TYPES = [
@@ -168,6 +250,17 @@ class EvaluateTestRequest(BaseModel):
     questions: List[Dict[str, Any]]
     answers: List[Dict[str, Any]]
 
+class TestNarrativeRequest(EvaluateTestRequest):
+    job_role: str = ""
+
+class TestQuestion(BaseModel):
+    id: int
+    question: str
+    category: str
+    difficulty: str
+    options: List[str]
+    correctAnswer: str
+
 class TestReportRequest(BaseModel):
     job_role: str
     difficulty: str
@@ -191,6 +284,26 @@ class SaveAnalysisRequest(BaseModel):
     original_resume_text: str
     job_title: Optional[str] = "Resume Analysis"
 
+class AnalysisSuggestion(BaseModel):
+    type: str
+    title: str
+    description: str
+    impact: str
+    category: str
+
+class ResumeAnalysisResult(BaseModel):
+    overall_score: int
+    skills_match: Optional[int] = None
+    experience_match: Optional[int] = None
+    education_match: Optional[int] = None
+    job_match: int
+    ats_score: int
+    suggestions: List[AnalysisSuggestion]
+    keywords_matched: List[str]
+    keywords_missing: List[str]
+    strengths: List[str]
+    weaknesses: List[str]
+
 class AnalysisReportPDFRequest(BaseModel):
     overall_score: int
     job_match: int
@@ -251,6 +364,14 @@ class RewriteRequest(BaseModel):
     title: str
     description: str
 
+class RewriteBatchRequest(BaseModel):
+    items: List[RewriteRequest]
+
+class ReverseMatchJob(BaseModel):
+    id: Optional[str] = None
+    title: Optional[str] = None
+    description: str
+
 class PersonalInfoModel(BaseModel):
     name: str
     email: str
@@ -304,103 +425,153 @@ class ResumeDataModel(BaseModel):
 
 class ResumeSaveData(BaseModel):
     personalInfo: dict
+    summary: str = ""
     experience: list
     education: list
     skills: list
+    projects: list = []
+    certifications: list = []
+
+# --- PDF Response Helper ---
+def pdf_response(pdf_bytes: bytes, filename: str) -> Response:
+    # Same header FileResponse builds: names that need quoting (non-ASCII, quotes) go in RFC 5987 filename*.
+    quoted = quote(filename)
+    if quoted != filename:
+        disposition = f"attachment; filename*=utf-8''{quoted}"
+    else:
+        disposition = f'attachment; filename="{filename}"'
+    return Response(
+        content=pdf_bytes,
+        media_type='application/pdf',
+        headers={"Content-Disposition": disposition}
+    )
+
+# --- Resume Analysis Helpers ---
+def validate_job_description(model, jd_text: str, user_id: str):
+    validation_prompt = f"""
+    Is the following text a valid job description? Answer with only "yes" or "no".
+    Text: "{jd_text}"
+    """
+    with usage_recorder.call("validate-job-description", user_id, model) as call:
+        validation_response = model.generate_content(validation_prompt)
+        call.set_usage(validation_response)
+    if "yes" not in validation_response.text.lower():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid job description provided. Please paste the full job description."
+        )
 
-# --- PDF Generation Helpers ---
-def create_analysis_pdf(data):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-    pdf.cell(200, 10, txt="AI Resume Analysis Report", ln=True, align='C')
-    pdf.cell(200, 10, txt=f"Overall Score: {data.get('overall_score', 'N/A')}", ln=True)
-    pdf.cell(200, 10, txt=f"ATS Score: {data.get('ats_score', 'N/A')}", ln=True)
-    pdf.cell(200, 10, txt=f"Job Match: {data.get('job_match', 'N/A')}", ln=True)
-    pdf_output_path = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf").name
-    pdf.output(pdf_output_path)
-    return pdf_output_path
-
-def create_optimized_resume_pdf(optimized_text):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=10)
-    pdf.multi_cell(0, 5, txt=optimized_text)
-    pdf_output_path = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf").name
-    pdf.output(pdf_output_path)
-    return pdf_output_path
-
-def create_test_report_pdf(data):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-    pdf.cell(200, 10, txt=f"{data.job_role} Mock Test Report", ln=True, align='C')
-    pdf.cell(200, 10, txt=f"Overall Score: {data.overall_score}/{data.total_questions}", ln=True)
-    pdf.cell(200, 10, txt=f"Difficulty: {data.difficulty.capitalize()}", ln=True)
-    pdf_output_path = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf").name
-    pdf.output(pdf_output_path)
-    return pdf_output_path
+async def find_reusable_analysis(user_id: str, fingerprint: AnalysisFingerprint):
+    if db_pool is None:
+        return None
+    try:
+        async with db_pool.acquire() as conn:
+            return await analysis_reuse.find(conn, user_id, fingerprint)
+    except Exception as e:
+        print(f"--- ERROR looking up a reusable analysis for user {user_id}: {e} ---")
+        return None
+
+async def record_analysis(user_id: str, fingerprint: AnalysisFingerprint, resume_text: str, jd_text: str,
+                          result: dict, latency_ms: float):
+    if db_pool is None:
+        return
+    try:
+        async with db_pool.acquire() as conn:
+            await analysis_reuse.record(conn, user_id, fingerprint, resume_text, jd_text, result, latency_ms)
+    except Exception as e:
+        print(f"--- ERROR recording analysis for user {user_id}: {e} ---")
+
+def build_analysis_prompt(jd_text: str, resume_text: str) -> str:
+    return f"""
+    Analyze the provided resume against the job description and return ONLY a valid JSON object.
+    Job Description: {jd_text}
+    Resume: {resume_text}
     
+    JSON Structure:
+    {{
+        "overall_score": "<number>",
+        "skills_match": "<number|null>",
+        "experience_match": "<number|null>",
+        "education_match": "<number|null>",
+        "job_match": "<number>",
+        "ats_score": "<number>",
+        "suggestions": [{{ "type": "string", "title": "string", "description": "string", "impact": "string", "category": "string" }}],
+        "keywords_matched": ["string"],
+        "keywords_missing": ["string"],
+        "strengths": ["string"],
+        "weaknesses": ["string"]
+    }}
+    """
+
 # --- API Endpoints ---
 @app.get("/")
 async def root():
     return {"message": "Welcome to the Rex--AI API!"}
 
+@app.get("/metrics")
+async def get_metrics(user_id: str = Depends(get_current_user_id)):
+    return {
+        "structured_output": get_parse_metrics(),
+        "pdf_reports": report_cache.stats(),
+        "llm_admission": admission_controller.metrics(),
+        "auth_token_cache": token_verifier.token_cache.stats(),
+        "prompt_compaction": get_compaction_metrics(),
+        "llm_usage_recorder": usage_recorder.stats(),
+        "event_loop_lag": loop_lag_monitor.stats(),
+        "resume_section_cache": section_cache.stats(),
+        "analysis_reuse": analysis_reuse.stats(),
+        "worker_memory": memory_report(),
+        "inference_batching": inference_service.stats(),
+    }
+
 @app.post("/analyze/")
 @limiter.limit("5 per minute")
 async def analyze_resume(
     request: Request,
+    response: Response,
+    background_tasks: BackgroundTasks,
     jd_text: str = Form(...),
+    force_fresh: bool = Form(False),
     file: UploadFile = Depends(validate_file),
     user_id: str = Depends(get_current_user_id)
 ):
+    """
+    Returns a stored analysis (flagged `reused`) when this user already analyzed
+    the same resume against the same or a near-identical JD; `force_fresh` skips the lookup.
+    """
     temp_path = None
+    llm_slot = None
     try:
-        model = genai.GenerativeModel('gemini-2.5-pro')
-        
-        validation_prompt = f"""
-        Is the following text a valid job description? Answer with only "yes" or "no".
-        Text: "{jd_text}"
-        """
-        validation_response = model.generate_content(validation_prompt)
-        if "yes" not in validation_response.text.lower():
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid job description provided. Please paste the full job description."
-            )
-
         temp_path = save_upload_to_temp(file)
         resume_text = extract_text_from_path(temp_path)
-        
-        analysis_prompt = f"""
-        Analyze the provided resume against the job description and return ONLY a valid JSON object.
-        Job Description: {jd_text}
-        Resume: {resume_text}
-        
-        JSON Structure:
-        {{
-            "overall_score": "<number>",
-            "skills_match": "<number|null>",
-            "experience_match": "<number|null>",
-            "education_match": "<number|null>",
-            "job_match": "<number>",
-            "ats_score": "<number>",
-            "suggestions": [{{ "type": "string", "title": "string", "description": "string", "impact": "string", "category": "string" }}],
-            "keywords_matched": ["string"],
-            "keywords_missing": ["string"],
-            "strengths": ["string"],
-            "weaknesses": ["string"]
-        }}
-        """
-        response = model.generate_content(analysis_prompt)
+
+        fingerprint = AnalysisFingerprint(resume_text, jd_text)
+        if force_fresh:
+            analysis_reuse.forced_fresh += 1
+        else:
+            reused = await find_reusable_analysis(user_id, fingerprint)
+            if reused is not None:
+                result, similarity = reused
+                return {**result, "reused": True, "reuse_similarity": round(similarity, 3)}
+
+        llm_slot = await acquire_llm_slot(user_id, INTERACTIVE, cost=2)
+        started = time.perf_counter()
+        model = genai.GenerativeModel('gemini-2.5-pro')
+        validate_job_description(model, jd_text, user_id)
+
+        compacted = await run_in_threadpool(compact_inputs, resume_text, jd_text, "analyze")
+        response.headers["X-Prompt-Tokens-Saved"] = str(compacted.tokens_saved)
+        analysis_prompt = build_analysis_prompt(compacted.jd_text, compacted.resume_text)
         
         try:
-            json_response_text = response.text.strip().lstrip("```json").rstrip("```").strip()
-            analysis_result = json.loads(json_response_text)
-            return analysis_result
-        except (json.JSONDecodeError, AttributeError) as e:
+            analysis_result = await generate_structured(model, analysis_prompt, ResumeAnalysisResult, endpoint="analyze", user_id=user_id)
+            result = analysis_result.dict()
+            latency_ms = (time.perf_counter() - started) * 1000
+            background_tasks.add_task(record_analysis, user_id, fingerprint, resume_text, jd_text, result, latency_ms)
+            return {**result, "reused": False}
+        except StructuredOutputError as e:
             print(f"--- ERROR: AI returned an invalid format for user {user_id}. ---")
-            print(f"Raw AI Response: {response.text}")
+            print(f"Raw AI Response: {e.raw_text}")
             raise HTTPException(
                 status_code=500, 
                 detail="The AI's response was not in the expected format. Please try again."
@@ -411,15 +582,96 @@ async def analyze_resume(
     except Exception as e:
         print(f"--- UNEXPECTED ERROR in analyze_resume for user {user_id}: {e} ---")
         raise HTTPException(status_code=500, detail="An unexpected error occurred during analysis.")
+    finally:
+        if llm_slot is not None:
+            llm_slot.release()
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+async def analysis_event_streamer(model, analysis_prompt: str, user_id: str, llm_slot: Ticket) -> AsyncGenerator[str, None]:
+    parser = IncrementalJSONParser()
+    try:
+        with usage_recorder.call("analyze-stream", user_id, model) as call:
+            response_stream = await model.generate_content_async(
+                analysis_prompt, stream=True, generation_config=json_generation_config(ResumeAnalysisResult)
+            )
+            async for chunk in response_stream:
+                call.first_token()
+                call.set_usage(chunk)
+                for key, value in parser.feed(chunk.text):
+                    yield sse_event({"field": key, "value": value}, event="field")
+        try:
+            result = ResumeAnalysisResult(**parse_json_text(parser.text)[0])
+        except ValueError as e:
+            print(f"--- ERROR: AI returned an invalid format for user {user_id}. ---")
+            print(f"Raw AI Response: {parser.text}")
+            yield sse_event({"message": "The AI's response was not in the expected format. Please try again."}, event="error")
+            return
+        yield sse_event(result.dict(), event="result")
+    except Exception as e:
+        print(f"--- UNEXPECTED ERROR in analysis stream for user {user_id}: {e} ---")
+        yield sse_event({"message": "An unexpected error occurred during analysis."}, event="error")
+    finally:
+        llm_slot.release()
+
+@app.post("/analyze/stream")
+@limiter.limit("5 per minute")
+async def analyze_resume_stream(
+    request: Request,
+    jd_text: str = Form(...),
+    file: UploadFile = Depends(validate_file),
+    user_id: str = Depends(get_current_user_id)
+):
+    """
+    Same analysis as /analyze/, streamed as SSE: one `field` event per top-level
+    key as soon as it is generated, then a `result` event with the validated object.
+    """
+    llm_slot = await acquire_llm_slot(user_id, INTERACTIVE, cost=2)
+    temp_path = None
+    try:
+        model = genai.GenerativeModel('gemini-2.5-pro')
+        validate_job_description(model, jd_text, user_id)
+
+        temp_path = save_upload_to_temp(file)
+        resume_text = extract_text_from_path(temp_path)
+        compacted = await run_in_threadpool(compact_inputs, resume_text, jd_text, "analyze_stream")
+    except HTTPException as http_exc:
+        llm_slot.release()
+        raise http_exc
+    except Exception as e:
+        llm_slot.release()
+        print(f"--- UNEXPECTED ERROR in analyze_resume_stream for user {user_id}: {e} ---")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred during analysis.")
     finally:
         if temp_path and os.path.exists(temp_path):
             os.remove(temp_path)
 
+    # The slot is released when the stream ends; the background task covers clients that never start reading.
+    return StreamingResponse(
+        analysis_event_streamer(model, build_analysis_prompt(compacted.jd_text, compacted.resume_text), user_id, llm_slot),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            "X-Prompt-Tokens-Saved": str(compacted.tokens_saved),
+        },
+        background=BackgroundTask(llm_slot.release)
+    )
+
 @app.post("/generate-optimized-resume/")
 @limiter.limit("5 per minute")
-async def generate_optimized_resume(request: Request, data: OptimizeResumeRequest, user_id: str = Depends(get_current_user_id)):
+async def generate_optimized_resume(
+    request: Request,
+    response: Response,
+    data: OptimizeResumeRequest,
+    user_id: str = Depends(get_current_user_id),
+    llm_slot: Ticket = Depends(llm_admission(STANDARD))
+):
     try:
         model = genai.GenerativeModel('gemini-2.5-pro')
+        # The whole resume is rewritten, so only duplicate lines and JD boilerplate are dropped here.
+        compacted = compact_inputs(data.resume_text, data.job_description, "generate_optimized_resume", select_resume_chunks=False)
+        response.headers["X-Prompt-Tokens-Saved"] = str(compacted.tokens_saved)
         prompt = f"""
         **Task:** You are an expert career coach and resume writer. Your task is to completely rewrite and reformat the provided resume to be professional, ATS-friendly, and highly tailored to the given job description.
         **Instructions:**
@@ -430,45 +682,79 @@ async def generate_optimized_resume(request: Request, data: OptimizeResumeReques
         5.  **Output:** Provide ONLY the rewritten resume text. Do not include any extra commentary, notes, or explanations before or after the resume content. Start directly with the candidate's name and contact info.
         ---
         **JOB DESCRIPTION FOR TARGETING:**
-        {data.job_description}
+        {compacted.jd_text}
         ---
         **ORIGINAL RESUME TO REWRITE:**
-        {data.resume_text}
+        {compacted.resume_text}
         ---
         **PROFESSIONALLY REWRITTEN RESUME:**
         """
-        response = model.generate_content(prompt)
-        return {"optimized_resume_text": response.text}
+        with usage_recorder.call("generate-optimized-resume", user_id, model) as call:
+            result = model.generate_content(prompt)
+            call.set_usage(result)
+        return {"optimized_resume_text": result.text}
     except Exception as e:
         print(f"Error during resume optimization for user {user_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to generate AI resume: {str(e)}")
 
-async def cover_letter_streamer(resume: str, job_description: str) -> AsyncGenerator[str, None]:
+async def text_generation_streamer(request: Request, prompt: str, endpoint: str, user_id: str, llm_slot: Ticket,
+                                   error_message: str) -> AsyncGenerator[str, None]:
+    """SSE `data: {"text": ...}` frames from an async Gemini stream, then `done` (or `error`)."""
+    model = genai.GenerativeModel('gemini-2.5-pro')
+
+    async def generation_frames() -> AsyncGenerator[str, None]:
+        with usage_recorder.call(endpoint, user_id, model) as call:
+            response_stream = await model.generate_content_async(prompt, stream=True)
+            async for chunk in response_stream:
+                call.first_token()
+                call.set_usage(chunk)
+                yield sse_event({"text": chunk.text})
+        yield sse_event({}, event="done")
+
     try:
-        model = genai.GenerativeModel('gemini-2.5-pro')
-        prompt = f"Generate a professional and compelling cover letter based on the following resume and job description. The cover letter should be 3-4 paragraphs, highlight relevant skills and experience, and show enthusiasm for the role.\n\nRESUME:\n{resume}\n\nJOB DESCRIPTION:\n{job_description}"
-        response_stream = model.generate_content(prompt, stream=True)
-        for chunk in response_stream:
-            yield chunk.text
+        async for frame in relay_until_disconnect(generation_frames(), request.is_disconnected):
+            yield frame
     except Exception as e:
-        print(f"Error during cover letter streaming: {e}")
-        yield f"Error: {e}"
+        print(f"Error during {endpoint} streaming for user {user_id}: {e}")
+        yield sse_event({"message": error_message}, event="error")
+    finally:
+        llm_slot.release()
+
+def build_cover_letter_prompt(resume: str, job_description: str) -> str:
+    return f"Generate a professional and compelling cover letter based on the following resume and job description. The cover letter should be 3-4 paragraphs, highlight relevant skills and experience, and show enthusiasm for the role.\n\nRESUME:\n{resume}\n\nJOB DESCRIPTION:\n{job_description}"
 
 @app.post("/generate-cover-letter/")
 @limiter.limit("5 per minute")
 async def generate_cover_letter(request: Request, data: CoverLetterRequest, user_id: str = Depends(get_current_user_id)):
+    llm_slot = await acquire_llm_slot(user_id, STANDARD)
     try:
+        compacted = await run_in_threadpool(compact_inputs, data.resume, data.job_description, "generate_cover_letter")
         return StreamingResponse(
-            cover_letter_streamer(data.resume, data.job_description),
-            media_type="text/event-stream"
+            text_generation_streamer(
+                request, build_cover_letter_prompt(compacted.resume_text, compacted.jd_text),
+                "generate-cover-letter", user_id, llm_slot, "Failed to generate the cover letter."
+            ),
+            media_type="text/event-stream",
+            headers={
+                "Cache-Control": "no-cache",
+                "X-Accel-Buffering": "no",
+                "X-Prompt-Tokens-Saved": str(compacted.tokens_saved),
+            },
+            background=BackgroundTask(llm_slot.release)
         )
     except Exception as e:
+        llm_slot.release()
         return JSONResponse(status_code=500, content={"message": str(e)})
 
 
 @app.post("/interview/start/")
 @limiter.limit("5 per minute")
-async def start_skill_test(request: Request, data: StartTestRequest, user_id: str = Depends(get_current_user_id)):
+async def start_skill_test(
+    request: Request,
+    data: StartTestRequest,
+    user_id: str = Depends(get_current_user_id),
+    llm_slot: Ticket = Depends(llm_admission(INTERACTIVE))
+):
     try:
         model = genai.GenerativeModel('gemini-2.5-pro')
         
@@ -485,27 +771,27 @@ async def start_skill_test(request: Request, data: StartTestRequest, user_id: st
             "correctAnswer": "string"
         }}
         """
-        response = model.generate_content(prompt)
         
         try:
-            json_response_text = response.text.strip().lstrip("```json").rstrip("```").strip()
-            questions = json.loads(json_response_text)
+            questions = await generate_structured(model, prompt, List[TestQuestion], endpoint="interview-start", user_id=user_id)
             
-            if not isinstance(questions, list) or len(questions) == 0:
+            if len(questions) == 0:
                 raise ValueError("AI did not return a valid list of questions.")
             
             for i, q in enumerate(questions):
-                q['id'] = i + 1
+                q.id = i + 1
             
             return {"questions": questions}
-        except (json.JSONDecodeError, ValueError) as e:
+        except (StructuredOutputError, ValueError) as e:
             print(f"--- ERROR: AI returned an invalid format for user {user_id}. ---")
-            print(f"Raw AI Response: {response.text}")
+            print(f"Raw AI Response: {getattr(e, 'raw_text', '')}")
             raise HTTPException(
                 status_code=500, 
                 detail=f"The AI returned an invalid question format: {e}"
             )
             
+    except HTTPException as http_exc:
+        raise http_exc
     except Exception as e:
         print(f"--- UNEXPECTED ERROR in start_skill_test for user {user_id}: {e} ---")
         raise HTTPException(status_code=500, detail=str(e))
@@ -513,29 +799,49 @@ async def start_skill_test(request: Request, data: StartTestRequest, user_id: st
 
 @app.post("/interview/evaluate-test/")
 @limiter.limit("10 per minute")
-async def evaluate_test(request: Request, data: EvaluateTestRequest, user_id: str = Depends(get_current_user_id)):
+async def evaluate_test(
+    request: Request,
+    data: EvaluateTestRequest,
+    user_id: str = Depends(get_current_user_id)
+):
+    """
+    Grades the test locally from each question's correctAnswer; no LLM call.
+    Narrative coaching is available from /interview/evaluate-test/narrative.
+    """
     try:
-        model = genai.GenerativeModel('gemini-2.5-pro')
-        prompt = f"""
-        Analyze the results of a mock test. Provide a comprehensive analysis in a strict JSON format.
-        - **Questions:** {json.dumps(data.questions)}
-        - **User's Answers:** {json.dumps(data.answers)}
-        **Required JSON Output Structure:**
-        ```json
-        {{
-            "category_scores": {{"technical": 0, "behavioral": 0}},
-            "detailed_feedback": [{{"question_id": 0, "feedback": "string"}}],
-            "overall_feedback": "string",
-            "suggestions": ["string", "string", "string"]
-        }}
-        ```
-        """
-        response = model.generate_content(prompt)
-        json_response_text = response.text.strip().lstrip("```json").rstrip("```").strip()
-        return json.loads(json_response_text)
+        return score_test(data.questions, data.answers)
     except Exception as e:
+        print(f"Error during test evaluation for user {user_id}: {e}")
         return JSONResponse(status_code=500, content={"message": str(e)})
 
+@app.post("/interview/evaluate-test/narrative")
+@limiter.limit("5 per minute")
+async def evaluate_test_narrative(request: Request, data: TestNarrativeRequest, user_id: str = Depends(get_current_user_id)):
+    """Streams LLM coaching feedback (SSE) built from the local score instead of the full test."""
+    score = score_test(data.questions, data.answers)
+    llm_slot = await acquire_llm_slot(user_id, STANDARD)
+    return StreamingResponse(
+        text_generation_streamer(
+            request, build_narrative_prompt(data.job_role, score, data.questions),
+            "interview-test-narrative", user_id, llm_slot, "Failed to generate test feedback."
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(llm_slot.release)
+    )
+
+@app.get("/interview/tests/analytics")
+async def get_test_analytics(
+    recent: int = Query(20, ge=1, le=100),
+    user_id: str = Depends(get_current_user_id),
+    conn: asyncpg.Connection = Depends(get_db_connection)
+):
+    try:
+        return await db.fetch_test_analytics(conn, user_id, recent)
+    except Exception as e:
+        print(f"Error fetching test analytics for user {user_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/interview/evaluate-answers/")
 @limiter.limit("10 per minute")
 async def evaluate_answers(
@@ -544,31 +850,12 @@ async def evaluate_answers(
     user_id: str = Depends(get_current_user_id)
 ):
     try:
-        correct_answers = 0
-        for answer in data.answers:
-            if answer.get("is_correct"):
-                correct_answers += 1
-        
-        overall_score = (correct_answers / len(data.questions)) * 100 if data.questions else 0
-
-        category_scores = {
-            "clarity": 80,
-            "confidence": 75,
-            "technical_knowledge": 85,
-            "communication": 90,
-        }
-        feedback = "Overall, you performed well. You demonstrated strong technical knowledge and clear communication. To improve, try to be more concise in your answers."
-        suggestions = [
-            "Practice the STAR method for behavioral questions.",
-            "Review common data structures and algorithms.",
-            "Record yourself answering questions to improve your delivery.",
-        ]
-
+        score = score_test(data.questions, data.answers)
         report = AnalysisReport(
-            overall_score=int(overall_score),
-            category_scores=category_scores,
-            feedback=feedback,
-            suggestions=suggestions,
+            overall_score=score["overall_score"],
+            category_scores=score["category_scores"],
+            feedback=score["overall_feedback"],
+            suggestions=score["suggestions"],
         )
 
         return report
@@ -581,21 +868,34 @@ async def evaluate_answers(
 @limiter.limit("20 per minute")
 async def speak_text(request: Request, data: SpeakRequest, user_id: str = Depends(get_current_user_id)):
     try:
-        tts = gTTS(text=data.text, lang='en', tld='co.in', slow=False)
-        filename = f"{uuid.uuid4()}.mp3"
-        filepath = os.path.join("temp_audio", filename)
-        tts.save(filepath)
-        audio_url = f"/temp_audio/{filename}"
-        return {"audio_url": audio_url}
+        key = audio_key(data.text, TTS_LANG, TTS_TLD)
+        if audio_cache.lookup(key):
+            return {"audio_url": f"/temp_audio/{key}.mp3", "cached": True}
+        audio_cache.register_pending(key, data.text, TTS_LANG, TTS_TLD)
+        return {"audio_url": f"/interview/speak/stream/{key}", "cached": False}
     except Exception as e:
         return JSONResponse(status_code=500, content={"message": str(e)})
 
+@app.get("/interview/speak/stream/{key}")
+async def stream_speech(key: str):
+    """Serve audio registered by /interview/speak/, synthesizing and caching it while streaming on a miss."""
+    if not AUDIO_KEY_PATTERN.match(key):
+        raise HTTPException(status_code=404, detail="Audio not found.")
+    cached_path = audio_cache.lookup(key)
+    if cached_path:
+        return FileResponse(cached_path, media_type="audio/mpeg")
+    pending = audio_cache.get_pending(key)
+    if pending is None:
+        raise HTTPException(status_code=404, detail="Audio not found.")
+    text, lang, tld = pending
+    return StreamingResponse(audio_cache.stream_and_store(key, text, lang, tld), media_type="audio/mpeg")
+
 @app.post("/generate-analysis-pdf/")
 @limiter.limit("10 per minute")
 async def generate_analysis_pdf_report(request: Request, data: AnalysisReportPDFRequest, user_id: str = Depends(get_current_user_id)):
     try:
-        pdf_path = create_analysis_pdf(data.dict())
-        return FileResponse(pdf_path, media_type='application/pdf', filename='AI_Resume_Analysis.pdf')
+        pdf_bytes = await run_in_threadpool(render_report, "analysis", data.dict())
+        return pdf_response(pdf_bytes, 'AI_Resume_Analysis.pdf')
     except Exception as e:
         return JSONResponse(status_code=500, content={"message": str(e)})
 
@@ -603,8 +903,8 @@ async def generate_analysis_pdf_report(request: Request, data: AnalysisReportPDF
 @limiter.limit("10 per minute")
 async def generate_ai_resume_pdf(request: Request, data: AiResumePdfRequest, user_id: str = Depends(get_current_user_id)):
     try:
-        pdf_path = create_optimized_resume_pdf(data.optimized_resume_text)
-        return FileResponse(pdf_path, media_type='application/pdf', filename='AI_Optimized_Resume.pdf')
+        pdf_bytes = await run_in_threadpool(render_report, "optimized_resume", data.dict())
+        return pdf_response(pdf_bytes, 'AI_Optimized_Resume.pdf')
     except Exception as e:
         return JSONResponse(status_code=500, content={"message": str(e)})
 
@@ -612,8 +912,8 @@ async def generate_ai_resume_pdf(request: Request, data: AiResumePdfRequest, use
 @limiter.limit("10 per minute")
 async def generate_test_report_pdf(request: Request, data: TestReportRequest, user_id: str = Depends(get_current_user_id)):
     try:
-        pdf_path = create_test_report_pdf(data)
-        return FileResponse(pdf_path, media_type='application/pdf', filename=f"{data.job_role}_Mock_Test_Report.pdf")
+        pdf_bytes = await run_in_threadpool(render_report, "test_report", data.dict())
+        return pdf_response(pdf_bytes, f"{data.job_role}_Mock_Test_Report.pdf")
     except Exception as e:
         return JSONResponse(status_code=500, content={"message": str(e)})
         
@@ -636,14 +936,8 @@ async def save_analysis(
         for weakness in data.weaknesses:
             combined_suggestions.append({"type": "improvement", "title": "Weakness", "description": weakness, "impact": "Medium", "category": "General"})
 
-        await conn.execute(
-            """
-            INSERT INTO rex_ai (
-                user_id, job_title, job_description, original_resume_text, ai_score, 
-                keyword_match_score, ats_score, suggestions, keywords_matched, keywords_missing
-            )
-            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
-            """,
+        await db.insert_analysis(
+            conn,
             user_id,
             data.job_title or "Resume Analysis",
             sanitized_job_description,
@@ -651,9 +945,9 @@ async def save_analysis(
             data.overall_score,
             data.job_match,
             data.ats_score,
-            json.dumps(combined_suggestions),
-            json.dumps(data.keywords_matched),
-            json.dumps(data.keywords_missing)
+            combined_suggestions,
+            data.keywords_matched,
+            data.keywords_missing
         )
         
         return {"message": f"Analysis for user {user_id} saved successfully!"}
@@ -670,26 +964,18 @@ async def save_test(
     conn: asyncpg.Connection = Depends(get_db_connection)
 ):
     try:
-        new_record = await conn.fetchrow(
-            """
-            INSERT INTO mock_tests (
-                user_id, job_role, difficulty, overall_score, duration_minutes,
-                questions, answers, feedback, suggestions, category_scores, status
-            )
-            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)
-            RETURNING *
-            """,
+        new_record = await db.insert_mock_test(
+            conn,
             user_id,
             data.job_role,
             data.difficulty,
             data.overall_score,
             data.duration_minutes,
-            json.dumps(data.questions),
-            json.dumps(data.answers),
+            data.questions,
+            data.answers,
             data.feedback,
-            json.dumps(data.suggestions),
-            json.dumps(data.category_scores),
-            "completed"
+            data.suggestions,
+            data.category_scores
         )
         return {"message": f"Test results for user {user_id} saved successfully!", "data": dict(new_record)}
     except Exception as e:
@@ -711,28 +997,19 @@ async def save_interview(
             "focus_areas": ["general", "technical"] 
         }
 
-        new_record = await conn.fetchrow(
-            """
-            INSERT INTO mock_interviews (
-                user_id, job_role, interview_type, settings, overall_score,
-                duration_minutes, questions, answers, feedback, suggestions,
-                category_scores, status
-            )
-            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12)
-            RETURNING *
-            """,
+        new_record = await db.insert_mock_interview(
+            conn,
             user_id,
             data.job_role,
             "mixed",
-            json.dumps(settings_data),
+            settings_data,
             data.overall_score,
             data.duration_minutes,
-            json.dumps(data.questions),
-            json.dumps(data.answers),
+            data.questions,
+            data.answers,
             data.feedback,
-            json.dumps(data.suggestions),
-            json.dumps(data.category_scores),
-            "completed"
+            data.suggestions,
+            data.category_scores
         )
         return {"message": f"Interview results for user {user_id} saved successfully!", "data": dict(new_record)}
     except Exception as e:
@@ -748,94 +1025,481 @@ async def save_job(
     conn: asyncpg.Connection = Depends(get_db_connection)
 ):
     try:
-        existing_job = await conn.fetchrow(
-            "SELECT id FROM saved_jobs WHERE user_id = $1 AND job_title = $2 AND company = $3",
-            user_id, data.job_title, data.company_name
+        inserted = await db.upsert_saved_job(
+            conn, user_id, data.job_title, data.company_name, data.location, data.job_url, data.application_status
         )
-        if existing_job:
+        if not inserted:
             return {"message": "Job already saved."}
-
-        await conn.execute(
-            """
-            INSERT INTO saved_jobs (user_id, job_title, company, location, external_url, application_status)
-            VALUES ($1, $2, $3, $4, $5, $6)
-            """,
-            user_id, data.job_title, data.company_name, data.location, data.job_url, data.application_status
-        )
         return {"message": f"Job saved successfully for user {user_id}!"}
     except Exception as e:
         print(f"Error saving job for user {user_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/resume-builder/rewrite-description/")
+@app.get("/history/stats")
+async def get_history_stats(
+    user_id: str = Depends(get_current_user_id),
+    conn: asyncpg.Connection = Depends(get_db_connection)
+):
+    try:
+        return await db.fetch_user_stats(conn, user_id)
+    except Exception as e:
+        print(f"Error loading history stats for user {user_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/history/{kind}")
+async def list_history(
+    kind: str,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    user_id: str = Depends(get_current_user_id),
+    conn: asyncpg.Connection = Depends(get_db_connection)
+):
+    """One page of summaries (analyses, tests, interviews or jobs), newest first; pass `next_cursor` back for the next page."""
+    if kind not in db.HISTORY_SUMMARY_COLUMNS:
+        raise HTTPException(status_code=404, detail=f"Unknown history type '{kind}'.")
+    try:
+        items, next_cursor = await db.fetch_history_page(conn, kind, user_id, limit, cursor)
+        return {"items": items, "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"Error loading {kind} history for user {user_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/history/{kind}/{item_id}")
+async def get_history_item(
+    kind: str,
+    item_id: str,
+    user_id: str = Depends(get_current_user_id),
+    conn: asyncpg.Connection = Depends(get_db_connection)
+):
+    if kind not in db.HISTORY_SUMMARY_COLUMNS:
+        raise HTTPException(status_code=404, detail=f"Unknown history type '{kind}'.")
+    try:
+        record_id = uuid.UUID(item_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Record not found.")
+    try:
+        item = await db.fetch_history_item(conn, kind, user_id, record_id)
+    except Exception as e:
+        print(f"Error loading {kind} item {item_id} for user {user_id}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to load the record.")
+    if item is None:
+        raise HTTPException(status_code=404, detail="Record not found.")
+    return item
+
+
+# --- Bulk Matching Jobs ---
+def parse_match_weights(weights: Optional[str]) -> Optional[Dict[str, float]]:
+    if not weights:
+        return None
+    try:
+        parsed = {k: float(v) for k, v in json.loads(weights).items()}
+    except (ValueError, TypeError, AttributeError):
+        raise HTTPException(status_code=400, detail="weights must be a JSON object of numbers.")
+    if set(parsed) != {"skills", "semantic", "experience"} or min(parsed.values()) < 0 or sum(parsed.values()) <= 0:
+        raise HTTPException(status_code=400, detail="weights needs non-negative 'skills', 'semantic' and 'experience' values.")
+    total = sum(parsed.values())
+    return {k: v / total for k, v in parsed.items()}
+
+async def load_owned_match_job(conn, job_id: str, user_id: str) -> dict:
+    try:
+        job = await db.get_match_job(conn, uuid.UUID(job_id))
+    except ValueError:
+        job = None
+    if job is None or job["user_id"] != user_id:
+        raise HTTPException(status_code=404, detail="Match job not found.")
+    return job
+
+def match_job_status(job: dict) -> dict:
+    done = job["completed_items"] + job["failed_items"]
+    return {
+        "job_id": str(job["id"]),
+        "status": job["status"],
+        "total_items": job["total_items"],
+        "completed_items": job["completed_items"],
+        "failed_items": job["failed_items"],
+        "progress": round(done / job["total_items"], 4) if job["total_items"] else 1.0,
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+
+@app.post("/match/jobs")
+@limiter.limit("5 per minute")
+async def submit_match_job(
+    request: Request,
+    jd_text: str = Form(...),
+    files: List[UploadFile] = File(...),
+    required_years: int = Form(0),
+    weights: Optional[str] = Form(None),
+    user_id: str = Depends(get_current_user_id)
+):
+    """Queue a JD against many resumes; poll /match/jobs/{id} or stream /match/jobs/{id}/events for progress."""
+    if db_pool is None:
+        raise HTTPException(status_code=500, detail="Database connection pool is not initialized.")
+    if len(files) > MATCH_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {MATCH_MAX_FILES} files per job.")
+    for file in files:
+        validate_file(file)
+    parsed_weights = parse_match_weights(weights)
+    try:
+        job_id = await match_runner.submit(user_id, jd_text, files, parsed_weights, required_years)
+    except Exception as e:
+        print(f"Error submitting match job for user {user_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"job_id": job_id, "status": "queued", "total_items": len(files)}
+
+@app.get("/match/jobs/{job_id}")
+async def get_match_job_status(
+    job_id: str,
+    user_id: str = Depends(get_current_user_id),
+    conn: asyncpg.Connection = Depends(get_db_connection)
+):
+    return match_job_status(await load_owned_match_job(conn, job_id, user_id))
+
+@app.get("/match/jobs/{job_id}/events")
+async def stream_match_job_events(job_id: str, request: Request, user_id: str = Depends(get_current_user_id)):
+    if db_pool is None:
+        raise HTTPException(status_code=500, detail="Database connection pool is not initialized.")
+    async with db_pool.acquire() as conn:
+        job = await load_owned_match_job(conn, job_id, user_id)
+
+    async def progress_events() -> AsyncGenerator[str, None]:
+        last, last_change = None, time.monotonic()
+        while not await request.is_disconnected():
+            async with db_pool.acquire() as conn:
+                current = match_job_status(await db.get_match_job(conn, job["id"]))
+            snapshot = (current["status"], current["completed_items"], current["failed_items"])
+            if snapshot != last:
+                last, last_change = snapshot, time.monotonic()
+                yield sse_event(jsonable_encoder(current), event="progress")
+            if current["status"] == "completed":
+                yield sse_event(jsonable_encoder(current), event="done")
+                return
+            if time.monotonic() - last_change > MATCH_PROGRESS_STALL_SECONDS:
+                yield sse_event(jsonable_encoder(current), event="stalled")
+                return
+            await asyncio.sleep(MATCH_PROGRESS_POLL_SECONDS)
+
+    return StreamingResponse(
+        progress_events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/match/jobs/{job_id}/results")
+async def get_match_job_results(
+    job_id: str,
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    user_id: str = Depends(get_current_user_id),
+    conn: asyncpg.Connection = Depends(get_db_connection)
+):
+    """Finished candidates ranked by final score; failed files sort last with their error."""
+    job = await load_owned_match_job(conn, job_id, user_id)
+    results = await db.fetch_match_job_results(conn, job["id"], limit, offset)
+    return {**match_job_status(job), "offset": offset, "limit": limit, "results": results}
+
+@app.post("/match/reverse")
 @limiter.limit("10 per minute")
-async def rewrite_description(request: Request, data: RewriteRequest, user_id: str = Depends(get_current_user_id)):
+async def reverse_match(
+    request: Request,
+    jobs: str = Form(...),
+    weights: Optional[str] = Form(None),
+    file: UploadFile = Depends(validate_file),
+    user_id: str = Depends(get_current_user_id)
+):
+    """
+    Rank many job descriptions (`jobs`: JSON list of {id, title, description})
+    against one resume. The resume is prepared once and prepared JDs are cached
+    by content hash, so each extra JD costs one slice of a batched similarity.
+    """
     try:
-        model = genai.GenerativeModel('gemini-2.5-pro')
-        prompt = f"""
-        As an expert resume writer, rewrite the following job description for a '{data.title}' position to be more impactful and action-oriented. 
+        parsed_jobs = [ReverseMatchJob(**job) for job in json.loads(jobs)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="jobs must be a JSON list of {id, title, description} objects.")
+    if not 1 <= len(parsed_jobs) <= REVERSE_MATCH_MAX_JDS:
+        raise HTTPException(status_code=400, detail=f"Send between 1 and {REVERSE_MATCH_MAX_JDS} jobs.")
+    parsed_weights = parse_match_weights(weights)
+
+    # Preparing the resume and each uncached JD costs LLM calls, so charge one unit for each
+    # and cap new JDs at what the per-user burst can ever admit.
+    uncached = len({prepared_jds.key(job.description) for job in parsed_jobs
+                    if not prepared_jds.cached(job.description)})
+    max_uncached = int(admission_controller.user_burst) - 1
+    if uncached > max_uncached:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {max_uncached} new job descriptions per request; {uncached} were sent."
+        )
+    charge_llm_budget(user_id, uncached + 1)
+
+    temp_path = None
+    llm_slot = await acquire_llm_slot(user_id, STANDARD, cost=0)
+    try:
+        temp_path = save_upload_to_temp(file)
+        ranked = await match_runner.run_in_worker(
+            match_resume_to_jds, temp_path, [job.description for job in parsed_jobs], parsed_weights
+        )
+    except Exception as e:
+        print(f"Error in reverse match for user {user_id}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to match the resume against the jobs.")
+    finally:
+        llm_slot.release()
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    for row in ranked["results"]:
+        job = parsed_jobs[row.pop("index")]
+        row["id"], row["title"] = job.id, job.title
+    return ranked
+
+
+def build_rewrite_prompt(title: str, description: str) -> str:
+    return f"""
+        As an expert resume writer, rewrite the following job description for a '{title}' position to be more impactful and action-oriented. 
         Focus on achievements and quantifiable results. Use strong action verbs and concise language.
         Return only the rewritten description as a plain text response, with each point on a new line.
 
         Original Description:
-        {data.description}
+        {description}
 
         Rewritten Description:
         """
-        response = model.generate_content(prompt)
+
+@app.post("/resume-builder/rewrite-description/")
+@limiter.limit("10 per minute")
+async def rewrite_description(
+    request: Request,
+    data: RewriteRequest,
+    user_id: str = Depends(get_current_user_id),
+    llm_slot: Ticket = Depends(llm_admission(INTERACTIVE))
+):
+    try:
+        model = genai.GenerativeModel('gemini-2.5-pro')
+        prompt = build_rewrite_prompt(data.title, data.description)
+        with usage_recorder.call("rewrite-description", user_id, model) as call:
+            response = model.generate_content(prompt)
+            call.set_usage(response)
         return {"rewritten_description": response.text}
     except Exception as e:
         print(f"Error during description rewrite for user {user_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to rewrite description: {str(e)}")
 
-@app.post("/resume-builder/save")
-async def save_resume_data(data: ResumeSaveData, user_id: str = Depends(get_current_user_id)):
-    print(f"Saving resume for user {user_id}:", data.dict())
-    return {"message": "Resume saved successfully"}
+async def rewrite_batch_streamer(groups: Dict[tuple, List[int]], user_id: str) -> AsyncGenerator[str, None]:
+    model = genai.GenerativeModel('gemini-2.5-pro')
+    semaphore = asyncio.Semaphore(REWRITE_BATCH_CONCURRENCY)
+
+    async def rewrite(title: str, description: str) -> str:
+        async with semaphore:
+            ticket = await acquire_llm_slot(user_id, INTERACTIVE, cost=0)
+            try:
+                with usage_recorder.call("rewrite-description-batch", user_id, model) as call:
+                    response = await model.generate_content_async(build_rewrite_prompt(title, description))
+                    call.set_usage(response)
+                return response.text
+            finally:
+                ticket.release()
+
+    tasks = {asyncio.create_task(rewrite(*key)): indices for key, indices in groups.items()}
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                try:
+                    rewritten = task.result()
+                except HTTPException as e:
+                    for index in tasks[task]:
+                        yield sse_event({"index": index, "message": e.detail}, event="item_error")
+                    continue
+                except Exception as e:
+                    print(f"Error during batch description rewrite for user {user_id}: {e}")
+                    for index in tasks[task]:
+                        yield sse_event({"index": index, "message": "Failed to rewrite description."}, event="item_error")
+                    continue
+                for index in tasks[task]:
+                    yield sse_event({"index": index, "rewritten_description": rewritten}, event="item")
+        yield sse_event({"items": sum(len(i) for i in groups.values()), "unique": len(groups)}, event="done")
+    finally:
+        for task in pending:
+            task.cancel()
 
-@app.get("/resume-builder/load")
-async def load_resume_data(user_id: str = Depends(get_current_user_id)):
-    mock_data = {
-        "personalInfo": {"name": "John Doe", "email": "john.doe@example.com"},
-        "experience": [],
-        "education": [],
-        "skills": []
-    }
-    return mock_data
+@app.post("/resume-builder/rewrite-descriptions/")
+@limiter.limit("10 per minute")
+async def rewrite_descriptions_batch(request: Request, data: RewriteBatchRequest, user_id: str = Depends(get_current_user_id)):
+    """
+    Rewrites several descriptions concurrently and streams them back as SSE
+    `item` events (tagged with the request index) in completion order. Identical
+    title/description pairs are rewritten once.
+    """
+    if not data.items or len(data.items) > REWRITE_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Send between 1 and {REWRITE_BATCH_MAX_ITEMS} items.")
+    groups: Dict[tuple, List[int]] = {}
+    for index, item in enumerate(data.items):
+        groups.setdefault((item.title.strip(), item.description.strip()), []).append(index)
+
+    # One budget unit per unique rewrite, capped at the burst so a full batch is always admissible.
+    charge_llm_budget(user_id, min(len(groups), int(admission_controller.user_burst)))
+    return StreamingResponse(
+        relay_until_disconnect(rewrite_batch_streamer(groups, user_id), request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# --- Resume Builder Storage ---
+EMPTY_RESUME_DOCUMENT = ResumeSaveData(personalInfo={}, experience=[], education=[], skills=[]).dict()
+RESUME_CACHE_HEADERS = {"Cache-Control": "private, no-cache"}
+
+def resume_etag(version: int) -> str:
+    return f'"{version}"'
+
+def etag_versions(header: str) -> List[str]:
+    return [tag.strip().removeprefix("W/").strip('"') for tag in header.split(",")]
+
+def if_match_version(request: Request) -> Optional[int]:
+    """The version named in If-Match (0 = not saved yet); None when the header is absent or `*`."""
+    header = request.headers.get("if-match")
+    if header is None or header.strip() == "*":
+        return None
+    tag = etag_versions(header)[0]
+    if not tag.isdigit():
+        raise HTTPException(status_code=400, detail="If-Match must be an ETag returned by /resume-builder/load.")
+    return int(tag)
+
+def resume_conflict(current_version: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        detail="The resume was changed elsewhere. Reload it and apply your edits again.",
+        headers={"ETag": resume_etag(current_version)}
+    )
 
-@app.post("/resume-builder/improve-resume/")
-@limiter.limit("5 per minute")
-async def improve_resume_with_ai(request: Request, data: ResumeDataModel, user_id: str = Depends(get_current_user_id)):
+@app.get("/resume-builder/load")
+async def load_resume_data(
+    request: Request,
+    user_id: str = Depends(get_current_user_id),
+    conn: asyncpg.Connection = Depends(get_db_connection)
+):
+    """The saved document with its version as the ETag; a matching If-None-Match gets 304 without the body."""
     try:
-        model = genai.GenerativeModel('gemini-2.5-pro')
-        resume_json_str = data.json()
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            version = await db.fetch_resume_document_version(conn, user_id)
+            if str(version) in etag_versions(if_none_match):
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED,
+                                headers={"ETag": resume_etag(version), **RESUME_CACHE_HEADERS})
+        row = await db.fetch_resume_document_text(conn, user_id)
+    except Exception as e:
+        print(f"Error loading resume for user {user_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    if row is None:
+        return JSONResponse(EMPTY_RESUME_DOCUMENT, headers={"ETag": resume_etag(0), **RESUME_CACHE_HEADERS})
+    return Response(content=row["document"], media_type="application/json",
+                    headers={"ETag": resume_etag(row["version"]), **RESUME_CACHE_HEADERS})
 
-        prompt = f"""
-        **Task:** You are an expert career coach and professional resume writer. Your task is to analyze the provided resume JSON data and improve its content for clarity, impact, and professionalism.
+@app.post("/resume-builder/save")
+async def save_resume_data(
+    request: Request,
+    response: Response,
+    data: ResumeSaveData,
+    user_id: str = Depends(get_current_user_id),
+    conn: asyncpg.Connection = Depends(get_db_connection)
+):
+    """
+    Replaces the whole document. With If-Match it only succeeds if the stored
+    version still matches (412 otherwise); without it the write is unconditional.
+    """
+    expected_version = if_match_version(request)
+    try:
+        version = await db.save_resume_document(conn, user_id, data.dict(), expected_version)
+        if version is None:
+            raise resume_conflict(await db.fetch_resume_document_version(conn, user_id))
+    except HTTPException as http_exc:
+        raise http_exc
+    except Exception as e:
+        print(f"Error saving resume for user {user_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    response.headers["ETag"] = resume_etag(version)
+    return {"message": "Resume saved successfully", "version": version}
 
-        **Instructions:**
-        1.  **Rewrite for Impact:** For the `summary` and each `description` in the `experience` and `projects` sections, rewrite the text to be more action-oriented and results-driven. Use the STAR (Situation, Task, Action, Result) method where applicable. Incorporate quantifiable metrics if possible (you can infer reasonable metrics if none are provided, e.g., "improved performance by 15%").
-        2.  **Maintain Structure:** You MUST return the data in the exact same JSON format as the input. Do not add, remove, or rename any keys. The `id` for each item must remain unchanged.
-        3.  **No New Information:** Only enhance the existing text. Do not invent new jobs, skills, or projects.
-        4.  **Output:** Your entire response must be ONLY the modified JSON object, with no extra text, explanations, or markdown formatting like ```json.
+@app.patch("/resume-builder/document")
+async def patch_resume_data(
+    request: Request,
+    response: Response,
+    user_id: str = Depends(get_current_user_id),
+    conn: asyncpg.Connection = Depends(get_db_connection)
+):
+    """
+    Applies field-level edits for autosave: a JSON Merge Patch
+    (application/merge-patch+json) or a JSON Patch (application/json-patch+json).
+    If-Match with the current ETag is required; only the new version is returned.
+    """
+    expected_version = if_match_version(request)
+    if expected_version is None:
+        raise HTTPException(status_code=status.HTTP_428_PRECONDITION_REQUIRED,
+                            detail="Send If-Match with the ETag from /resume-builder/load.")
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type not in (MERGE_PATCH_CONTENT_TYPE, JSON_PATCH_CONTENT_TYPE):
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Send {MERGE_PATCH_CONTENT_TYPE} or {JSON_PATCH_CONTENT_TYPE}.",
+            headers={"Accept-Patch": f"{MERGE_PATCH_CONTENT_TYPE}, {JSON_PATCH_CONTENT_TYPE}"}
+        )
+    try:
+        patch = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="The patch is not valid JSON.")
 
-        ---
-        **ORIGINAL RESUME DATA (JSON):**
-        {resume_json_str}
-        ---
+    try:
+        row = await db.fetch_resume_document(conn, user_id)
+        current_version = row["version"] if row else 0
+        if current_version != expected_version:
+            raise resume_conflict(current_version)
+        document = row["document"] if row else EMPTY_RESUME_DOCUMENT
+        try:
+            if content_type == MERGE_PATCH_CONTENT_TYPE:
+                patched = apply_merge_patch(document, patch)
+            else:
+                patched = apply_json_patch(document, patch)
+            patched = ResumeSaveData(**patched).dict()
+        except (PatchError, ValueError, TypeError) as e:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Patch could not be applied: {e}")
+        version = await db.save_resume_document(conn, user_id, patched, expected_version)
+        if version is None:
+            raise resume_conflict(await db.fetch_resume_document_version(conn, user_id))
+    except HTTPException as http_exc:
+        raise http_exc
+    except Exception as e:
+        print(f"Error patching resume for user {user_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    response.headers["ETag"] = resume_etag(version)
+    return {"version": version}
 
-        **IMPROVED RESUME DATA (JSON):**
-        """
-        
-        response = model.generate_content(prompt)
-        
-        json_response_text = response.text.strip().lstrip("```json").rstrip("```").strip()
-        improved_data = json.loads(json_response_text)
-        
-        validated_data = ResumeDataModel(**improved_data)
-        
-        return validated_data
+@app.post("/resume-builder/improve-resume/")
+@limiter.limit("5 per minute")
+async def improve_resume_with_ai(
+    request: Request,
+    response: Response,
+    data: ResumeDataModel,
+    user_id: str = Depends(get_current_user_id)
+):
+    """
+    Improves the summary and each experience and project description as separate
+    calls, reusing cached rewrites for sections that have not changed.
+    """
+    try:
+        model = genai.GenerativeModel('gemini-2.5-pro')
+        # One budget unit per section that misses the cache, capped at the burst so any resume is admissible;
+        # each section call still needs its own slot.
+        merged, stats = await improve_resume_sections(
+            model, data.dict(), user_id, lambda: acquire_llm_slot(user_id, STANDARD, cost=0),
+            charge=lambda count: charge_llm_budget(user_id, min(count, int(admission_controller.user_burst)))
+        )
+        response.headers["X-Sections-Cached"] = f"{stats['cached']}/{stats['sections']}"
+        return ResumeDataModel(**merged)
+    except HTTPException as http_exc:
+        raise http_exc
     except Exception as e:
         print(f"Error during AI resume improvement for user {user_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to improve resume with AI: {str(e)}")
\ No newline at end of file
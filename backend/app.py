@@ -2,6 +2,8 @@
 import streamlit as st
 from utils import save_upload_to_temp
 from matcher import score_resume_vs_jd
+from result_store import CandidateResultStore
+from cascade import CASCADE_TOP_M, cascade_rank
 import pandas as pd
 import altair as alt
 import os
@@ -29,6 +31,11 @@ if normalize_weights <= 0:
     st.sidebar.error("Weights must sum > 0")
 weights = {"skills": w_skills/normalize_weights, "semantic": w_sem/normalize_weights, "experience": w_exp/normalize_weights}
 
+st.sidebar.markdown("---")
+cascade_mode = st.sidebar.checkbox("Cascade mode (screen first)", value=False,
+                                   help="Score everyone with a fast embedding + skill screen, then run the full analysis only on the top candidates.")
+cascade_top_m = st.sidebar.number_input("Finalists for full analysis", min_value=1, value=CASCADE_TOP_M, disabled=not cascade_mode)
+
 st.sidebar.markdown("---")
 st.sidebar.info("Tip: Increase semantic weight for deeper contextual matches; increase skills weight to favor explicit skill overlap.")
 
@@ -46,82 +53,35 @@ if analyze_btn:
         st.error("Please provide a job description and at least one resume.")
     else:
         st.info("Processing — this may take a minute for many resumes. Models are cached after first load.")
-        results = []
+        # Scores and skills are kept as columns; each candidate's preview and LLM
+        # suggestions go to a detail file and are only read back when opened.
+        store = CandidateResultStore()
         tmpfiles = []
+        screened_out = []
         start_time = time.time()
-        for u in uploaded:
-            tmp_path = save_upload_to_temp(u)
-            tmpfiles.append(tmp_path)
-            try:
-                r = score_resume_vs_jd(tmp_path, jd_text, weights=weights, required_years=required_years)
-                r["candidate"] = os.path.basename(tmp_path)
-                results.append(r)
-            except Exception as e:
-                st.error(f"Failed to process {u.name}: {e}")
-
-        # sort by final_score_pct
-        df = pd.DataFrame([{
-            "candidate": r["candidate"],
-            "final_score": r["final_score_pct"],
-            "semantic": r["semantic_score_norm"],
-            "skills": r["skill_overlap_pct"],
-            "experience": r["experience_match_pct"],
-            "years": r["years_experience"]
-        } for r in results]).sort_values("final_score", ascending=False).reset_index(drop=True)
-
-        st.subheader("📋 Leaderboard")
-        st.dataframe(df, use_container_width=True)
-
-        st.subheader("📈 Score Comparison")
-        chart = alt.Chart(df).transform_fold(
-            ["final_score", "semantic", "skills", "experience"],
-            as_=['metric', 'value']
-        ).mark_bar().encode(
-            x='candidate:N',
-            y=alt.Y('value:Q', title='Percentage'),
-            color='metric:N',
-            tooltip=['candidate', 'metric', 'value']
-        ).properties(height=350)
-        st.altair_chart(chart, use_container_width=True)
-
-        # show best candidate deep-dive
-        if results:
-            best = sorted(results, key=lambda x: x["final_score_pct"], reverse=True)[0]
-            st.subheader(f"🏆 Best Match — {best['candidate']} ({best['final_score_pct']}%)")
-
-            col1, col2 = st.columns([2,1])
-            with col1:
-                st.markdown("**Resume Preview (expanded acronyms)**")
-                st.text_area("Resume preview", value=best["resume_preview"], height=300)
-
-                st.markdown("**Top snippet alignments (JD ↔ Resume)**")
-                for m in best["top_matches"][:6]:
-                    st.markdown(f"- **JD snippet:** {m['jd_snippet'][:200]}...")
-                    st.markdown(f"  - Resume: {m['resume_snippet'][:200]}...  (score {m['score']})")
-                    st.markdown("---")
-
-            with col2:
-                st.metric("Final Score", f"{best['final_score_pct']}%")
-                st.metric("Semantic", f"{best['semantic_score_norm']}%")
-                st.metric("Skill Overlap", f"{best['skill_overlap_pct']}%")
-                st.metric("Experience Match", f"{best['experience_match_pct']}%")
-                st.markdown("**Extracted Resume Skills**")
-                st.write(best["resume_skills"][:60])
-                st.markdown("**Extracted JD Skills**")
-                st.write(best["jd_skills"][:60])
-
-                st.markdown("**Missing skills prioritized (LLM)**")
-                for ln in best["missing_skills_ranked"][:8]:
-                    st.write("-", ln)
-
-                st.markdown("**Top suggested bullet points (for missing skills)**")
-                for skill, bullets in best["bullet_suggestions"].items():
-                    st.write(f"**{skill}**")
-                    for b in bullets:
-                        st.write("-", b)
-
-                st.markdown("**3-Month Prioritized Learning Plan (LLM)**")
-                st.write(best["learning_plan"][:1000] + ("..." if len(best["learning_plan"])>1000 else ""))
+        if cascade_mode:
+            for u in uploaded:
+                tmpfiles.append(save_upload_to_temp(u))
+            finalists, screened_out, stats = cascade_rank(
+                [(os.path.basename(p), p) for p in tmpfiles], jd_text, weights=weights,
+                required_years=required_years, top_m=int(cascade_top_m)
+            )
+            for r in finalists:
+                store.add(r)
+            for r in screened_out:
+                if r.error is not None:
+                    st.error(f"Failed to process {r.source}: {r.error}")
+            st.info(f"Screened {stats['candidates']} resumes in {stats['screen_seconds']}s; "
+                    f"fully analysed {stats['finalists']} in {stats['final_seconds']}s.")
+        else:
+            for u in uploaded:
+                tmp_path = save_upload_to_temp(u)
+                tmpfiles.append(tmp_path)
+                try:
+                    r = score_resume_vs_jd(tmp_path, jd_text, weights=weights, required_years=required_years)
+                    store.add(r, candidate=os.path.basename(tmp_path))
+                except Exception as e:
+                    st.error(f"Failed to process {u.name}: {e}")
 
         # cleanup temp files
         for p in tmpfiles:
@@ -130,4 +90,89 @@ if analyze_btn:
             except:
                 pass
 
+        previous = st.session_state.get("result_store")
+        if previous is not None:
+            previous.close()
+        st.session_state["result_store"] = store
+        st.session_state["screened_out"] = [r.summary() for r in screened_out]
         st.success(f"Analysis done in {round(time.time()-start_time,2)}s")
+
+store = st.session_state.get("result_store")
+if store is not None and len(store):
+    st.subheader("📋 Leaderboard")
+    col_a, col_b, col_c = st.columns([1, 2, 1])
+    min_score = col_a.slider("Minimum final score", 0.0, 100.0, 0.0)
+    must_have = col_b.multiselect("Must have skills", store.vocabulary.names)
+    show_top = col_c.number_input("Show top", min_value=1, value=min(len(store), 100))
+    rows = store.top_n(int(show_top), mask=store.filter(min_score=min_score, required_skills=must_have))
+
+    df = store.to_frame(rows).rename(columns={
+        "final_score_pct": "final_score",
+        "semantic_score_norm": "semantic",
+        "skill_overlap_pct": "skills",
+        "experience_match_pct": "experience",
+        "years_experience": "years",
+    })
+    st.dataframe(df, use_container_width=True)
+    screened_out = st.session_state.get("screened_out")
+    if screened_out:
+        with st.expander(f"Screened out or failed ({len(screened_out)})"):
+            st.dataframe(pd.DataFrame(screened_out), use_container_width=True)
+    try:
+        with tempfile.NamedTemporaryFile(suffix=".parquet") as f:
+            store.to_parquet(f.name)
+            st.download_button("Download all results (Parquet)", f.read(), file_name="rexai_results.parquet")
+    except ImportError:
+        st.caption("Install pyarrow to export results as Parquet.")
+
+    st.subheader("📈 Score Comparison")
+    chart = alt.Chart(df).transform_fold(
+        ["final_score", "semantic", "skills", "experience"],
+        as_=['metric', 'value']
+    ).mark_bar().encode(
+        x='candidate:N',
+        y=alt.Y('value:Q', title='Percentage'),
+        color='metric:N',
+        tooltip=['candidate', 'metric', 'value']
+    ).properties(height=350)
+    st.altair_chart(chart, use_container_width=True)
+
+    # deep-dive into one candidate, the best match by default
+    if len(rows):
+        opened = st.selectbox("Open candidate", rows.tolist(), format_func=lambda i: store.candidates[i])
+        best = store.result(opened)
+        st.subheader(f"🏆 {best['candidate']} ({best['final_score_pct']}%)")
+
+        col1, col2 = st.columns([2,1])
+        with col1:
+            st.markdown("**Resume Preview (expanded acronyms)**")
+            st.text_area("Resume preview", value=best["resume_preview"], height=300)
+
+            st.markdown("**Top snippet alignments (JD ↔ Resume)**")
+            for m in best["top_matches"][:6]:
+                st.markdown(f"- **JD snippet:** {m['jd_snippet'][:200]}...")
+                st.markdown(f"  - Resume: {m['resume_snippet'][:200]}...  (score {m['score']})")
+                st.markdown("---")
+
+        with col2:
+            st.metric("Final Score", f"{best['final_score_pct']}%")
+            st.metric("Semantic", f"{best['semantic_score_norm']}%")
+            st.metric("Skill Overlap", f"{best['skill_overlap_pct']}%")
+            st.metric("Experience Match", f"{best['experience_match_pct']}%")
+            st.markdown("**Extracted Resume Skills**")
+            st.write(best["resume_skills"][:60])
+            st.markdown("**Extracted JD Skills**")
+            st.write(best["jd_skills"][:60])
+
+            st.markdown("**Missing skills prioritized (LLM)**")
+            for ln in best["missing_skills_ranked"][:8]:
+                st.write("-", ln)
+
+            st.markdown("**Top suggested bullet points (for missing skills)**")
+            for skill, bullets in best["bullet_suggestions"].items():
+                st.write(f"**{skill}**")
+                for b in bullets:
+                    st.write("-", b)
+
+            st.markdown("**3-Month Prioritized Learning Plan (LLM)**")
+            st.write(best["learning_plan"][:1000] + ("..." if len(best["learning_plan"])>1000 else ""))
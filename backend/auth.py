@@ -0,0 +1,197 @@
+# backend/auth.py
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+import jwt
+
+JWKS_REFRESH_SECONDS = int(os.getenv("JWKS_REFRESH_SECONDS", "600"))
+JWKS_MIN_REFETCH_SECONDS = int(os.getenv("JWKS_MIN_REFETCH_SECONDS", "30"))
+VERIFIED_TOKEN_CACHE_SIZE = int(os.getenv("VERIFIED_TOKEN_CACHE_SIZE", "10000"))
+JWT_LEEWAY_SECONDS = int(os.getenv("JWT_LEEWAY_SECONDS", "5"))
+JWT_ALGORITHMS = ["RS256"]
+
+
+class AuthError(Exception):
+    pass
+
+
+class KeysUnavailable(AuthError):
+    """The signing keys could not be fetched; the token itself may be fine."""
+
+
+def fetch_jwks_over_http(url: str) -> dict:
+    with urllib.request.urlopen(url, timeout=10) as response:
+        return json.loads(response.read())
+
+
+class JWKSCache:
+    """
+    Signing keys by `kid`, refreshed in the background. A token with an unknown
+    `kid` triggers an immediate refetch, at most once every JWKS_MIN_REFETCH_SECONDS.
+    """
+
+    def __init__(self, jwks_url: str, fetcher: Callable[[str], dict] = fetch_jwks_over_http,
+                 refresh_seconds: int = JWKS_REFRESH_SECONDS, min_refetch_seconds: int = JWKS_MIN_REFETCH_SECONDS):
+        self.jwks_url = jwks_url
+        self.fetcher = fetcher
+        self.refresh_seconds = refresh_seconds
+        self.min_refetch_seconds = min_refetch_seconds
+        self._keys: Dict[str, jwt.PyJWK] = {}
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def refresh(self, force: bool = False):
+        async with self._lock:
+            if not force and time.monotonic() - self._fetched_at < self.min_refetch_seconds:
+                return
+            jwks = await asyncio.to_thread(self.fetcher, self.jwks_url)
+            keys = {}
+            for key_data in jwks.get("keys", []):
+                if key_data.get("use", "sig") != "sig" or "kid" not in key_data:
+                    continue
+                try:
+                    keys[key_data["kid"]] = jwt.PyJWK(key_data)
+                except jwt.PyJWKError as e:
+                    print(f"--- WARNING: skipping unusable JWKS key {key_data.get('kid')}: {e} ---")
+            self._keys = keys
+            self._fetched_at = time.monotonic()
+
+    async def get_key(self, kid: str) -> jwt.PyJWK:
+        key = self._keys.get(kid)
+        if key is None:
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"--- ERROR refreshing JWKS for unknown kid {kid}: {e} ---")
+                raise KeysUnavailable("Signing keys are unavailable; try again shortly.") from e
+            key = self._keys.get(kid)
+        if key is None:
+            raise AuthError("Unknown signing key.")
+        return key
+
+    async def run_refresher(self):
+        while True:
+            try:
+                await self.refresh(force=True)
+            except Exception as e:
+                print(f"--- ERROR refreshing JWKS: {e} ---")
+            await asyncio.sleep(self.refresh_seconds)
+
+
+class VerifiedTokenCache:
+    """Bounded LRU of verified claims keyed by token hash, valid until the token's `exp`."""
+
+    def __init__(self, max_entries: int = VERIFIED_TOKEN_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key_for(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token_key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(token_key)
+            if entry is None or entry[0] <= time.time():
+                if entry is not None:
+                    del self._entries[token_key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token_key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, token_key: str, claims: dict):
+        with self._lock:
+            self._entries[token_key] = (claims["exp"], claims)
+            self._entries.move_to_end(token_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class ClerkTokenVerifier:
+    def __init__(self, jwks: JWKSCache, token_cache: Optional[VerifiedTokenCache] = None,
+                 authorized_parties: Optional[list] = None):
+        self.jwks = jwks
+        self.token_cache = token_cache or VerifiedTokenCache()
+        self.authorized_parties = authorized_parties or []
+
+    async def verify(self, token: str) -> dict:
+        """Return the token's claims, from the cache when it was already verified and has not expired."""
+        token_key = VerifiedTokenCache.key_for(token)
+        claims = self.token_cache.get(token_key)
+        if claims is not None:
+            return claims
+
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+        except jwt.PyJWTError as e:
+            raise AuthError(f"Malformed token: {e}")
+        if not kid:
+            raise AuthError("Token has no key id.")
+        key = await self.jwks.get_key(kid)
+        try:
+            claims = jwt.decode(
+                token,
+                key.key,
+                algorithms=JWT_ALGORITHMS,
+                leeway=JWT_LEEWAY_SECONDS,
+                options={"require": ["exp", "sub"], "verify_aud": False},
+            )
+        except jwt.PyJWTError as e:
+            raise AuthError(f"Invalid token: {e}")
+        if self.authorized_parties and claims.get("azp") not in self.authorized_parties:
+            raise AuthError("Token was issued for an unauthorized party.")
+
+        self.token_cache.put(token_key, claims)
+        return claims
+
+
+if __name__ == "__main__":
+    # Auth overhead benchmark against a local JWKS stand-in: python auth.py
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from jwt.algorithms import RSAAlgorithm
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public_jwk = json.loads(RSAAlgorithm.to_jwk(private_key.public_key()))
+    public_jwk.update({"kid": "local-test-key", "use": "sig", "alg": "RS256"})
+    local_jwks = {"keys": [public_jwk]}
+
+    def make_token(sub):
+        claims = {"sub": sub, "iat": int(time.time()), "exp": int(time.time()) + 300}
+        return jwt.encode(claims, private_key, algorithm="RS256", headers={"kid": "local-test-key"})
+
+    async def bench():
+        verifier = ClerkTokenVerifier(JWKSCache("local://jwks", fetcher=lambda url: local_jwks))
+        tokens = [make_token(f"user_{i}") for i in range(200)]
+
+        start = time.perf_counter()
+        for token in tokens:
+            await verifier.verify(token)
+        cold = (time.perf_counter() - start) / len(tokens)
+
+        start = time.perf_counter()
+        for _ in range(25):
+            for token in tokens:
+                await verifier.verify(token)
+        warm = (time.perf_counter() - start) / (25 * len(tokens))
+
+        print(f"full verification: {cold * 1e6:,.1f} us/request")
+        print(f"cached token:      {warm * 1e6:,.1f} us/request")
+        print(f"token cache: {verifier.token_cache.stats()}")
+
+    asyncio.run(bench())
@@ -0,0 +1,204 @@
+# backend/cascade.py
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from matcher import EMBEDDER, extract_experience_years, extract_skills_dynamic, score_resume_vs_jd
+from model_utils import embed_texts
+from utils import chunk_text, clean_whitespace, extract_text_from_path
+
+CASCADE_TOP_M = int(os.getenv("CASCADE_TOP_M", "25"))
+# Candidates screening at or above this also go through, however many there are; unset disables it.
+CASCADE_ADVANCE_SCORE = float(os.environ["CASCADE_ADVANCE_SCORE"]) if os.getenv("CASCADE_ADVANCE_SCORE") else None
+# Candidates screening below this never go through, even to fill the top M.
+CASCADE_MIN_SCORE = float(os.getenv("CASCADE_MIN_SCORE", "0"))
+DEFAULT_WEIGHTS = {"skills": 0.35, "semantic": 0.45, "experience": 0.20}
+
+
+@dataclass
+class ScreenResult:
+    source: str
+    path: str
+    score: float = 0.0
+    semantic: float = 0.0
+    skill_overlap: float = 0.0
+    years: int = 0
+    matched_skills: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+    def summary(self) -> dict:
+        return {
+            "candidate": self.source,
+            "screen_score_pct": round(self.score * 100, 2),
+            "semantic_pct": round(self.semantic * 100, 2),
+            "skill_overlap_pct": round(self.skill_overlap * 100, 2),
+            "years_experience": self.years,
+            "error": self.error,
+        }
+
+
+# --- Stage One ---
+def _skill_patterns(skills: Sequence[str]):
+    return [(s, re.compile(r"(?<![\w+#])" + re.escape(s) + r"(?![\w+#])")) for s in skills]
+
+
+def screen(candidates: Sequence[Tuple[str, str]], jd_text: str, weights: Optional[dict] = None,
+           required_years: int = 0) -> Tuple[List[ScreenResult], List[str]]:
+    """
+    Cheap first pass over (source, path) pairs, with no per-candidate LLM or
+    cross-encoder calls. Semantic similarity mirrors the full pipeline (best
+    resume chunk per JD chunk, averaged) but uses bi-encoder cosine similarity,
+    computed for the whole batch with one embedding call and one matrix product.
+    Skill overlap matches the JD's skills, extracted once, as whole words in each
+    resume. Returns (results in input order, JD skills).
+    """
+    weights = weights or DEFAULT_WEIGHTS
+    jd_skills = extract_skills_dynamic(jd_text)
+    patterns = _skill_patterns(jd_skills)
+    jd_chunks = chunk_text(clean_whitespace(jd_text), max_words=60, overlap=10)
+
+    results, chunks, owners = [], [], []
+    for index, (source, path) in enumerate(candidates):
+        result = ScreenResult(source, path)
+        results.append(result)
+        try:
+            text = clean_whitespace(extract_text_from_path(path))
+        except Exception as e:
+            result.error = str(e) or type(e).__name__
+            continue
+        lowered = text.lower()
+        result.matched_skills = [skill for skill, pattern in patterns if pattern.search(lowered)]
+        result.skill_overlap = len(result.matched_skills) / (len(jd_skills) + 1e-6)
+        result.years = extract_experience_years(text, use_llm=False)
+        resume_chunks = chunk_text(text, max_words=90, overlap=20)
+        chunks.extend(resume_chunks)
+        owners.extend([index] * len(resume_chunks))
+
+    if chunks and jd_chunks:
+        embeddings = embed_texts(chunks + jd_chunks, model=EMBEDDER).astype(np.float32)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-12
+        similarity = embeddings[:len(chunks)] @ embeddings[len(chunks):].T
+        best = np.full((len(results), len(jd_chunks)), -1.0, dtype=np.float32)
+        np.maximum.at(best, np.asarray(owners), similarity)
+        semantic = np.clip(best.mean(axis=1), 0.0, 1.0)
+        for index in set(owners):
+            results[index].semantic = float(semantic[index])
+
+    for result in results:
+        if result.error is None:
+            if required_years:
+                exp_match = min(result.years / max(1, required_years), 1.0)
+            else:
+                exp_match = 1.0 if result.years else 0.0
+            result.score = (weights["skills"] * result.skill_overlap + weights["semantic"] * result.semantic
+                            + weights["experience"] * exp_match)
+    return results, jd_skills
+
+
+def select_finalists(scores: np.ndarray, top_m: int = CASCADE_TOP_M, advance_above: Optional[float] = CASCADE_ADVANCE_SCORE,
+                     min_score: float = CASCADE_MIN_SCORE) -> np.ndarray:
+    """Indices of the candidates that go on to the full pipeline, best screening score first."""
+    order = np.argsort(-scores, kind="stable")
+    chosen = np.zeros(len(scores), dtype=bool)
+    chosen[order[:top_m]] = True
+    if advance_above is not None:
+        chosen |= scores >= advance_above
+    chosen &= scores >= min_score
+    return order[chosen[order]]
+
+
+# --- Cascade ---
+def cascade_rank(candidates: Sequence[Tuple[str, str]], jd_text: str, weights: Optional[dict] = None,
+                 required_years: int = 0, top_m: int = CASCADE_TOP_M,
+                 advance_above: Optional[float] = CASCADE_ADVANCE_SCORE, min_score: float = CASCADE_MIN_SCORE,
+                 on_result: Optional[Callable[[str, dict], None]] = None):
+    """
+    Screen every candidate, then run score_resume_vs_jd (LLM expansion, spaCy,
+    cross-encoder) only on the finalists. Returns (full results ranked by final
+    score, screened-out ScreenResults ranked by screening score, stats). A
+    finalist whose full scoring fails goes back to the screened-out list with
+    its error set.
+    """
+    started = time.perf_counter()
+    screened, _ = screen(candidates, jd_text, weights, required_years)
+    scores = np.array([r.score if r.error is None else -1.0 for r in screened], dtype=np.float32)
+    finalist_rows = [i for i in select_finalists(scores, top_m, advance_above, min_score) if screened[i].error is None]
+    screen_seconds = time.perf_counter() - started
+
+    finalists, advanced = [], set()
+    for i in finalist_rows:
+        try:
+            result = score_resume_vs_jd(screened[i].path, jd_text, weights=weights, required_years=required_years)
+        except Exception as e:
+            screened[i].error = str(e) or type(e).__name__
+            continue
+        result["candidate"] = screened[i].source
+        result["screen_score_pct"] = round(screened[i].score * 100, 2)
+        finalists.append(result)
+        advanced.add(i)
+        if on_result is not None:
+            on_result(screened[i].source, result)
+    finalists.sort(key=lambda r: r["final_score_pct"], reverse=True)
+
+    screened_out = sorted((r for i, r in enumerate(screened) if i not in advanced), key=lambda r: r.score, reverse=True)
+    stats = {
+        "candidates": len(candidates),
+        "finalists": len(finalist_rows),
+        "failed": sum(r.error is not None for r in screened),
+        "screen_seconds": round(screen_seconds, 2),
+        "final_seconds": round(time.perf_counter() - started - screen_seconds, 2),
+    }
+    return finalists, screened_out, stats
+
+
+def recall_at_k(reference: dict, finalists: set, k: int) -> float:
+    """Share of the full pipeline's top `k` (source -> final score) that the screen let through."""
+    top = sorted(reference, key=reference.get, reverse=True)[:k]
+    return sum(source in finalists for source in top) / len(top) if top else 0.0
+
+
+if __name__ == "__main__":
+    # Recall of the screen against a full-pipeline ranking written by rank_resumes.py:
+    #   python rank_resumes.py jd.txt resumes/ --out full.csv
+    #   python cascade.py jd.txt resumes/ full.csv [--k 10] [--m 10,25,50,100]
+    import argparse
+    import csv
+    import shutil
+    import tempfile
+
+    from rank_resumes import iter_sources
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("jd")
+    parser.add_argument("input")
+    parser.add_argument("reference", help="CSV from rank_resumes.py run over the same input")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--m", default="10,25,50,100")
+    parser.add_argument("--required-years", type=int, default=0)
+    args = parser.parse_args()
+
+    with open(args.jd, encoding="utf-8") as f:
+        jd = f.read()
+    with open(args.reference, newline="", encoding="utf-8") as f:
+        reference = {r["source"]: float(r["final_score_pct"]) for r in csv.DictReader(f) if not r["error"]}
+
+    staging_dir = tempfile.mkdtemp(prefix="cascade_eval_")
+    try:
+        candidates = [(source, path) for source, path, _ in iter_sources(args.input, staging_dir, set())
+                      if source in reference]
+        started = time.perf_counter()
+        screened, _ = screen(candidates, jd, required_years=args.required_years)
+        elapsed = time.perf_counter() - started
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+    scores = np.array([r.score if r.error is None else -1.0 for r in screened], dtype=np.float32)
+    print(f"screened {len(screened)} resumes in {elapsed:.1f}s ({elapsed / max(1, len(screened)) * 1000:.1f} ms each)")
+    for m in (int(x) for x in args.m.split(",")):
+        finalists = {screened[i].source for i in select_finalists(scores, m, None, 0.0)}
+        print(f"  M={m:4d}: recall@{args.k} {recall_at_k(reference, finalists, args.k):.2f}, "
+              f"full-pipeline calls {len(finalists)}/{len(screened)}")
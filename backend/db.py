@@ -0,0 +1,656 @@
+# backend/db.py
+# Data-access layer for the API's Postgres tables.
+# Queries are module-level constants so asyncpg's per-connection statement cache
+# prepares each one once and reuses it. JSON/JSONB columns go through codecs
+# registered at connection init: pass Python objects, not json.dumps() strings.
+import base64
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Any, Iterable, List, Optional, Sequence
+
+import asyncpg
+
+from documents import compress_text, decompress_text, document_hash, normalize_text
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "5"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "20"))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "256"))
+DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", "30"))
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "migrations")
+
+
+# --- Pool & Codecs ---
+def _json_dumps(value: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(value).decode("utf-8")
+    return json.dumps(value)
+
+
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+
+async def init_connection(conn: asyncpg.Connection):
+    for type_name in ("json", "jsonb"):
+        await conn.set_type_codec(
+            type_name, encoder=_json_dumps, decoder=_json_loads, schema="pg_catalog"
+        )
+
+
+async def create_pool(dsn: str) -> asyncpg.Pool:
+    return await asyncpg.create_pool(
+        dsn=dsn,
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+        command_timeout=DB_COMMAND_TIMEOUT,
+        init=init_connection,
+    )
+
+
+# --- Queries ---
+UPSERT_DOCUMENT_SQL = """
+    INSERT INTO documents (content_hash, kind, codec, body, original_size)
+    VALUES ($1, $2, $3, $4, $5)
+    ON CONFLICT (content_hash) DO NOTHING
+"""
+
+INSERT_ANALYSIS_SQL = """
+    INSERT INTO rex_ai (
+        user_id, job_title, resume_document_hash, jd_document_hash, ai_score,
+        keyword_match_score, ats_score, suggestions, keywords_matched, keywords_missing
+    )
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+"""
+
+INSERT_MOCK_TEST_SQL = """
+    INSERT INTO mock_tests (
+        user_id, job_role, difficulty, overall_score, duration_minutes,
+        questions, answers, feedback, suggestions, category_scores, status
+    )
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)
+    RETURNING *
+"""
+
+INSERT_MOCK_INTERVIEW_SQL = """
+    INSERT INTO mock_interviews (
+        user_id, job_role, interview_type, settings, overall_score,
+        duration_minutes, questions, answers, feedback, suggestions,
+        category_scores, status
+    )
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12)
+    RETURNING *
+"""
+
+UPSERT_SAVED_JOB_SQL = """
+    INSERT INTO saved_jobs (user_id, job_title, company, location, external_url, application_status)
+    VALUES ($1, $2, $3, $4, $5, $6)
+    ON CONFLICT (user_id, job_title, company) DO NOTHING
+    RETURNING id
+"""
+
+
+async def upsert_document(conn, kind: str, text: str) -> str:
+    """Store text once under the SHA-256 of its normalized form and return that hash."""
+    normalized = normalize_text(text)
+    content_hash = document_hash(normalized)
+    codec, body = compress_text(normalized)
+    await conn.execute(UPSERT_DOCUMENT_SQL, content_hash, kind, codec, body, len(normalized))
+    return content_hash
+
+
+async def insert_analysis(conn, user_id: str, job_title: str, job_description: str, resume_text: str,
+                          ai_score: int, keyword_match_score: int, ats_score: int,
+                          suggestions: list, keywords_matched: list, keywords_missing: list):
+    async with conn.transaction():
+        resume_hash = await upsert_document(conn, "resume", resume_text)
+        jd_hash = await upsert_document(conn, "job_description", job_description)
+        await conn.execute(
+            INSERT_ANALYSIS_SQL,
+            user_id, job_title, resume_hash, jd_hash, ai_score,
+            keyword_match_score, ats_score, suggestions, keywords_matched, keywords_missing
+        )
+
+
+async def insert_mock_test(conn, user_id: str, job_role: str, difficulty: str, overall_score: int,
+                           duration_minutes: int, questions: list, answers: list, feedback: Optional[str],
+                           suggestions: Optional[list], category_scores: Optional[dict],
+                           status: str = "completed") -> asyncpg.Record:
+    return await conn.fetchrow(
+        INSERT_MOCK_TEST_SQL,
+        user_id, job_role, difficulty, overall_score, duration_minutes,
+        questions, answers, feedback, suggestions, category_scores, status
+    )
+
+
+async def insert_mock_interview(conn, user_id: str, job_role: str, interview_type: str, settings: dict,
+                                overall_score: int, duration_minutes: int, questions: list, answers: list,
+                                feedback: Optional[str], suggestions: Optional[list],
+                                category_scores: Optional[dict], status: str = "completed") -> asyncpg.Record:
+    return await conn.fetchrow(
+        INSERT_MOCK_INTERVIEW_SQL,
+        user_id, job_role, interview_type, settings, overall_score,
+        duration_minutes, questions, answers, feedback, suggestions, category_scores, status
+    )
+
+
+async def upsert_saved_job(conn, user_id: str, job_title: str, company: str, location: Optional[str],
+                           external_url: Optional[str], application_status: str) -> bool:
+    """Insert a saved job in one round-trip. Returns False if it was already saved."""
+    new_id = await conn.fetchval(
+        UPSERT_SAVED_JOB_SQL,
+        user_id, job_title, company, location, external_url, application_status
+    )
+    return new_id is not None
+
+
+# --- History (keyset pagination) ---
+# Summary projections leave out multi-KB text and JSON columns; full rows are
+# loaded one at a time through fetch_history_item.
+HISTORY_SUMMARY_COLUMNS = {
+    "analyses": ("rex_ai", "id, created_at, job_title, ai_score AS overall_score, keyword_match_score AS job_match, ats_score"),
+    "tests": ("mock_tests", "id, created_at, job_role, difficulty, overall_score, duration_minutes, status"),
+    "interviews": ("mock_interviews", "id, created_at, job_role, interview_type, overall_score, duration_minutes, status"),
+    "jobs": ("saved_jobs", "id, created_at, job_title, company, location, application_status"),
+}
+
+HISTORY_FIRST_PAGE_SQL = {
+    kind: f"""
+    SELECT {columns} FROM {table}
+    WHERE user_id = $1
+    ORDER BY created_at DESC, id DESC
+    LIMIT $2
+"""
+    for kind, (table, columns) in HISTORY_SUMMARY_COLUMNS.items()
+}
+
+HISTORY_NEXT_PAGE_SQL = {
+    kind: f"""
+    SELECT {columns} FROM {table}
+    WHERE user_id = $1 AND (created_at, id) < ($3, $4)
+    ORDER BY created_at DESC, id DESC
+    LIMIT $2
+"""
+    for kind, (table, columns) in HISTORY_SUMMARY_COLUMNS.items()
+}
+
+HISTORY_ITEM_SQL = {
+    kind: f"SELECT * FROM {table} WHERE id = $1 AND user_id = $2"
+    for kind, (table, _) in HISTORY_SUMMARY_COLUMNS.items()
+}
+HISTORY_ITEM_SQL["analyses"] = """
+    SELECT a.*,
+           rd.codec AS resume_codec, rd.body AS resume_body,
+           jd.codec AS jd_codec, jd.body AS jd_body
+    FROM rex_ai a
+    LEFT JOIN documents rd ON rd.content_hash = a.resume_document_hash
+    LEFT JOIN documents jd ON jd.content_hash = a.jd_document_hash
+    WHERE a.id = $1 AND a.user_id = $2
+"""
+
+USER_STATS_SQL = "SELECT * FROM user_activity_stats WHERE user_id = $1"
+
+
+def encode_cursor(created_at: datetime, row_id: Any) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str):
+    """Return (created_at, id) from an opaque cursor; raises ValueError if malformed."""
+    try:
+        created_at, row_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|", 1)
+        return datetime.fromisoformat(created_at), row_id
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+async def fetch_history_page(conn, kind: str, user_id: str, limit: int, cursor: Optional[str] = None):
+    """Return (rows, next_cursor) for one page of a user's history, newest first."""
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        rows = await conn.fetch(HISTORY_NEXT_PAGE_SQL[kind], user_id, limit + 1, created_at, row_id)
+    else:
+        rows = await conn.fetch(HISTORY_FIRST_PAGE_SQL[kind], user_id, limit + 1)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    return [dict(r) for r in rows], next_cursor
+
+
+async def fetch_history_item(conn, kind: str, user_id: str, item_id: str) -> Optional[dict]:
+    row = await conn.fetchrow(HISTORY_ITEM_SQL[kind], item_id, user_id)
+    if row is None:
+        return None
+    item = dict(row)
+    if kind == "analyses":
+        resume_codec, resume_body = item.pop("resume_codec"), item.pop("resume_body")
+        jd_codec, jd_body = item.pop("jd_codec"), item.pop("jd_body")
+        if resume_body is not None:
+            item["original_resume_text"] = decompress_text(resume_codec, resume_body)
+        if jd_body is not None:
+            item["job_description"] = decompress_text(jd_codec, jd_body)
+    return item
+
+
+async def fetch_user_stats(conn, user_id: str) -> dict:
+    row = await conn.fetchrow(USER_STATS_SQL, user_id)
+    if row is None:
+        return {"analyses_count": 0, "tests_count": 0, "interviews_count": 0, "saved_jobs_count": 0,
+                "average_analysis_score": None, "average_test_score": None, "average_interview_score": None}
+
+    def average(total, count):
+        return round(total / count, 2) if count else None
+
+    return {
+        "analyses_count": row["analyses_count"],
+        "tests_count": row["tests_count"],
+        "interviews_count": row["interviews_count"],
+        "saved_jobs_count": row["saved_jobs_count"],
+        "average_analysis_score": average(row["analyses_score_sum"], row["analyses_count"]),
+        "average_test_score": average(row["tests_score_sum"], row["tests_count"]),
+        "average_interview_score": average(row["interviews_score_sum"], row["interviews_count"]),
+        "updated_at": row["updated_at"],
+    }
+
+
+# --- Analysis Reuse ---
+INSERT_ANALYSIS_RESULT_SQL = """
+    INSERT INTO analysis_results (
+        user_id, resume_document_hash, jd_document_hash, result, jd_minhash, jd_lsh_bands, latency_ms
+    )
+    VALUES ($1, $2, $3, $4, $5, $6, $7)
+"""
+
+EXACT_ANALYSIS_RESULT_SQL = """
+    SELECT result, latency_ms
+    FROM analysis_results
+    WHERE user_id = $1 AND resume_document_hash = $2 AND jd_document_hash = $3
+      AND created_at > now() - make_interval(days => $4)
+    ORDER BY created_at DESC
+    LIMIT 1
+"""
+
+NEAR_ANALYSIS_CANDIDATES_SQL = """
+    SELECT result, latency_ms, jd_minhash
+    FROM analysis_results
+    WHERE user_id = $1 AND resume_document_hash = $2 AND jd_lsh_bands && $3::bigint[]
+      AND created_at > now() - make_interval(days => $4)
+    ORDER BY created_at DESC
+    LIMIT 50
+"""
+
+
+async def insert_analysis_result(conn, user_id: str, resume_text: str, jd_text: str, result: dict,
+                                 jd_minhash: List[int], jd_lsh_bands: List[int], latency_ms: float):
+    async with conn.transaction():
+        resume_hash = await upsert_document(conn, "resume", resume_text)
+        jd_hash = await upsert_document(conn, "job_description", jd_text)
+        await conn.execute(
+            INSERT_ANALYSIS_RESULT_SQL, user_id, resume_hash, jd_hash, result, jd_minhash, jd_lsh_bands, latency_ms
+        )
+
+
+async def fetch_exact_analysis_result(conn, user_id: str, resume_hash: str, jd_hash: str,
+                                      max_age_days: int) -> Optional[dict]:
+    row = await conn.fetchrow(EXACT_ANALYSIS_RESULT_SQL, user_id, resume_hash, jd_hash, max_age_days)
+    return dict(row) if row else None
+
+
+async def fetch_near_analysis_candidates(conn, user_id: str, resume_hash: str, jd_lsh_bands: List[int],
+                                         max_age_days: int) -> List[dict]:
+    rows = await conn.fetch(NEAR_ANALYSIS_CANDIDATES_SQL, user_id, resume_hash, jd_lsh_bands, max_age_days)
+    return [dict(r) for r in rows]
+
+
+# --- Mock Test Analytics ---
+TEST_CATEGORY_AVERAGES_SQL = """
+    SELECT c.key AS category, round(avg(c.value::numeric), 1) AS average_score, count(*) AS tests
+    FROM mock_tests t, jsonb_each_text(t.category_scores) c
+    WHERE t.user_id = $1 AND jsonb_typeof(t.category_scores) = 'object' AND c.value ~ '^-?[0-9]+(\\.[0-9]+)?$'
+    GROUP BY c.key
+    ORDER BY average_score
+"""
+
+TEST_DIFFICULTY_AVERAGES_SQL = """
+    SELECT difficulty, count(*) AS tests, round(avg(overall_score), 1) AS average_score, max(overall_score) AS best_score
+    FROM mock_tests
+    WHERE user_id = $1
+    GROUP BY difficulty
+    ORDER BY difficulty
+"""
+
+TEST_RECENT_SCORES_SQL = """
+    SELECT id, created_at, job_role, difficulty, overall_score
+    FROM mock_tests
+    WHERE user_id = $1
+    ORDER BY created_at DESC, id DESC
+    LIMIT $2
+"""
+
+
+# --- Resume Builder ---
+# Served as stored: ::text skips decoding the JSONB only to encode it again for the response.
+RESUME_DOCUMENT_TEXT_SQL = "SELECT document::text AS document, version FROM resume_builder_documents WHERE user_id = $1"
+RESUME_DOCUMENT_SQL = "SELECT document, version FROM resume_builder_documents WHERE user_id = $1"
+RESUME_DOCUMENT_VERSION_SQL = "SELECT version FROM resume_builder_documents WHERE user_id = $1"
+
+# $3 is the version the client last saw: NULL writes unconditionally, 0 only creates.
+SAVE_RESUME_DOCUMENT_SQL = """
+    INSERT INTO resume_builder_documents (user_id, document, version)
+    SELECT $1, $2, 1
+    WHERE $3::integer IS NULL OR $3 = 0
+    ON CONFLICT (user_id) DO UPDATE SET
+        document = EXCLUDED.document,
+        version = resume_builder_documents.version + 1,
+        updated_at = now()
+    WHERE $3 IS NULL OR resume_builder_documents.version = $3
+    RETURNING version
+"""
+
+UPDATE_RESUME_DOCUMENT_SQL = """
+    UPDATE resume_builder_documents
+    SET document = $2, version = version + 1, updated_at = now()
+    WHERE user_id = $1 AND version = $3
+    RETURNING version
+"""
+
+
+async def fetch_resume_document_text(conn, user_id: str) -> Optional[asyncpg.Record]:
+    return await conn.fetchrow(RESUME_DOCUMENT_TEXT_SQL, user_id)
+
+
+async def fetch_resume_document(conn, user_id: str) -> Optional[asyncpg.Record]:
+    return await conn.fetchrow(RESUME_DOCUMENT_SQL, user_id)
+
+
+async def fetch_resume_document_version(conn, user_id: str) -> int:
+    """Current version, 0 if the user has never saved."""
+    return await conn.fetchval(RESUME_DOCUMENT_VERSION_SQL, user_id) or 0
+
+
+async def save_resume_document(conn, user_id: str, document: dict, expected_version: Optional[int]) -> Optional[int]:
+    """Write the whole document; returns the new version, or None if it is no longer at `expected_version`."""
+    if expected_version:
+        return await conn.fetchval(UPDATE_RESUME_DOCUMENT_SQL, user_id, document, expected_version)
+    return await conn.fetchval(SAVE_RESUME_DOCUMENT_SQL, user_id, document, expected_version)
+
+
+async def fetch_test_analytics(conn, user_id: str, recent: int = 20) -> dict:
+    """Per-category and per-difficulty averages plus the recent score trend, computed in SQL."""
+    recent_rows = await conn.fetch(TEST_RECENT_SCORES_SQL, user_id, recent)
+    return {
+        "categories": [dict(r) for r in await conn.fetch(TEST_CATEGORY_AVERAGES_SQL, user_id)],
+        "difficulties": [dict(r) for r in await conn.fetch(TEST_DIFFICULTY_AVERAGES_SQL, user_id)],
+        "recent_scores": [dict(r) for r in reversed(recent_rows)],
+    }
+
+
+# --- Batch Helpers ---
+async def execute_many(conn, sql: str, rows: Iterable[Sequence[Any]]):
+    """Run one prepared statement for many argument tuples in a single round-trip pipeline."""
+    await conn.executemany(sql, rows)
+
+
+async def copy_rows(conn, table: str, columns: List[str], rows: Iterable[Sequence[Any]]):
+    """Bulk-load rows with COPY; much faster than INSERT for large batches."""
+    await conn.copy_records_to_table(table, records=rows, columns=columns)
+
+
+# --- Match Jobs ---
+INSERT_MATCH_JOB_SQL = """
+    INSERT INTO match_jobs (user_id, jd_text, weights, required_years, total_items)
+    VALUES ($1, $2, $3, $4, $5)
+    RETURNING id
+"""
+
+INSERT_MATCH_JOB_ITEM_SQL = """
+    INSERT INTO match_job_items (job_id, item_index, filename, file_path)
+    VALUES ($1, $2, $3, $4)
+"""
+
+GET_MATCH_JOB_SQL = """
+    SELECT id, user_id, created_at, updated_at, status, weights, required_years,
+           total_items, completed_items, failed_items
+    FROM match_jobs WHERE id = $1
+"""
+
+UNFINISHED_MATCH_JOBS_SQL = """
+    SELECT id, user_id, jd_text, weights, required_years FROM match_jobs
+    WHERE status IN ('queued', 'running')
+    ORDER BY created_at
+"""
+
+CLAIM_MATCH_JOB_ITEM_SQL = """
+    UPDATE match_job_items SET status = 'running', claimed_at = now()
+    WHERE (job_id, item_index) = (
+        SELECT job_id, item_index FROM match_job_items
+        WHERE job_id = $1
+          AND (status = 'pending'
+               OR (status = 'running' AND claimed_at < now() - make_interval(secs => $2)))
+        ORDER BY item_index
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING item_index, filename, file_path
+"""
+
+COMPLETE_MATCH_JOB_ITEM_SQL = """
+    WITH item AS (
+        UPDATE match_job_items
+        SET status = $3, final_score = $4, result = $5, error = $6
+        WHERE job_id = $1 AND item_index = $2 AND status = 'running'
+        RETURNING status
+    )
+    UPDATE match_jobs SET
+        status = 'running',
+        completed_items = completed_items + (SELECT count(*) FROM item WHERE status = 'completed'),
+        failed_items = failed_items + (SELECT count(*) FROM item WHERE status = 'failed'),
+        updated_at = now()
+    WHERE id = $1
+"""
+
+FINISH_MATCH_JOB_SQL = """
+    UPDATE match_jobs SET status = 'completed', updated_at = now()
+    WHERE id = $1
+      AND NOT EXISTS (
+          SELECT 1 FROM match_job_items WHERE job_id = $1 AND status IN ('pending', 'running')
+      )
+    RETURNING id
+"""
+
+REQUEUE_RUNNING_MATCH_ITEMS_SQL = """
+    UPDATE match_job_items SET status = 'pending', claimed_at = NULL
+    WHERE job_id = $1 AND status = 'running'
+"""
+
+UNFINISHED_MATCH_ITEMS_SQL = """
+    SELECT count(*) FROM match_job_items WHERE job_id = $1 AND status IN ('pending', 'running')
+"""
+
+MATCH_JOB_FILE_PATHS_SQL = "SELECT file_path FROM match_job_items WHERE job_id = $1"
+
+MATCH_JOB_RESULTS_SQL = """
+    SELECT item_index, filename, status, final_score, result, error
+    FROM match_job_items
+    WHERE job_id = $1 AND status IN ('completed', 'failed')
+    ORDER BY final_score DESC NULLS LAST, item_index
+    LIMIT $2 OFFSET $3
+"""
+
+
+async def create_match_job(conn, user_id: str, jd_text: str, weights: Optional[dict],
+                           required_years: int, items: List[Sequence[Any]]):
+    """Create a job and its items ((filename, file_path) pairs) atomically; returns the job id."""
+    async with conn.transaction():
+        job_id = await conn.fetchval(INSERT_MATCH_JOB_SQL, user_id, jd_text, weights, required_years, len(items))
+        await conn.executemany(
+            INSERT_MATCH_JOB_ITEM_SQL,
+            [(job_id, index, filename, file_path) for index, (filename, file_path) in enumerate(items)]
+        )
+    return job_id
+
+
+async def get_match_job(conn, job_id: str) -> Optional[dict]:
+    row = await conn.fetchrow(GET_MATCH_JOB_SQL, job_id)
+    return dict(row) if row else None
+
+
+async def fetch_unfinished_match_jobs(conn) -> List[dict]:
+    return [dict(r) for r in await conn.fetch(UNFINISHED_MATCH_JOBS_SQL)]
+
+
+async def claim_match_job_item(conn, job_id, stale_after_seconds: float) -> Optional[dict]:
+    """Atomically claim the next pending item (or one abandoned by a dead runner)."""
+    row = await conn.fetchrow(CLAIM_MATCH_JOB_ITEM_SQL, job_id, stale_after_seconds)
+    return dict(row) if row else None
+
+
+async def complete_match_job_item(conn, job_id, item_index: int, final_score: Optional[float],
+                                  result: Optional[dict], error: Optional[str] = None):
+    status = "failed" if error else "completed"
+    await conn.execute(COMPLETE_MATCH_JOB_ITEM_SQL, job_id, item_index, status, final_score, result, error)
+
+
+async def finish_match_job(conn, job_id) -> bool:
+    return await conn.fetchval(FINISH_MATCH_JOB_SQL, job_id) is not None
+
+
+async def requeue_running_match_job_items(conn, job_id) -> int:
+    """Put items claimed by a process that is gone back in the queue; returns how many."""
+    status = await conn.execute(REQUEUE_RUNNING_MATCH_ITEMS_SQL, job_id)
+    return int(status.split()[-1])
+
+
+async def count_unfinished_match_job_items(conn, job_id) -> int:
+    return await conn.fetchval(UNFINISHED_MATCH_ITEMS_SQL, job_id)
+
+
+async def fetch_match_job_file_paths(conn, job_id) -> List[str]:
+    return [r["file_path"] for r in await conn.fetch(MATCH_JOB_FILE_PATHS_SQL, job_id)]
+
+
+async def fetch_match_job_results(conn, job_id: str, limit: int, offset: int) -> List[dict]:
+    return [dict(r) for r in await conn.fetch(MATCH_JOB_RESULTS_SQL, job_id, limit, offset)]
+
+
+# --- LLM Usage ---
+LLM_CALL_COLUMNS = [
+    "created_at", "endpoint", "user_id", "model", "prompt_tokens",
+    "output_tokens", "latency_ms", "ttft_ms", "outcome",
+]
+
+LLM_USAGE_REPORT_SQL = {
+    "cost_by_endpoint": "SELECT * FROM llm_cost_by_endpoint",
+    "heaviest_users": "SELECT * FROM llm_heaviest_users LIMIT $1",
+    "latency_by_endpoint": "SELECT * FROM llm_latency_by_endpoint",
+}
+
+
+async def insert_llm_calls(conn, rows: List[Sequence[Any]]):
+    await copy_rows(conn, "llm_calls", LLM_CALL_COLUMNS, rows)
+
+
+async def fetch_llm_usage_report(conn, top_users: int = 20) -> dict:
+    return {
+        "cost_by_endpoint": [dict(r) for r in await conn.fetch(LLM_USAGE_REPORT_SQL["cost_by_endpoint"])],
+        "heaviest_users": [dict(r) for r in await conn.fetch(LLM_USAGE_REPORT_SQL["heaviest_users"], top_users)],
+        "latency_by_endpoint": [dict(r) for r in await conn.fetch(LLM_USAGE_REPORT_SQL["latency_by_endpoint"])],
+    }
+
+
+# --- Document Backfill ---
+BACKFILL_BATCH_SQL = """
+    SELECT id, original_resume_text, job_description FROM rex_ai
+    WHERE resume_document_hash IS NULL
+      AND (original_resume_text IS NOT NULL OR job_description IS NOT NULL)
+    LIMIT $1
+    FOR UPDATE SKIP LOCKED
+"""
+
+BACKFILL_UPDATE_SQL = """
+    UPDATE rex_ai
+    SET resume_document_hash = $2, jd_document_hash = $3,
+        original_resume_text = NULL, job_description = NULL
+    WHERE id = $1
+"""
+
+
+async def backfill_documents(conn, batch_size: int = 500) -> int:
+    """Move inline rex_ai text into documents, one transaction per batch. Returns rows migrated."""
+    migrated = 0
+    while True:
+        async with conn.transaction():
+            rows = await conn.fetch(BACKFILL_BATCH_SQL, batch_size)
+            if not rows:
+                return migrated
+            updates = []
+            for row in rows:
+                resume_hash = await upsert_document(conn, "resume", row["original_resume_text"] or "")
+                jd_hash = await upsert_document(conn, "job_description", row["job_description"] or "")
+                updates.append((row["id"], resume_hash, jd_hash))
+            await conn.executemany(BACKFILL_UPDATE_SQL, updates)
+        migrated += len(rows)
+        print(f"--- Backfilled {migrated} analyses into documents ---")
+
+
+# --- Migrations ---
+async def run_migrations(conn, migrations_dir: str = MIGRATIONS_DIR) -> List[str]:
+    """Apply pending *.sql files in name order, each in its own transaction."""
+    await conn.execute(
+        "CREATE TABLE IF NOT EXISTS schema_migrations (name text PRIMARY KEY, applied_at timestamptz NOT NULL DEFAULT now())"
+    )
+    # Serialize concurrent migrators (e.g. several workers starting at once).
+    await conn.execute("SELECT pg_advisory_lock(hashtext('rex_ai_schema_migrations'))")
+    applied = []
+    try:
+        done = {r["name"] for r in await conn.fetch("SELECT name FROM schema_migrations")}
+        for name in sorted(os.listdir(migrations_dir)):
+            if not name.endswith(".sql") or name in done:
+                continue
+            with open(os.path.join(migrations_dir, name), "r", encoding="utf-8") as f:
+                sql = f.read()
+            async with conn.transaction():
+                await conn.execute(sql)
+                await conn.execute("INSERT INTO schema_migrations (name) VALUES ($1)", name)
+            applied.append(name)
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock(hashtext('rex_ai_schema_migrations'))")
+    return applied
+
+
+if __name__ == "__main__":
+    # Usage: python db.py migrate | backfill-documents | llm-usage
+    import asyncio
+    from dotenv import load_dotenv
+
+    if sys.argv[1:] not in (["migrate"], ["backfill-documents"], ["llm-usage"]):
+        sys.exit("Usage: python db.py migrate | backfill-documents | llm-usage")
+    load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env.local'))
+
+    async def _main(command):
+        conn = await asyncpg.connect(dsn=os.environ["DATABASE_URL"])
+        try:
+            if command == "migrate":
+                applied = await run_migrations(conn)
+                print(f"Applied migrations: {', '.join(applied) or 'none'}")
+            elif command == "llm-usage":
+                report = await fetch_llm_usage_report(conn)
+                for view, rows in report.items():
+                    print(f"== {view} ==")
+                    for row in rows:
+                        print("  " + ", ".join(f"{k}={v}" for k, v in row.items()))
+            else:
+                migrated = await backfill_documents(conn)
+                print(f"Moved {migrated} analyses to documents. Run VACUUM FULL rex_ai (or pg_repack) to reclaim the space.")
+        finally:
+            await conn.close()
+
+    asyncio.run(_main(sys.argv[1]))
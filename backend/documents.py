@@ -0,0 +1,40 @@
+# backend/documents.py
+import hashlib
+import os
+import re
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DOCUMENT_ZSTD_LEVEL = int(os.getenv("DOCUMENT_ZSTD_LEVEL", "10"))
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for hashing: no NULs, LF newlines, no trailing spaces, at most one blank line."""
+    text = text.replace("\u0000", "")
+    text = re.sub(r"\r\n|\r", "\n", text)
+    text = re.sub(r"[ \t]+\n", "\n", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.strip()
+
+
+def document_hash(normalized_text: str) -> str:
+    return hashlib.sha256(normalized_text.encode("utf-8")).hexdigest()
+
+
+def compress_text(text: str):
+    """Return (codec, body) for storage; falls back to raw UTF-8 when zstandard is not installed."""
+    raw = text.encode("utf-8")
+    if zstandard is None:
+        return "none", raw
+    return "zstd", zstandard.ZstdCompressor(level=DOCUMENT_ZSTD_LEVEL).compress(raw)
+
+
+def decompress_text(codec: str, body: bytes) -> str:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd-compressed documents.")
+        return zstandard.ZstdDecompressor().decompress(body).decode("utf-8")
+    return bytes(body).decode("utf-8")
@@ -0,0 +1,151 @@
+# backend/fake_gemini.py
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+
+# Stand-in for google.generativeai.GenerativeModel used by the load-test harness.
+# Time to first token is lognormal, fitted to a p50 and a p99; the rest of the
+# output then arrives at a fixed token rate, in chunks when streaming.
+FAKE_LLM_TTFT_P50_MS = float(os.getenv("FAKE_LLM_TTFT_P50_MS", "700"))
+FAKE_LLM_TTFT_P99_MS = float(os.getenv("FAKE_LLM_TTFT_P99_MS", "3000"))
+FAKE_LLM_TOKENS_PER_SECOND = float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "120"))
+FAKE_LLM_CHUNK_TOKENS = int(os.getenv("FAKE_LLM_CHUNK_TOKENS", "24"))
+FAKE_LLM_TEXT_TOKENS = int(os.getenv("FAKE_LLM_TEXT_TOKENS", "350"))
+# Share of calls that fail: before any output for plain calls, part-way through for streams.
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+FAKE_LLM_SEED = os.getenv("FAKE_LLM_SEED")
+
+_Z99 = 2.3263
+_WORDS = (
+    "python fastapi postgres docker kubernetes aws react typescript sql redis kafka terraform "
+    "led designed built shipped migrated reduced improved scaled automated mentored team platform "
+    "service pipeline latency throughput customers revenue reliability monitoring testing api"
+).split()
+_rng = random.Random(FAKE_LLM_SEED)
+
+try:
+    from google.api_core.exceptions import ServiceUnavailable as _FakeOutage
+except ImportError:
+    _FakeOutage = RuntimeError
+
+
+def _ttft_seconds() -> float:
+    sigma = max(0.0, math.log(FAKE_LLM_TTFT_P99_MS / FAKE_LLM_TTFT_P50_MS) / _Z99)
+    return _rng.lognormvariate(math.log(FAKE_LLM_TTFT_P50_MS), sigma) / 1000
+
+
+def _count_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _words(count: int) -> str:
+    return " ".join(_rng.choice(_WORDS) for _ in range(count))
+
+
+# --- Output ---
+def fake_value(schema: Dict[str, Any], array_items: Optional[int] = None) -> Any:
+    """
+    A random value matching a Gemini response schema (as built by structured_output).
+    `array_items` sizes a top-level array; nested arrays get 2-5 items.
+    """
+    kind = schema.get("type", "STRING")
+    if "enum" in schema:
+        return _rng.choice(schema["enum"])
+    if kind == "OBJECT":
+        return {name: fake_value(prop) for name, prop in schema.get("properties", {}).items()}
+    if kind == "ARRAY":
+        return [fake_value(schema.get("items", {})) for _ in range(array_items or _rng.randint(2, 5))]
+    if kind == "INTEGER":
+        return _rng.randint(40, 95)
+    if kind == "NUMBER":
+        return round(_rng.uniform(0, 1), 3)
+    if kind == "BOOLEAN":
+        return _rng.random() < 0.5
+    return _words(_rng.randint(2, 12))
+
+
+def fake_output(prompt: str, generation_config: Optional[dict]) -> str:
+    config = generation_config or {}
+    if config.get("response_mime_type") == "application/json":
+        if "response_schema" not in config:
+            return "{}"
+        requested = re.search(r"exactly (\d+)", prompt)
+        return json.dumps(fake_value(config["response_schema"], int(requested.group(1)) if requested else None))
+    if 'Answer with only "yes" or "no"' in prompt:
+        return "yes"
+    return _words(FAKE_LLM_TEXT_TOKENS * 4 // 7)  # about 7 characters, so 1.75 tokens, per word
+
+
+def _usage(prompt: str, output: str) -> SimpleNamespace:
+    prompt_tokens, output_tokens = _count_tokens(prompt), _count_tokens(output)
+    return SimpleNamespace(prompt_token_count=prompt_tokens, candidates_token_count=output_tokens,
+                           total_token_count=prompt_tokens + output_tokens)
+
+
+class FakeResponse:
+    def __init__(self, text: str, usage_metadata):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+class _FakeStream:
+    """Async iterator of chunks, like the SDK's AsyncGenerateContentResponse."""
+
+    def __init__(self, prompt: str, output: str, fail: bool):
+        self._prompt = prompt
+        self._output = output
+        self._fail_at = _rng.randrange(len(output)) if fail else None
+
+    def __aiter__(self):
+        return self._chunks()
+
+    async def _chunks(self):
+        await asyncio.sleep(_ttft_seconds())
+        step = FAKE_LLM_CHUNK_TOKENS * 4
+        for start in range(0, len(self._output), step):
+            if self._fail_at is not None and start >= self._fail_at:
+                raise _FakeOutage("Fake LLM failure mid-stream.")
+            if start:
+                await asyncio.sleep(FAKE_LLM_CHUNK_TOKENS / FAKE_LLM_TOKENS_PER_SECOND)
+            text = self._output[start:start + step]
+            yield FakeResponse(text, _usage(self._prompt, self._output[:start + step]))
+
+
+class FakeGenerativeModel:
+    def __init__(self, model_name: str = "gemini-fake", **kwargs):
+        self.model_name = f"models/{model_name}"
+
+    def _plan(self, prompt, generation_config):
+        prompt = str(prompt)
+        output = fake_output(prompt, generation_config)
+        seconds = _ttft_seconds() + _count_tokens(output) / FAKE_LLM_TOKENS_PER_SECOND
+        return prompt, output, seconds, _rng.random() < FAKE_LLM_ERROR_RATE
+
+    def generate_content(self, prompt, stream: bool = False, generation_config=None, **kwargs):
+        # Blocks the caller the way the real sync client does.
+        prompt, output, seconds, fail = self._plan(prompt, generation_config)
+        time.sleep(seconds)
+        if fail:
+            raise _FakeOutage("Fake LLM failure.")
+        return FakeResponse(output, _usage(prompt, output))
+
+    async def generate_content_async(self, prompt, stream: bool = False, generation_config=None, **kwargs):
+        prompt, output, seconds, fail = self._plan(prompt, generation_config)
+        if stream:
+            return _FakeStream(prompt, output, fail)
+        await asyncio.sleep(seconds)
+        if fail:
+            raise _FakeOutage("Fake LLM failure.")
+        return FakeResponse(output, _usage(prompt, output))
+
+
+def install():
+    """Route every genai.GenerativeModel(...) created after this call to the fake."""
+    import google.generativeai as genai
+    genai.GenerativeModel = FakeGenerativeModel
@@ -0,0 +1,22 @@
+# backend/gunicorn.conf.py
+# gunicorn -c gunicorn.conf.py api.main:app
+import os
+
+from shared_models import MODEL_PRELOAD
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("GUNICORN_WORKERS", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# With MODEL_PRELOAD=1 the master loads the app and every model before forking,
+# so workers share the weights copy-on-write instead of loading their own.
+# The matcher's process pools are spawned and inherit nothing from the master;
+# their workers map the weights instead (shared_models.configure_pool_worker).
+preload_app = MODEL_PRELOAD
+
+
+def on_starting(server):
+    if MODEL_PRELOAD:
+        from shared_models import memory_report, preload_models
+        preload_models()
+        server.log.info("Preloaded models: %s", memory_report())
@@ -0,0 +1,226 @@
+# backend/inference_service.py
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+
+INFERENCE_BATCHING = os.getenv("INFERENCE_BATCHING", "1") == "1"
+INFERENCE_MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", "64"))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "5"))
+# torch intra-op threads for the single thread that runs every batch; 0 keeps torch's default (physical cores).
+INFERENCE_THREADS = int(os.getenv("INFERENCE_THREADS", "0"))
+
+
+class _Request:
+    __slots__ = ("kind", "items", "future", "enqueued")
+
+    def __init__(self, kind: str, items: List):
+        self.kind = kind
+        self.items = items
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+
+
+def _join(parts: List[Future]) -> Future:
+    """One future for the concatenated results of `parts`, failing with the first part that fails."""
+    joined = Future()
+    remaining = [len(parts)]
+    lock = threading.Lock()
+
+    def done(_):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        errors = [part.exception() for part in parts if part.exception() is not None]
+        if errors:
+            joined.set_exception(errors[0])
+            return
+        results = [part.result() for part in parts]
+        if all(isinstance(result, np.ndarray) for result in results):
+            joined.set_result(np.concatenate(results))
+        else:
+            joined.set_result([row for result in results for row in result])
+
+    for part in parts:
+        part.add_done_callback(done)
+    return joined
+
+
+class InferenceService:
+    """
+    In-process actor that owns the embedder and cross-encoder. Callers on any
+    thread submit embed/rerank requests and get futures back; one worker thread
+    drains the queue into micro-batches of up to `max_batch` items of one kind,
+    waiting at most `max_wait_ms` for a batch to fill, and runs each as a single
+    forward pass. Only that thread runs the models, so torch's intra-op pool is
+    never shared between concurrent calls.
+    """
+
+    def __init__(self, max_batch: int = INFERENCE_MAX_BATCH, max_wait_ms: float = INFERENCE_MAX_WAIT_MS,
+                 threads: int = INFERENCE_THREADS):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.threads = threads
+        self._runners: Dict[str, Callable[[List], Sequence]] = {}
+        self._lock = threading.Lock()
+        self._pid = None
+        self.batches = 0
+        self.items = 0
+        self.requests = 0
+        self.queue_seconds = 0.0
+        self.run_seconds = 0.0
+
+    def register(self, kind: str, runner: Callable[[List], Sequence]):
+        """`runner` maps a list of items to a same-length sequence of results (array rows are fine)."""
+        self._runners[kind] = runner
+
+    def submit(self, kind: str, items: Sequence) -> Future:
+        if kind not in self._runners:
+            raise ValueError(f"No inference runner registered for '{kind}'.")
+        self._ensure_started()
+        items = list(items)
+        # A request larger than one batch is queued as max_batch slices, so no forward pass exceeds it.
+        parts = [_Request(kind, items[start:start + self.max_batch])
+                 for start in range(0, len(items), self.max_batch)] or [_Request(kind, items)]
+        for request in parts:
+            self._queue.put(request)
+        if len(parts) == 1:
+            return parts[0].future
+        return _join([request.future for request in parts])
+
+    def _ensure_started(self):
+        # Threads do not survive fork, so each worker process starts its own.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._pending = deque()
+                threading.Thread(target=self._run, name="inference-service", daemon=True).start()
+                self._pid = os.getpid()
+
+    def _configure_threads(self):
+        if not self.threads:
+            return
+        try:
+            import torch
+        except ImportError:
+            return
+        torch.set_num_threads(self.threads)
+
+    def _next_batch(self) -> List[_Request]:
+        first = self._pending.popleft() if self._pending else self._queue.get()
+        batch, size = [first], len(first.items)
+        deadline = time.monotonic() + self.max_wait
+        deferred = []
+        while size < self.max_batch:
+            if self._pending:
+                request = self._pending.popleft()
+            else:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+            if request.kind != first.kind:
+                deferred.append(request)
+            elif size + len(request.items) > self.max_batch:
+                deferred.append(request)
+                break
+            else:
+                batch.append(request)
+                size += len(request.items)
+        # Requests that did not fit go first next time, in arrival order.
+        self._pending.extendleft(reversed(deferred))
+        return batch
+
+    def _run(self):
+        self._configure_threads()
+        while True:
+            batch = self._next_batch()
+            started = time.perf_counter()
+            items = [item for request in batch for item in request.items]
+            try:
+                results = self._runners[batch[0].kind](items)
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            finished = time.perf_counter()
+            offset = 0
+            for request in batch:
+                request.future.set_result(results[offset:offset + len(request.items)])
+                offset += len(request.items)
+                self.queue_seconds += started - request.enqueued
+            self.batches += 1
+            self.items += len(items)
+            self.requests += len(batch)
+            self.run_seconds += finished - started
+
+    def stats(self) -> dict:
+        return {
+            "enabled": INFERENCE_BATCHING,
+            "batches": self.batches,
+            "requests": self.requests,
+            "mean_batch_items": round(self.items / self.batches, 1) if self.batches else None,
+            "mean_queue_ms": round(self.queue_seconds / self.requests * 1000, 2) if self.requests else None,
+            "mean_batch_ms": round(self.run_seconds / self.batches * 1000, 2) if self.batches else None,
+        }
+
+
+inference_service = InferenceService()
+
+
+if __name__ == "__main__":
+    # Throughput with many concurrent callers, direct model calls vs micro-batches:
+    #   python inference_service.py [callers] [chunks per call] [calls per caller]
+    import statistics
+    import sys
+    from concurrent.futures import ThreadPoolExecutor
+
+    import model_utils
+    # Use the instance model_utils registered its runners on, not this script's copy.
+    inference_service = model_utils.inference_service
+
+    defaults = [32, 6, 20]
+    callers, chunks, calls = [int(a) for a in sys.argv[1:4]] + defaults[len(sys.argv[1:4]):]
+    words = "python engineer built scalable data pipelines kubernetes aws latency services team".split()
+    texts = [" ".join(words[(i + j) % len(words)] for j in range(60)) for i in range(chunks)]
+    pairs = [(texts[i], texts[-1 - i]) for i in range(chunks)]
+    embedder, cross_encoder = model_utils.load_embedder(), model_utils.load_cross_encoder()
+    embedder.encode(texts)
+    cross_encoder.predict(pairs, show_progress_bar=False)
+
+    def caller(embed, rerank):
+        latencies = []
+        for _ in range(calls):
+            started = time.perf_counter()
+            embed(texts)
+            rerank(pairs)
+            latencies.append(time.perf_counter() - started)
+        return latencies
+
+    modes = {
+        "direct": (lambda t: embedder.encode(t, convert_to_numpy=True),
+                   lambda p: cross_encoder.predict(p, show_progress_bar=False)),
+        "batched": (lambda t: inference_service.submit("embed", t).result(),
+                    lambda p: inference_service.submit("rerank", p).result()),
+    }
+    for name, (embed, rerank) in modes.items():
+        started = time.perf_counter()
+        with ThreadPoolExecutor(callers) as pool:
+            latencies = sorted(sum(pool.map(lambda _: caller(embed, rerank), range(callers)), []))
+        elapsed = time.perf_counter() - started
+        print(f"{name:8s} {callers} callers x {calls} calls of {chunks} chunks: "
+              f"{callers * calls / elapsed:7.1f} calls/s, {callers * calls * chunks * 2 / elapsed:8.1f} items/s, "
+              f"latency p50 {statistics.median(latencies) * 1000:.0f} ms, "
+              f"p99 {latencies[int(0.99 * (len(latencies) - 1))] * 1000:.0f} ms")
+    print(f"batched: {inference_service.stats()}")
@@ -0,0 +1,195 @@
+# backend/json_patch.py
+import copy
+from typing import Any, List, Tuple
+
+MERGE_PATCH_CONTENT_TYPE = "application/merge-patch+json"
+JSON_PATCH_CONTENT_TYPE = "application/json-patch+json"
+
+
+class PatchError(ValueError):
+    """The patch is malformed or cannot be applied to the document."""
+
+
+# --- JSON Merge Patch (RFC 7396) ---
+def apply_merge_patch(target: Any, patch: Any) -> Any:
+    """Objects merge key by key, null deletes a key, anything else (arrays included) replaces."""
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = apply_merge_patch(result.get(key), value)
+    return result
+
+
+# --- JSON Patch (RFC 6902) ---
+def _parse_pointer(pointer: str) -> List[str]:
+    if pointer == "":
+        return []
+    if not isinstance(pointer, str) or not pointer.startswith("/"):
+        raise PatchError(f"Invalid JSON pointer '{pointer}'.")
+    return [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+
+
+def _array_index(container: list, token: str, allow_end: bool) -> int:
+    if token == "-" and allow_end:
+        return len(container)
+    if not token.isdigit() or (token != "0" and token.startswith("0")):
+        raise PatchError(f"Invalid array index '{token}'.")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise PatchError(f"Array index {index} is out of range.")
+    return index
+
+
+def _resolve(document: Any, tokens: List[str]) -> Any:
+    node = document
+    for token in tokens:
+        if isinstance(node, dict) and token in node:
+            node = node[token]
+        elif isinstance(node, list):
+            node = node[_array_index(node, token, allow_end=False)]
+        else:
+            raise PatchError(f"Path '/{'/'.join(tokens)}' does not exist.")
+    return node
+
+
+def _parent(document: Any, pointer: str) -> Tuple[Any, str]:
+    tokens = _parse_pointer(pointer)
+    if not tokens:
+        raise PatchError("Operations on the whole document are not supported.")
+    parent = _resolve(document, tokens[:-1])
+    if not isinstance(parent, (dict, list)):
+        raise PatchError(f"Path '{pointer}' does not point into an object or array.")
+    return parent, tokens[-1]
+
+
+def _add(document: Any, pointer: str, value: Any):
+    parent, token = _parent(document, pointer)
+    if isinstance(parent, list):
+        parent.insert(_array_index(parent, token, allow_end=True), value)
+    else:
+        parent[token] = value
+
+
+def _remove(document: Any, pointer: str) -> Any:
+    parent, token = _parent(document, pointer)
+    if isinstance(parent, list):
+        return parent.pop(_array_index(parent, token, allow_end=False))
+    if token not in parent:
+        raise PatchError(f"Path '{pointer}' does not exist.")
+    return parent.pop(token)
+
+
+def apply_json_patch(document: Any, operations: List[dict]) -> Any:
+    """
+    Apply add/remove/replace/move/copy/test operations in order to a copy of
+    `document`. Any failing operation (including a failed test) rejects the whole patch.
+    """
+    if not isinstance(operations, list):
+        raise PatchError("A JSON Patch must be an array of operations.")
+    result = copy.deepcopy(document)
+    for operation in operations:
+        if not isinstance(operation, dict) or "op" not in operation or "path" not in operation:
+            raise PatchError("Each operation needs 'op' and 'path'.")
+        op, path = operation["op"], operation["path"]
+        if op in ("add", "replace", "test") and "value" not in operation:
+            raise PatchError(f"'{op}' needs a 'value'.")
+        if op in ("move", "copy") and "from" not in operation:
+            raise PatchError(f"'{op}' needs a 'from'.")
+
+        if op == "add":
+            _add(result, path, copy.deepcopy(operation["value"]))
+        elif op == "remove":
+            _remove(result, path)
+        elif op == "replace":
+            _resolve(result, _parse_pointer(path))
+            _remove(result, path)
+            _add(result, path, copy.deepcopy(operation["value"]))
+        elif op == "move":
+            if path.startswith(operation["from"] + "/"):
+                raise PatchError("Cannot move a value into one of its own children.")
+            _add(result, path, _remove(result, operation["from"]))
+        elif op == "copy":
+            _add(result, path, copy.deepcopy(_resolve(result, _parse_pointer(operation["from"]))))
+        elif op == "test":
+            if _resolve(result, _parse_pointer(path)) != operation["value"]:
+                raise PatchError(f"Test failed at '{path}'.")
+        else:
+            raise PatchError(f"Unknown operation '{op}'.")
+    return result
+
+
+def _escape(token: str) -> str:
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def make_json_patch(old: Any, new: Any, path: str = "") -> List[dict]:
+    """
+    JSON Patch that turns `old` into `new`, descending into objects and arrays
+    so an edited field costs one small operation instead of its whole section.
+    """
+    if old == new:
+        return []
+    if isinstance(old, dict) and isinstance(new, dict):
+        operations = [{"op": "remove", "path": f"{path}/{_escape(key)}"} for key in sorted(old.keys() - new.keys())]
+        for key, value in new.items():
+            child = f"{path}/{_escape(key)}"
+            if key in old:
+                operations += make_json_patch(old[key], value, child)
+            else:
+                operations.append({"op": "add", "path": child, "value": value})
+        return operations
+    if isinstance(old, list) and isinstance(new, list):
+        common = min(len(old), len(new))
+        operations = []
+        for index in range(common):
+            operations += make_json_patch(old[index], new[index], f"{path}/{index}")
+        operations += [{"op": "remove", "path": f"{path}/{index}"} for index in range(len(old) - 1, common - 1, -1)]
+        operations += [{"op": "add", "path": f"{path}/-", "value": value} for value in new[common:]]
+        return operations
+    return [{"op": "replace", "path": path, "value": new}]
+
+
+if __name__ == "__main__":
+    # Autosave bytes per keystroke burst, full document vs merge patch vs JSON Patch: python json_patch.py
+    import json
+    import random
+
+    rng = random.Random(3)
+    sentence = "Led a team of engineers to design, build and operate services handling millions of requests a day. "
+    document = {
+        "personalInfo": {"name": "Jane Doe", "email": "jane@example.com", "phone": "+1 555 0100", "location": "Remote"},
+        "summary": sentence * 3,
+        "experience": [{"id": str(i), "title": "Senior Engineer", "company": f"Company {i}", "startDate": "2019-01",
+                        "endDate": "2022-06", "description": sentence * 5} for i in range(5)],
+        "education": [{"id": "e1", "school": "State University", "degree": "BSc Computer Science", "year": "2014"}],
+        "skills": [{"id": str(i), "name": f"Skill {i}", "level": "Expert"} for i in range(20)],
+        "projects": [{"id": str(i), "name": f"Project {i}", "description": sentence * 2, "url": ""} for i in range(3)],
+        "certifications": [],
+    }
+
+    totals = {"full document": 0, "merge patch": 0, "json patch": 0}
+    edits = 200
+    for _ in range(edits):
+        edited = json.loads(json.dumps(document))
+        section = rng.choice(["summary", "experience", "projects", "personalInfo"])
+        if section == "summary":
+            edited["summary"] += "x" * rng.randint(1, 8)
+        elif section == "personalInfo":
+            edited["personalInfo"]["location"] += "x"
+        else:
+            item = rng.choice(edited[section])
+            item["description"] += "x" * rng.randint(1, 8)
+        merge = {section: edited[section]}  # arrays cannot be merged element-wise, so a list edit resends the list
+        totals["full document"] += len(json.dumps(edited))
+        totals["merge patch"] += len(json.dumps(merge))
+        totals["json patch"] += len(json.dumps(make_json_patch(document, edited)))
+        assert apply_json_patch(document, make_json_patch(document, edited)) == edited
+        assert apply_merge_patch(document, merge) == edited
+        document = edited
+
+    for name, total in totals.items():
+        print(f"{name:14s} {total / edits:8.0f} bytes per autosave ({totals['full document'] / total:5.1f}x smaller)")
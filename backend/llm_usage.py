@@ -0,0 +1,127 @@
+# backend/llm_usage.py
+import asyncio
+import os
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+import db
+
+LLM_USAGE_FLUSH_SECONDS = float(os.getenv("LLM_USAGE_FLUSH_SECONDS", "5"))
+LLM_USAGE_BATCH_SIZE = int(os.getenv("LLM_USAGE_BATCH_SIZE", "500"))
+LLM_USAGE_MAX_BUFFERED = int(os.getenv("LLM_USAGE_MAX_BUFFERED", "20000"))
+
+
+def model_label(model) -> str:
+    return getattr(model, "model_name", str(model)).removeprefix("models/")
+
+
+class LLMCall:
+    """
+    Measures one Gemini call. Wrap the request (and, for streams, the whole
+    consumption loop) in `with`; the record is queued when the block exits.
+    """
+
+    def __init__(self, recorder: "UsageRecorder", endpoint: str, user_id: Optional[str], model: str):
+        self.recorder = recorder
+        self.endpoint = endpoint
+        self.user_id = user_id
+        self.model = model
+        self.prompt_tokens = None
+        self.output_tokens = None
+        self.ttft_ms = None
+        self.outcome = None
+
+    def __enter__(self):
+        self.created_at = datetime.now(timezone.utc)
+        self._started = time.perf_counter()
+        return self
+
+    def first_token(self):
+        if self.ttft_ms is None:
+            self.ttft_ms = (time.perf_counter() - self._started) * 1000
+
+    def set_usage(self, response):
+        """Take token counts from a response or stream chunk; the last chunk of a stream carries the totals."""
+        usage = getattr(response, "usage_metadata", None)
+        if usage and usage.prompt_token_count:
+            self.prompt_tokens = usage.prompt_token_count
+            self.output_tokens = usage.candidates_token_count
+
+    def __exit__(self, exc_type, exc, tb):
+        latency_ms = (time.perf_counter() - self._started) * 1000
+        if self.outcome is None:
+            if exc_type is None:
+                self.outcome = "ok"
+            elif issubclass(exc_type, (asyncio.CancelledError, GeneratorExit)):
+                self.outcome = "cancelled"
+            else:
+                self.outcome = "error"
+        self.recorder.record((
+            self.created_at, self.endpoint, self.user_id, self.model, self.prompt_tokens,
+            self.output_tokens, latency_ms, self.ttft_ms, self.outcome,
+        ))
+        return False
+
+
+class UsageRecorder:
+    """
+    In-memory buffer of LLM call records, written to `llm_calls` with COPY by a
+    background flusher. When the database is unreachable the oldest records are
+    dropped once LLM_USAGE_MAX_BUFFERED is reached, never blocking a request.
+    """
+
+    def __init__(self, batch_size: int = LLM_USAGE_BATCH_SIZE, max_buffered: int = LLM_USAGE_MAX_BUFFERED,
+                 flush_seconds: float = LLM_USAGE_FLUSH_SECONDS):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._buffer = deque(maxlen=max_buffered)
+        self.recorded = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.flush_errors = 0
+
+    def call(self, endpoint: str, user_id: Optional[str], model) -> LLMCall:
+        return LLMCall(self, endpoint, user_id, model_label(model))
+
+    def record(self, row: tuple):
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self._buffer.append(row)
+        self.recorded += 1
+
+    async def flush(self, pool) -> int:
+        written = 0
+        while self._buffer:
+            batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+            try:
+                async with pool.acquire() as conn:
+                    await db.insert_llm_calls(conn, batch)
+            except Exception as e:
+                self.flush_errors += 1
+                self._buffer.extendleft(reversed(batch))
+                print(f"--- ERROR flushing {len(batch)} LLM usage records: {e} ---")
+                break
+            written += len(batch)
+            self.flushed += len(batch)
+        return written
+
+    async def run_flusher(self, get_pool: Callable):
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            pool = get_pool()
+            if pool is not None:
+                await self.flush(pool)
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self._buffer),
+            "recorded": self.recorded,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "flush_errors": self.flush_errors,
+        }
+
+
+usage_recorder = UsageRecorder()
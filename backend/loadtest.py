@@ -0,0 +1,529 @@
+# backend/loadtest.py
+"""
+Capacity test for api/main.py with every external dependency replaced locally:
+Gemini by fake_gemini (configurable latency, streaming and errors), Clerk by a
+JWKS served from this process with RS256 tokens minted for a pool of users, and
+Postgres by LOADTEST_DATABASE_URL or, if unset, a throwaway pgserver instance.
+
+    python loadtest.py run [--concurrency 1,4,16,64] [--step-seconds 30] [--mix analyze=15,...]
+    python loadtest.py compare loadtest_reports/<old>.json loadtest_reports/<new>.json
+
+Each run writes loadtest_reports/<commit>.json with throughput, p50/p95/p99
+latency, error and rejection rates and event-loop lag per endpoint and
+concurrency step, so runs on different commits can be compared.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+LOADTEST_DATABASE_URL = os.getenv("LOADTEST_DATABASE_URL")
+LOADTEST_REPORT_DIR = os.getenv("LOADTEST_REPORT_DIR", "loadtest_reports")
+# Requests tag themselves with this header so the server can attribute loop lag to them.
+ENDPOINT_HEADER = "X-Loadtest-Endpoint"
+
+
+# --- Server Side ---
+class LagAttribution:
+    """
+    Samples event-loop lag like loop_lag.EventLoopLagMonitor and charges each
+    sample to every request in flight at the time, so an endpoint's figure is
+    the worst stall its requests had to sit through, whoever caused it.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._in_flight: Dict[int, list] = {}
+        self.reset()
+
+    def reset(self):
+        self._samples: List[float] = []
+        self._by_endpoint: Dict[str, List[float]] = {}
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            self._samples.append(lag)
+            for record in self._in_flight.values():
+                record[1] = max(record[1], lag)
+
+    def middleware(self, app):
+        async def asgi(scope, receive, send):
+            endpoint = None
+            if scope["type"] == "http":
+                endpoint = dict(scope["headers"]).get(ENDPOINT_HEADER.lower().encode(), b"").decode() or None
+            if endpoint is None:
+                return await app(scope, receive, send)
+            record = self._in_flight[id(scope)] = [endpoint, 0.0]
+            try:
+                await app(scope, receive, send)
+            finally:
+                del self._in_flight[id(scope)]
+                self._by_endpoint.setdefault(endpoint, []).append(record[1])
+        return asgi
+
+    def stats(self) -> dict:
+        return {
+            "overall": lag_summary(self._samples),
+            "endpoints": {name: lag_summary(values) for name, values in self._by_endpoint.items()},
+        }
+
+
+def lag_summary(values: List[float]) -> dict:
+    ordered = sorted(values)
+    return {
+        "lag_ms_p50": round(percentile(ordered, 0.50) * 1000, 2) if ordered else None,
+        "lag_ms_p99": round(percentile(ordered, 0.99) * 1000, 2) if ordered else None,
+        "lag_ms_max": round(ordered[-1] * 1000, 2) if ordered else None,
+    }
+
+
+def create_app():
+    """uvicorn --factory entry point: api.main with the fake LLM and lag attribution installed."""
+    import fake_gemini
+    fake_gemini.install()
+    from api import main
+    from loop_lag import LOOP_LAG_INTERVAL_SECONDS
+
+    # All load comes from one address, so per-IP limits would only measure the limiter.
+    main.limiter.enabled = os.getenv("LOADTEST_RATE_LIMITS", "0") == "1"
+    attribution = LagAttribution(LOOP_LAG_INTERVAL_SECONDS)
+
+    @main.app.on_event("startup")
+    async def start_attribution():
+        asyncio.create_task(attribution.run())
+
+    @main.app.get("/__loadtest/lag", include_in_schema=False)
+    async def loadtest_lag(reset: bool = False):
+        stats = attribution.stats()
+        if reset:
+            attribution.reset()
+        return stats
+
+    return attribution.middleware(main.app)
+
+
+# --- Local Clerk Stand-In ---
+class LocalTokenIssuer:
+    """RSA key whose JWKS is served over HTTP on 127.0.0.1, plus RS256 session tokens for it."""
+
+    KID = "loadtest-key"
+
+    def __init__(self):
+        from cryptography.hazmat.primitives.asymmetric import rsa
+        from jwt.algorithms import RSAAlgorithm
+
+        self._private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        jwk = json.loads(RSAAlgorithm.to_jwk(self._private_key.public_key()))
+        jwk.update({"kid": self.KID, "use": "sig", "alg": "RS256"})
+        body = json.dumps({"keys": [jwk]}).encode()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        self.jwks_url = f"http://127.0.0.1:{self._server.server_port}/.well-known/jwks.json"
+
+    def token(self, user_id: str, ttl_seconds: int) -> str:
+        import jwt
+        now = int(time.time())
+        claims = {"sub": user_id, "iat": now, "nbf": now, "exp": now + ttl_seconds, "azp": "http://localhost:3000"}
+        return jwt.encode(claims, self._private_key, algorithm="RS256", headers={"kid": self.KID})
+
+    def close(self):
+        self._server.shutdown()
+
+
+# --- Local Postgres ---
+def start_database(data_dir: str):
+    """Returns (dsn, label, handle); the handle is a pgserver instance to clean up, or None."""
+    if LOADTEST_DATABASE_URL:
+        return LOADTEST_DATABASE_URL, "external", None
+    try:
+        import pgserver
+    except ImportError:
+        sys.exit("Set LOADTEST_DATABASE_URL to a scratch Postgres database, or pip install pgserver.")
+    server = pgserver.get_server(data_dir, cleanup_mode="delete")
+    return server.get_uri(), "pgserver (fresh)", server
+
+
+async def migrate(dsn: str):
+    import asyncpg
+    import db
+    conn = await asyncpg.connect(dsn=dsn)
+    try:
+        await db.run_migrations(conn)
+    finally:
+        await conn.close()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_app(port: int, env: dict) -> subprocess.Popen:
+    cmd = [sys.executable, "-m", "uvicorn", "--factory", "loadtest:create_app",
+           "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    return subprocess.Popen(cmd, cwd=BACKEND_DIR, env={**os.environ, **env})
+
+
+async def wait_until_ready(client, process: subprocess.Popen, timeout: float = 120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            sys.exit(f"API server exited during startup (code {process.returncode}).")
+        try:
+            if (await client.get("/")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.25)
+    sys.exit("API server did not become ready in time.")
+
+
+# --- Workload ---
+_SKILLS = ("Python", "FastAPI", "PostgreSQL", "Docker", "Kubernetes", "AWS", "React", "TypeScript",
+           "Redis", "Kafka", "Terraform", "GraphQL", "Go", "Java", "Spark", "Airflow")
+_ROLES = ("Backend Engineer", "Data Engineer", "Full Stack Developer", "Platform Engineer", "ML Engineer")
+
+
+def build_corpus(seed: int, size: int = 12) -> dict:
+    """Deterministic resumes and JDs; a small pool so repeat analyses hit the reuse path like real users."""
+    rng = random.Random(seed)
+    resumes, jds = [], []
+    for i in range(size):
+        skills = rng.sample(_SKILLS, 7)
+        role = rng.choice(_ROLES)
+        lines = [f"Candidate {i}", f"{role} with {rng.randint(1, 12)} years of experience.", "EXPERIENCE"]
+        for job in range(rng.randint(2, 4)):
+            lines.append(f"{rng.choice(_ROLES)} at Company {rng.randint(1, 99)} ({2012 + job}-{2014 + job})")
+            lines += [f"- Built and operated services using {rng.choice(skills)} and {rng.choice(skills)}, "
+                      f"cutting latency by {rng.randint(10, 60)}%." for _ in range(rng.randint(3, 6))]
+        lines += ["SKILLS", ", ".join(skills)]
+        resumes.append("\n".join(lines))
+        required = rng.sample(_SKILLS, 6)
+        jds.append(f"We are hiring a {rng.choice(_ROLES)}. Requirements: {rng.randint(2, 8)}+ years of experience, "
+                   f"strong {', '.join(required)}. You will design, build and run production services, "
+                   f"own reliability and mentor engineers. Nice to have: {rng.choice(_SKILLS)}.")
+    return {"resumes": resumes, "jds": jds}
+
+
+@dataclass
+class Scenario:
+    name: str
+    weight: float
+    method: str
+    path: str
+    build: Callable[[random.Random, dict], dict]
+    stream: bool = False
+
+
+def _analyze_form(rng, corpus):
+    i = rng.randrange(len(corpus["resumes"]))
+    return {"data": {"jd_text": corpus["jds"][i % len(corpus["jds"])]},
+            "files": {"file": (f"resume_{i}.txt", corpus["resumes"][i].encode(), "text/plain")}}
+
+
+def _evaluate_test_body(rng, corpus):
+    questions = [{"id": q, "question": f"Question {q}", "category": rng.choice(_SKILLS), "difficulty": "medium",
+                  "options": ["A", "B", "C", "D"], "correctAnswer": "A"} for q in range(1, 11)]
+    answers = [{"question_id": q["id"], "selected_answer": rng.choice("ABCD"), "time_taken": rng.uniform(5, 60)}
+               for q in questions]
+    return {"json": {"questions": questions, "answers": answers}}
+
+
+SCENARIOS = [
+    Scenario("history_list", 25, "GET", "/history/analyses", lambda rng, c: {"params": {"limit": 20}}),
+    Scenario("history_stats", 10, "GET", "/history/stats", lambda rng, c: {}),
+    Scenario("analyze", 15, "POST", "/analyze/", _analyze_form),
+    Scenario("analyze_stream", 5, "POST", "/analyze/stream", _analyze_form, stream=True),
+    Scenario("cover_letter", 10, "POST", "/generate-cover-letter/", lambda rng, c: {"json": {
+        "resume": rng.choice(c["resumes"]), "job_description": rng.choice(c["jds"])}}, stream=True),
+    Scenario("interview_start", 5, "POST", "/interview/start/", lambda rng, c: {"json": {
+        "role": rng.choice(_ROLES), "difficulty": "medium", "num_questions": 10}}),
+    Scenario("evaluate_test", 10, "POST", "/interview/evaluate-test/", _evaluate_test_body),
+    Scenario("rewrite_description", 10, "POST", "/resume-builder/rewrite-description/", lambda rng, c: {"json": {
+        "title": rng.choice(_ROLES), "description": rng.choice(c["resumes"]).split("\n")[4]}}),
+    Scenario("save_job", 10, "POST", "/save-job/", lambda rng, c: {"json": {
+        "job_title": rng.choice(_ROLES), "company_name": f"Company {rng.randint(1, 500)}",
+        "job_url": f"https://jobs.example.com/{rng.randint(1, 10 ** 6)}"}}),
+]
+
+
+def parse_mix(spec: Optional[str]) -> List[Scenario]:
+    """`name=weight,...` overrides the default weights; weight 0 drops an endpoint."""
+    scenarios = {s.name: s for s in SCENARIOS}
+    if spec:
+        for item in spec.split(","):
+            name, _, weight = item.partition("=")
+            if name.strip() not in scenarios:
+                sys.exit(f"Unknown endpoint '{name}'. Known: {', '.join(scenarios)}")
+            scenarios[name.strip()].weight = float(weight)
+    return [s for s in scenarios.values() if s.weight > 0]
+
+
+# --- Load Generation ---
+def percentile(ordered: List[float], p: float) -> float:
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+class StepRecorder:
+    def __init__(self):
+        self.samples: Dict[str, list] = {}
+
+    def record(self, endpoint: str, outcome: str, latency: float, ttfb: Optional[float]):
+        self.samples.setdefault(endpoint, []).append((outcome, latency, ttfb))
+
+    def summarize(self, elapsed: float, lag: dict) -> dict:
+        endpoints = {}
+        for name, samples in sorted(self.samples.items()):
+            latencies = sorted(latency for outcome, latency, _ in samples if outcome == "ok")
+            ttfbs = sorted(ttfb for outcome, _, ttfb in samples if outcome == "ok" and ttfb is not None)
+            outcomes = [outcome for outcome, _, _ in samples]
+            row = {
+                "requests": len(samples),
+                "throughput_rps": round(outcomes.count("ok") / elapsed, 2),
+                "error_rate": round(sum(o not in ("ok", "rejected") for o in outcomes) / len(samples), 4),
+                "rejected_rate": round(outcomes.count("rejected") / len(samples), 4),
+            }
+            for p in (50, 95, 99):
+                row[f"latency_ms_p{p}"] = round(percentile(latencies, p / 100) * 1000, 1) if latencies else None
+            row["ttfb_ms_p50"] = round(percentile(ttfbs, 0.5) * 1000, 1) if ttfbs else None
+            row.update(lag.get("endpoints", {}).get(name, {}))
+            row["errors"] = {o: outcomes.count(o) for o in sorted(set(outcomes)) if o not in ("ok", "rejected")}
+            endpoints[name] = row
+        ok = sum(r["throughput_rps"] for r in endpoints.values())
+        total = sum(r["requests"] for r in endpoints.values())
+        return {
+            "seconds": round(elapsed, 1),
+            "throughput_rps": round(ok, 2),
+            "requests": total,
+            "event_loop_lag": lag.get("overall", {}),
+            "endpoints": endpoints,
+        }
+
+
+async def issue(client, scenario: Scenario, token: str, rng: random.Random, corpus: dict, recorder: StepRecorder):
+    request = scenario.build(rng, corpus)
+    headers = {"Authorization": f"Bearer {token}", ENDPOINT_HEADER: scenario.name}
+    started = time.perf_counter()
+    ttfb = None
+    try:
+        async with client.stream(scenario.method, scenario.path, headers=headers, **request) as response:
+            body = b""
+            async for chunk in response.aiter_bytes():
+                if ttfb is None:
+                    ttfb = time.perf_counter() - started
+                body += chunk
+        if response.status_code == 429:
+            outcome = "rejected"
+        elif response.status_code >= 400:
+            outcome = f"http_{response.status_code}"
+        elif scenario.stream and b"event: error" in body:
+            outcome = "stream_error"
+        else:
+            outcome = "ok"
+    except Exception as e:
+        outcome = type(e).__name__
+    recorder.record(scenario.name, outcome, time.perf_counter() - started, ttfb if scenario.stream else None)
+
+
+async def run_step(client, scenarios, tokens, corpus, concurrency: int, seconds: float, seed: int) -> StepRecorder:
+    """Closed loop: `concurrency` virtual users, each sending its next request as soon as the last one finishes."""
+    recorder = StepRecorder()
+    deadline = time.monotonic() + seconds
+    weights = [s.weight for s in scenarios]
+
+    async def virtual_user(index: int):
+        rng = random.Random(seed * 100003 + index)
+        token = tokens[index % len(tokens)]
+        while time.monotonic() < deadline:
+            await issue(client, rng.choices(scenarios, weights)[0], token, rng, corpus, recorder)
+
+    await asyncio.gather(*(virtual_user(i) for i in range(concurrency)))
+    return recorder
+
+
+def git_commit() -> dict:
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=BACKEND_DIR, capture_output=True, text=True).stdout.strip()
+    return {"commit": git("rev-parse", "HEAD") or "unknown", "dirty": bool(git("status", "--porcelain"))}
+
+
+def fake_llm_config() -> dict:
+    import fake_gemini
+    return {name: str(getattr(fake_gemini, name)) for name in dir(fake_gemini) if name.startswith("FAKE_LLM_")}
+
+
+async def run(args) -> dict:
+    import httpx
+
+    scenarios = parse_mix(args.mix)
+    steps = [int(c) for c in args.concurrency.split(",")]
+    corpus = build_corpus(args.seed)
+    issuer = LocalTokenIssuer()
+    ttl = int(args.warmup_seconds + len(steps) * args.step_seconds) + 600
+    tokens = [issuer.token(f"loadtest_user_{i}", ttl) for i in range(args.users)]
+
+    data_dir = tempfile.mkdtemp(prefix="loadtest_pg_")
+    dsn, database, pg = start_database(data_dir)
+    await migrate(dsn)
+    port = free_port()
+    overrides = {"FAKE_LLM_SEED": str(args.seed), **dict(item.split("=", 1) for item in args.env)}
+    process = start_app(port, {
+        "CLERK_JWKS_URL": issuer.jwks_url,
+        "GOOGLE_API_KEY": "loadtest",
+        "DATABASE_URL": dsn,
+        **overrides,
+    })
+    limits = httpx.Limits(max_connections=max(steps) + 10, max_keepalive_connections=max(steps) + 10)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=args.timeout, limits=limits) as client:
+            await wait_until_ready(client, process)
+            if args.warmup_seconds:
+                await run_step(client, scenarios, tokens, corpus, min(steps), args.warmup_seconds, args.seed)
+            results = []
+            for concurrency in steps:
+                await client.get("/__loadtest/lag", params={"reset": True})
+                started = time.perf_counter()
+                recorder = await run_step(client, scenarios, tokens, corpus, concurrency, args.step_seconds, args.seed)
+                elapsed = time.perf_counter() - started
+                lag = (await client.get("/__loadtest/lag")).json()
+                step = {"concurrency": concurrency, **recorder.summarize(elapsed, lag)}
+                results.append(step)
+                print(f"concurrency {concurrency:4d}: {step['throughput_rps']:8.2f} req/s, "
+                      f"{step['requests']} requests, loop lag p99 {step['event_loop_lag'].get('lag_ms_p99')} ms")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        issuer.close()
+        if pg is not None:
+            pg.cleanup()
+
+    return {
+        **git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "concurrency": steps,
+            "step_seconds": args.step_seconds,
+            "warmup_seconds": args.warmup_seconds,
+            "users": args.users,
+            "seed": args.seed,
+            "mix": {s.name: s.weight for s in scenarios},
+            "database": database,
+            "fake_llm": {**fake_llm_config(), **{k: v for k, v in overrides.items() if k.startswith("FAKE_LLM_")}},
+            "env": {k: v for k, v in overrides.items() if not k.startswith("FAKE_LLM_")},
+        },
+        "steps": results,
+    }
+
+
+# --- Reporting ---
+def format_report(report: dict) -> str:
+    lines = [f"## Load test {report['commit'][:12]}{' (dirty)' if report['dirty'] else ''} — {report['created_at']}"]
+    for step in report["steps"]:
+        lag = step["event_loop_lag"]
+        lines += ["", f"### concurrency {step['concurrency']}: {step['throughput_rps']} req/s, "
+                      f"loop lag p50 {lag.get('lag_ms_p50')} ms / p99 {lag.get('lag_ms_p99')} ms", "",
+                  "| endpoint | req/s | p50 ms | p95 ms | p99 ms | errors | 429s | lag p99 ms |",
+                  "|---|---:|---:|---:|---:|---:|---:|---:|"]
+        for name, row in step["endpoints"].items():
+            lines.append(f"| {name} | {row['throughput_rps']} | {row['latency_ms_p50']} | {row['latency_ms_p95']} | "
+                         f"{row['latency_ms_p99']} | {row['error_rate']:.1%} | {row['rejected_rate']:.1%} | "
+                         f"{row.get('lag_ms_p99')} |")
+    return "\n".join(lines)
+
+
+def _change(old, new) -> str:
+    if old is None or new is None:
+        return f"{old} -> {new}"
+    pct = f" ({(new - old) / old:+.0%})" if old else ""
+    return f"{old} -> {new}{pct}"
+
+
+def compare_reports(old: dict, new: dict) -> str:
+    """Throughput, p95 latency, error rate and loop lag per endpoint for the steps both runs share."""
+    lines = [f"## {old['commit'][:12]} -> {new['commit'][:12]}"]
+    if old["config"] != new["config"]:
+        lines.append("**Warning:** the runs used different configurations; differences may not be the code's.")
+    old_steps = {s["concurrency"]: s for s in old["steps"]}
+    for step in new["steps"]:
+        before = old_steps.get(step["concurrency"])
+        if before is None:
+            continue
+        lines += ["", f"### concurrency {step['concurrency']}: {_change(before['throughput_rps'], step['throughput_rps'])} req/s", "",
+                  "| endpoint | req/s | p95 ms | error rate | lag p99 ms |", "|---|---|---|---|---|"]
+        for name, row in step["endpoints"].items():
+            prev = before["endpoints"].get(name, {})
+            lines.append(f"| {name} | {_change(prev.get('throughput_rps'), row['throughput_rps'])} | "
+                         f"{_change(prev.get('latency_ms_p95'), row['latency_ms_p95'])} | "
+                         f"{_change(prev.get('error_rate'), row['error_rate'])} | "
+                         f"{_change(prev.get('lag_ms_p99'), row.get('lag_ms_p99'))} |")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the API against local stand-ins for Gemini, Clerk and Postgres.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run")
+    run_parser.add_argument("--concurrency", default="1,4,16,64", help="comma-separated virtual user counts, one step each")
+    run_parser.add_argument("--step-seconds", type=float, default=30)
+    run_parser.add_argument("--warmup-seconds", type=float, default=5)
+    run_parser.add_argument("--users", type=int, default=200, help="distinct signed-in users the virtual users rotate through")
+    run_parser.add_argument("--mix", help="endpoint weights, e.g. analyze=15,history_list=25 (0 drops one)")
+    run_parser.add_argument("--seed", type=int, default=1)
+    run_parser.add_argument("--timeout", type=float, default=120)
+    run_parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                            help="extra server environment, e.g. FAKE_LLM_ERROR_RATE=0.02 or LLM_MAX_CONCURRENCY=32")
+    run_parser.add_argument("--out", help=f"report path (default {LOADTEST_REPORT_DIR}/<commit>.json)")
+    compare_parser = commands.add_parser("compare")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        with open(args.old, encoding="utf-8") as f_old, open(args.new, encoding="utf-8") as f_new:
+            print(compare_reports(json.load(f_old), json.load(f_new)))
+        return 0
+
+    report = asyncio.run(run(args))
+    out = args.out or os.path.join(LOADTEST_REPORT_DIR, f"{report['commit'][:12]}{'-dirty' if report['dirty'] else ''}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(format_report(report))
+    print(f"\nReport written to {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
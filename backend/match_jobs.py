@@ -0,0 +1,177 @@
+# backend/match_jobs.py
+import asyncio
+import multiprocessing
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+import db
+from admission import BULK, AdmissionRejected, admission_controller
+from utils import sanitize_filename
+
+MATCH_WORKERS = int(os.getenv("MATCH_WORKERS", "2"))
+MATCH_JOB_DIR = os.getenv("MATCH_JOB_DIR", "match_jobs")
+MATCH_MAX_FILES = int(os.getenv("MATCH_MAX_FILES", "500"))
+MATCH_ITEM_STALE_SECONDS = float(os.getenv("MATCH_ITEM_STALE_SECONDS", "900"))
+# How often a job whose remaining items are all claimed elsewhere checks whether it can finish.
+MATCH_JOB_POLL_SECONDS = float(os.getenv("MATCH_JOB_POLL_SECONDS", "30"))
+
+
+# --- Worker Process ---
+def _init_worker():
+    """Load the matcher (spaCy + embedding models) once per worker process."""
+    import google.generativeai as genai
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if api_key:
+        genai.configure(api_key=api_key)
+    from shared_models import configure_pool_worker
+    configure_pool_worker()
+    import matcher  # noqa: F401
+
+
+def _score_file(file_path: str, jd_text: str, weights: Optional[dict], required_years: int) -> dict:
+    from matcher import score_resume_vs_jd
+    result = score_resume_vs_jd(file_path, jd_text, weights=weights, required_years=required_years)
+    result.pop("candidate_path", None)
+    return result
+
+
+# --- Job Runner ---
+class MatchJobRunner:
+    """
+    Runs bulk matching jobs on a process pool that keeps the models loaded.
+    Job and item state lives in Postgres; uploaded files live under MATCH_JOB_DIR
+    until their job finishes, so unfinished jobs are picked up again on startup.
+    """
+
+    def __init__(self, get_pool: Callable, workers: int = MATCH_WORKERS, job_dir: str = MATCH_JOB_DIR):
+        self.get_pool = get_pool
+        self.workers = workers
+        self.job_dir = job_dir
+        self._executor = None
+        self._running = {}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return self._executor
+
+    async def run_in_worker(self, fn, *args):
+        """Run `fn` on the same worker pool, where the models are already loaded."""
+        return await asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+
+    def save_uploads(self, uploads) -> Tuple[str, List[tuple]]:
+        """Copy uploads into a fresh staging directory; returns (directory, [(filename, path)])."""
+        staging_dir = os.path.join(self.job_dir, os.urandom(8).hex())
+        os.makedirs(staging_dir, exist_ok=True)
+        items = []
+        for index, upload in enumerate(uploads):
+            safe_name = sanitize_filename(upload.filename) or f"resume_{index}.txt"
+            path = os.path.join(staging_dir, f"{index:05d}_{safe_name}")
+            with open(path, "wb") as f:
+                shutil.copyfileobj(upload.file, f, length=1024 * 1024)
+            items.append((upload.filename or safe_name, os.path.abspath(path)))
+        return staging_dir, items
+
+    async def submit(self, user_id: str, jd_text: str, uploads, weights: Optional[dict], required_years: int) -> str:
+        staging_dir, items = await asyncio.to_thread(self.save_uploads, uploads)
+        try:
+            async with self.get_pool().acquire() as conn:
+                job_id = await db.create_match_job(conn, user_id, jd_text, weights, required_years, items)
+        except Exception:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+        self.start(job_id, user_id, jd_text, weights, required_years)
+        return str(job_id)
+
+    def start(self, job_id, user_id: str, jd_text: str, weights: Optional[dict], required_years: int):
+        if job_id not in self._running:
+            self._running[job_id] = asyncio.create_task(
+                self._run_job(job_id, user_id, jd_text, weights, required_years)
+            )
+
+    async def resume_unfinished(self):
+        try:
+            async with self.get_pool().acquire() as conn:
+                jobs = await db.fetch_unfinished_match_jobs(conn)
+        except Exception as e:
+            print(f"--- ERROR: could not load unfinished match jobs: {e} ---")
+            return
+        for job in jobs:
+            # Items left 'running' were being scored by the process this one replaced; score them again
+            # now rather than after MATCH_ITEM_STALE_SECONDS. Completing an item is guarded on its
+            # status, so if another live worker was still scoring one, only the first result counts.
+            try:
+                async with self.get_pool().acquire() as conn:
+                    requeued = await db.requeue_running_match_job_items(conn, job["id"])
+            except Exception as e:
+                print(f"--- ERROR: could not requeue items of match job {job['id']}: {e} ---")
+                requeued = 0
+            print(f"--- Resuming match job {job['id']} ({requeued} interrupted items requeued) ---")
+            self.start(job["id"], job["user_id"], job["jd_text"], job["weights"], job["required_years"])
+
+    async def _run_job(self, job_id, user_id: str, jd_text: str, weights: Optional[dict], required_years: int):
+        try:
+            while True:
+                lanes = [self._lane(job_id, user_id, jd_text, weights, required_years) for _ in range(self.workers)]
+                await asyncio.gather(*lanes)
+                async with self.get_pool().acquire() as conn:
+                    finished = await db.finish_match_job(conn, job_id)
+                    unfinished = 0 if finished else await db.count_unfinished_match_job_items(conn, job_id)
+                if not unfinished:
+                    break
+                # Items still claimed elsewhere: wait for them to finish, or to go stale so a lane reclaims them.
+                await asyncio.sleep(MATCH_JOB_POLL_SECONDS)
+            if finished:
+                async with self.get_pool().acquire() as conn:
+                    paths = await db.fetch_match_job_file_paths(conn, job_id)
+                for staging_dir in {os.path.dirname(p) for p in paths}:
+                    shutil.rmtree(staging_dir, ignore_errors=True)
+        except Exception as e:
+            print(f"--- ERROR running match job {job_id}: {e} ---")
+        finally:
+            self._running.pop(job_id, None)
+
+    async def _lane(self, job_id, user_id: str, jd_text: str, weights: Optional[dict], required_years: int):
+        """Claim and score items one at a time until the job has none left."""
+        loop = asyncio.get_running_loop()
+        while True:
+            async with self.get_pool().acquire() as conn:
+                item = await db.claim_match_job_item(conn, job_id, MATCH_ITEM_STALE_SECONDS)
+            if item is None:
+                return
+
+            # The matcher calls Gemini, so go through admission control at bulk
+            # priority; cost=0 skips the per-user budget but not the shared ceiling.
+            while True:
+                try:
+                    ticket = await admission_controller.acquire(user_id, BULK, cost=0)
+                    break
+                except AdmissionRejected as e:
+                    await asyncio.sleep(e.retry_after)
+
+            try:
+                result = await loop.run_in_executor(
+                    self._get_executor(), _score_file, item["file_path"], jd_text, weights, required_years
+                )
+                result["candidate"] = item["filename"]
+                score, error = result["final_score_pct"], None
+            except Exception as e:
+                print(f"--- ERROR scoring {item['filename']} in match job {job_id}: {e} ---")
+                result, score, error = None, None, str(e) or type(e).__name__
+            finally:
+                ticket.release()
+
+            async with self.get_pool().acquire() as conn:
+                await db.complete_match_job_item(conn, job_id, item["item_index"], score, result, error)
+
+    def shutdown(self):
+        for task in self._running.values():
+            task.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,14 +1,13 @@
 # matcher.py
 from utils import save_upload_to_temp, extract_text_from_path, clean_whitespace, chunk_text
-from model_utils import load_embedder, load_cross_encoder, embed_texts, build_faiss_index, search_faiss
+from model_utils import load_embedder, load_cross_encoder, load_nlp, embed_texts, rerank_pairs, build_faiss_index, search_faiss
 from recommender import suggest_missing_skills, generate_bullet_rewrites, prioritized_learning_plan
-import spacy
 import re
 import numpy as np
 from collections import defaultdict
 
 # This line requires the 'en_core_web_sm' model you are installing.
-nlp = spacy.load("en_core_web_sm")
+nlp = load_nlp()
 
 # load models (lazy)
 EMBEDDER = load_embedder()
@@ -60,12 +59,14 @@ def extract_skills_dynamic(text):
             clean.add(s2)
     return sorted(list(clean))
 
-def extract_experience_years(text):
+def extract_experience_years(text, use_llm=True):
     """Return years of experience mentioned (best-effort)."""
     m = re.findall(r"(\d{1,2})\+?\s*(?:years|yrs)\b", text.lower())
     if m:
         years = max(int(x) for x in m)
         return years
+    if not use_llm:
+        return 0
     # LLM fallback
     try:
         from model_utils import load_generator
@@ -108,7 +109,7 @@ def score_resume_vs_jd(resume_path, jd_text, weights=None, required_years=0, top
             pair_list.append((jd_chunks[int(j_idx)][:512], resume_chunks[int(r_idx)][:512]))
             pair_indices.append((j_idx, r_idx))
 
-    cross_scores = CROSS_ENCODER.predict(pair_list, show_progress_bar=False) if pair_list else []
+    cross_scores = rerank_pairs(pair_list, model=CROSS_ENCODER) if pair_list else []
 
     per_resume_scores = defaultdict(list)
     per_jd_scores = defaultdict(list)
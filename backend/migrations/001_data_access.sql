@@ -0,0 +1,92 @@
+-- 001_data_access.sql
+-- Baseline schema for the tables written by api/main.py, JSONB columns for the
+-- repository codecs, and the unique key used by the saved_jobs upsert.
+
+CREATE TABLE IF NOT EXISTS rex_ai (
+    id                   uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id              text NOT NULL,
+    created_at           timestamptz NOT NULL DEFAULT now(),
+    job_title            text,
+    job_description      text,
+    original_resume_text text,
+    ai_score             integer,
+    keyword_match_score  integer,
+    ats_score            integer,
+    suggestions          jsonb,
+    keywords_matched     jsonb,
+    keywords_missing     jsonb
+);
+
+CREATE TABLE IF NOT EXISTS mock_tests (
+    id               uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id          text NOT NULL,
+    created_at       timestamptz NOT NULL DEFAULT now(),
+    job_role         text,
+    difficulty       text,
+    overall_score    integer,
+    duration_minutes integer,
+    questions        jsonb,
+    answers          jsonb,
+    feedback         text,
+    suggestions      jsonb,
+    category_scores  jsonb,
+    status           text
+);
+
+CREATE TABLE IF NOT EXISTS mock_interviews (
+    id               uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id          text NOT NULL,
+    created_at       timestamptz NOT NULL DEFAULT now(),
+    job_role         text,
+    interview_type   text,
+    settings         jsonb,
+    overall_score    integer,
+    duration_minutes integer,
+    questions        jsonb,
+    answers          jsonb,
+    feedback         text,
+    suggestions      jsonb,
+    category_scores  jsonb,
+    status           text
+);
+
+CREATE TABLE IF NOT EXISTS saved_jobs (
+    id                 uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id            text NOT NULL,
+    created_at         timestamptz NOT NULL DEFAULT now(),
+    job_title          text NOT NULL,
+    company            text NOT NULL,
+    location           text,
+    external_url       text,
+    application_status text
+);
+
+-- Tables created before this migration may hold JSON as text.
+ALTER TABLE rex_ai
+    ALTER COLUMN suggestions TYPE jsonb USING suggestions::jsonb,
+    ALTER COLUMN keywords_matched TYPE jsonb USING keywords_matched::jsonb,
+    ALTER COLUMN keywords_missing TYPE jsonb USING keywords_missing::jsonb;
+
+ALTER TABLE mock_tests
+    ALTER COLUMN questions TYPE jsonb USING questions::jsonb,
+    ALTER COLUMN answers TYPE jsonb USING answers::jsonb,
+    ALTER COLUMN suggestions TYPE jsonb USING suggestions::jsonb,
+    ALTER COLUMN category_scores TYPE jsonb USING category_scores::jsonb;
+
+ALTER TABLE mock_interviews
+    ALTER COLUMN settings TYPE jsonb USING settings::jsonb,
+    ALTER COLUMN questions TYPE jsonb USING questions::jsonb,
+    ALTER COLUMN answers TYPE jsonb USING answers::jsonb,
+    ALTER COLUMN suggestions TYPE jsonb USING suggestions::jsonb,
+    ALTER COLUMN category_scores TYPE jsonb USING category_scores::jsonb;
+
+-- Remove duplicates left by the old check-then-insert race before adding the key.
+DELETE FROM saved_jobs a
+    USING saved_jobs b
+    WHERE a.user_id = b.user_id
+      AND a.job_title = b.job_title
+      AND a.company = b.company
+      AND a.ctid > b.ctid;
+
+CREATE UNIQUE INDEX IF NOT EXISTS saved_jobs_user_title_company_key
+    ON saved_jobs (user_id, job_title, company);
@@ -0,0 +1,111 @@
+-- 002_history.sql
+-- Keyset-pagination indexes for the history endpoints and a per-user summary
+-- table kept current by triggers, so dashboard stats never scan history.
+
+CREATE INDEX IF NOT EXISTS rex_ai_user_created_id_idx
+    ON rex_ai (user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS mock_tests_user_created_id_idx
+    ON mock_tests (user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS mock_interviews_user_created_id_idx
+    ON mock_interviews (user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS saved_jobs_user_created_id_idx
+    ON saved_jobs (user_id, created_at DESC, id DESC);
+
+CREATE TABLE IF NOT EXISTS user_activity_stats (
+    user_id              text PRIMARY KEY,
+    analyses_count       integer NOT NULL DEFAULT 0,
+    analyses_score_sum   bigint NOT NULL DEFAULT 0,
+    tests_count          integer NOT NULL DEFAULT 0,
+    tests_score_sum      bigint NOT NULL DEFAULT 0,
+    interviews_count     integer NOT NULL DEFAULT 0,
+    interviews_score_sum bigint NOT NULL DEFAULT 0,
+    saved_jobs_count     integer NOT NULL DEFAULT 0,
+    updated_at           timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION bump_user_activity_stats() RETURNS trigger AS $$
+DECLARE
+    rec record;
+    delta integer;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        rec := NEW;
+        delta := 1;
+    ELSE
+        rec := OLD;
+        delta := -1;
+    END IF;
+
+    INSERT INTO user_activity_stats (user_id) VALUES (rec.user_id) ON CONFLICT (user_id) DO NOTHING;
+
+    IF TG_TABLE_NAME = 'rex_ai' THEN
+        UPDATE user_activity_stats
+           SET analyses_count = analyses_count + delta,
+               analyses_score_sum = analyses_score_sum + delta * COALESCE(rec.ai_score, 0),
+               updated_at = now()
+         WHERE user_id = rec.user_id;
+    ELSIF TG_TABLE_NAME = 'mock_tests' THEN
+        UPDATE user_activity_stats
+           SET tests_count = tests_count + delta,
+               tests_score_sum = tests_score_sum + delta * COALESCE(rec.overall_score, 0),
+               updated_at = now()
+         WHERE user_id = rec.user_id;
+    ELSIF TG_TABLE_NAME = 'mock_interviews' THEN
+        UPDATE user_activity_stats
+           SET interviews_count = interviews_count + delta,
+               interviews_score_sum = interviews_score_sum + delta * COALESCE(rec.overall_score, 0),
+               updated_at = now()
+         WHERE user_id = rec.user_id;
+    ELSIF TG_TABLE_NAME = 'saved_jobs' THEN
+        UPDATE user_activity_stats
+           SET saved_jobs_count = saved_jobs_count + delta,
+               updated_at = now()
+         WHERE user_id = rec.user_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS rex_ai_activity_stats ON rex_ai;
+CREATE TRIGGER rex_ai_activity_stats AFTER INSERT OR DELETE ON rex_ai
+    FOR EACH ROW EXECUTE FUNCTION bump_user_activity_stats();
+DROP TRIGGER IF EXISTS mock_tests_activity_stats ON mock_tests;
+CREATE TRIGGER mock_tests_activity_stats AFTER INSERT OR DELETE ON mock_tests
+    FOR EACH ROW EXECUTE FUNCTION bump_user_activity_stats();
+DROP TRIGGER IF EXISTS mock_interviews_activity_stats ON mock_interviews;
+CREATE TRIGGER mock_interviews_activity_stats AFTER INSERT OR DELETE ON mock_interviews
+    FOR EACH ROW EXECUTE FUNCTION bump_user_activity_stats();
+DROP TRIGGER IF EXISTS saved_jobs_activity_stats ON saved_jobs;
+CREATE TRIGGER saved_jobs_activity_stats AFTER INSERT OR DELETE ON saved_jobs
+    FOR EACH ROW EXECUTE FUNCTION bump_user_activity_stats();
+
+-- Backfill from existing history.
+INSERT INTO user_activity_stats (
+    user_id, analyses_count, analyses_score_sum, tests_count, tests_score_sum,
+    interviews_count, interviews_score_sum, saved_jobs_count
+)
+SELECT user_id, sum(a_count), sum(a_sum), sum(t_count), sum(t_sum), sum(i_count), sum(i_sum), sum(j_count)
+FROM (
+    SELECT user_id, count(*) AS a_count, COALESCE(sum(ai_score), 0) AS a_sum,
+           0 AS t_count, 0 AS t_sum, 0 AS i_count, 0 AS i_sum, 0 AS j_count
+      FROM rex_ai GROUP BY user_id
+    UNION ALL
+    SELECT user_id, 0, 0, count(*), COALESCE(sum(overall_score), 0), 0, 0, 0
+      FROM mock_tests GROUP BY user_id
+    UNION ALL
+    SELECT user_id, 0, 0, 0, 0, count(*), COALESCE(sum(overall_score), 0), 0
+      FROM mock_interviews GROUP BY user_id
+    UNION ALL
+    SELECT user_id, 0, 0, 0, 0, 0, 0, count(*)
+      FROM saved_jobs GROUP BY user_id
+) history
+GROUP BY user_id
+ON CONFLICT (user_id) DO UPDATE SET
+    analyses_count = EXCLUDED.analyses_count,
+    analyses_score_sum = EXCLUDED.analyses_score_sum,
+    tests_count = EXCLUDED.tests_count,
+    tests_score_sum = EXCLUDED.tests_score_sum,
+    interviews_count = EXCLUDED.interviews_count,
+    interviews_score_sum = EXCLUDED.interviews_score_sum,
+    saved_jobs_count = EXCLUDED.saved_jobs_count,
+    updated_at = now();
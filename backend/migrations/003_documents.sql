@@ -0,0 +1,22 @@
+-- 003_documents.sql
+-- Content-addressed storage for resume and job description text. Bodies are
+-- zstd-compressed by the application, so TOAST compression is turned off.
+-- Existing rex_ai rows are moved over by `python db.py backfill-documents`.
+
+CREATE TABLE IF NOT EXISTS documents (
+    content_hash  text PRIMARY KEY,
+    kind          text NOT NULL,
+    codec         text NOT NULL,
+    body          bytea NOT NULL,
+    original_size integer NOT NULL,
+    created_at    timestamptz NOT NULL DEFAULT now()
+);
+
+ALTER TABLE documents ALTER COLUMN body SET STORAGE EXTERNAL;
+
+ALTER TABLE rex_ai
+    ADD COLUMN IF NOT EXISTS resume_document_hash text REFERENCES documents (content_hash),
+    ADD COLUMN IF NOT EXISTS jd_document_hash text REFERENCES documents (content_hash);
+
+CREATE INDEX IF NOT EXISTS rex_ai_user_documents_idx
+    ON rex_ai (user_id, resume_document_hash, jd_document_hash);
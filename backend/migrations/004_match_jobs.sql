@@ -0,0 +1,37 @@
+-- 004_match_jobs.sql
+-- Persistent state for bulk resume-vs-JD matching jobs, so a restart resumes
+-- from the items that were not finished.
+
+CREATE TABLE IF NOT EXISTS match_jobs (
+    id               uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id          text NOT NULL,
+    created_at       timestamptz NOT NULL DEFAULT now(),
+    updated_at       timestamptz NOT NULL DEFAULT now(),
+    status           text NOT NULL DEFAULT 'queued',
+    jd_text          text NOT NULL,
+    weights          jsonb,
+    required_years   integer NOT NULL DEFAULT 0,
+    total_items      integer NOT NULL,
+    completed_items  integer NOT NULL DEFAULT 0,
+    failed_items     integer NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS match_job_items (
+    job_id      uuid NOT NULL REFERENCES match_jobs (id) ON DELETE CASCADE,
+    item_index  integer NOT NULL,
+    filename    text NOT NULL,
+    file_path   text NOT NULL,
+    status      text NOT NULL DEFAULT 'pending',
+    claimed_at  timestamptz,
+    final_score double precision,
+    result      jsonb,
+    error       text,
+    PRIMARY KEY (job_id, item_index)
+);
+
+CREATE INDEX IF NOT EXISTS match_jobs_user_created_idx
+    ON match_jobs (user_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS match_jobs_unfinished_idx
+    ON match_jobs (created_at) WHERE status IN ('queued', 'running');
+CREATE INDEX IF NOT EXISTS match_job_items_ranked_idx
+    ON match_job_items (job_id, final_score DESC NULLS LAST, item_index);
@@ -0,0 +1,75 @@
+-- 005_llm_usage.sql
+-- One row per Gemini call, written in batches by llm_usage.UsageRecorder, plus
+-- reporting views for cost per endpoint, heaviest users and latency percentiles.
+
+CREATE TABLE IF NOT EXISTS llm_calls (
+    id             bigserial PRIMARY KEY,
+    created_at     timestamptz NOT NULL,
+    endpoint       text NOT NULL,
+    user_id        text,
+    model          text NOT NULL,
+    prompt_tokens  integer,
+    output_tokens  integer,
+    latency_ms     double precision NOT NULL,
+    ttft_ms        double precision,
+    outcome        text NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS llm_calls_created_at_idx ON llm_calls (created_at);
+CREATE INDEX IF NOT EXISTS llm_calls_user_created_idx ON llm_calls (user_id, created_at);
+
+-- USD per million tokens; update when pricing changes.
+CREATE TABLE IF NOT EXISTS llm_model_prices (
+    model                   text PRIMARY KEY,
+    input_usd_per_million   numeric NOT NULL,
+    output_usd_per_million  numeric NOT NULL
+);
+
+INSERT INTO llm_model_prices (model, input_usd_per_million, output_usd_per_million) VALUES
+    ('gemini-2.5-pro', 1.25, 10.00),
+    ('gemini-2.5-flash', 0.30, 2.50),
+    ('gemini-1.5-pro-latest', 1.25, 5.00)
+ON CONFLICT (model) DO NOTHING;
+
+CREATE OR REPLACE VIEW llm_call_costs AS
+SELECT c.*,
+       (coalesce(c.prompt_tokens, 0) * coalesce(p.input_usd_per_million, 0)
+        + coalesce(c.output_tokens, 0) * coalesce(p.output_usd_per_million, 0)) / 1e6 AS cost_usd
+FROM llm_calls c
+LEFT JOIN llm_model_prices p ON p.model = c.model;
+
+CREATE OR REPLACE VIEW llm_cost_by_endpoint AS
+SELECT endpoint,
+       count(*) AS calls,
+       count(*) FILTER (WHERE outcome <> 'ok') AS failed_calls,
+       sum(prompt_tokens) AS prompt_tokens,
+       sum(output_tokens) AS output_tokens,
+       round(sum(cost_usd)::numeric, 4) AS cost_usd
+FROM llm_call_costs
+WHERE created_at > now() - interval '30 days'
+GROUP BY endpoint
+ORDER BY cost_usd DESC;
+
+CREATE OR REPLACE VIEW llm_heaviest_users AS
+SELECT user_id,
+       count(*) AS calls,
+       sum(prompt_tokens) AS prompt_tokens,
+       sum(output_tokens) AS output_tokens,
+       round(sum(cost_usd)::numeric, 4) AS cost_usd
+FROM llm_call_costs
+WHERE created_at > now() - interval '30 days' AND user_id IS NOT NULL
+GROUP BY user_id
+ORDER BY cost_usd DESC;
+
+CREATE OR REPLACE VIEW llm_latency_by_endpoint AS
+SELECT endpoint,
+       count(*) AS calls,
+       percentile_cont(0.50) WITHIN GROUP (ORDER BY latency_ms) AS latency_p50_ms,
+       percentile_cont(0.95) WITHIN GROUP (ORDER BY latency_ms) AS latency_p95_ms,
+       percentile_cont(0.99) WITHIN GROUP (ORDER BY latency_ms) AS latency_p99_ms,
+       percentile_cont(0.50) WITHIN GROUP (ORDER BY ttft_ms) AS ttft_p50_ms,
+       percentile_cont(0.95) WITHIN GROUP (ORDER BY ttft_ms) AS ttft_p95_ms
+FROM llm_calls
+WHERE created_at > now() - interval '7 days' AND outcome = 'ok'
+GROUP BY endpoint
+ORDER BY endpoint;
@@ -0,0 +1,22 @@
+-- 006_analysis_results.sql
+-- Every fresh /analyze/ result, keyed by the resume and JD document hashes, with
+-- a MinHash signature of the JD and its LSH band keys for near-duplicate lookup.
+-- rex_ai only holds analyses the user chose to save, without the full result.
+
+CREATE TABLE IF NOT EXISTS analysis_results (
+    id                    bigserial PRIMARY KEY,
+    user_id               text NOT NULL,
+    created_at            timestamptz NOT NULL DEFAULT now(),
+    resume_document_hash  text NOT NULL REFERENCES documents (content_hash),
+    jd_document_hash      text NOT NULL REFERENCES documents (content_hash),
+    result                jsonb NOT NULL,
+    jd_minhash            bigint[] NOT NULL,
+    jd_lsh_bands          bigint[] NOT NULL,
+    latency_ms            double precision
+);
+
+CREATE INDEX IF NOT EXISTS analysis_results_exact_idx
+    ON analysis_results (user_id, resume_document_hash, jd_document_hash, created_at DESC);
+
+CREATE INDEX IF NOT EXISTS analysis_results_lsh_idx
+    ON analysis_results USING gin (jd_lsh_bands);
@@ -0,0 +1,11 @@
+-- 007_resume_builder.sql
+-- The resume-builder document, one per user. `version` goes up by one on every
+-- write; clients send it back (as the ETag) so concurrent edits cannot silently
+-- overwrite each other.
+
+CREATE TABLE IF NOT EXISTS resume_builder_documents (
+    user_id     text PRIMARY KEY,
+    document    jsonb NOT NULL,
+    version     integer NOT NULL,
+    updated_at  timestamptz NOT NULL DEFAULT now()
+);
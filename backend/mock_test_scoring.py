@@ -0,0 +1,159 @@
+# backend/mock_test_scoring.py
+import statistics
+from collections import defaultdict
+from typing import Any, Dict, List
+
+WEAK_CATEGORY_THRESHOLD = 60
+
+
+def _percent(correct: int, total: int) -> int:
+    return round(100 * correct / total) if total else 0
+
+
+def _is_correct(question: dict, answer: dict) -> bool:
+    """Grade against the question's correctAnswer; the client's is_correct is only used when there is none."""
+    selected = answer.get("selected_answer")
+    if question.get("correctAnswer") is not None:
+        return selected is not None and str(selected).strip() == str(question["correctAnswer"]).strip()
+    return bool(answer.get("is_correct"))
+
+
+def _timing_stats(times: List[float], correct_times: List[float], incorrect_times: List[float]) -> dict:
+    def mean(values):
+        return round(statistics.fmean(values), 2) if values else None
+
+    return {
+        "total_seconds": round(sum(times), 2),
+        "average_seconds": mean(times),
+        "median_seconds": round(statistics.median(times), 2) if times else None,
+        "fastest_seconds": min(times) if times else None,
+        "slowest_seconds": max(times) if times else None,
+        "average_correct_seconds": mean(correct_times),
+        "average_incorrect_seconds": mean(incorrect_times),
+    }
+
+
+def score_test(questions: List[Dict[str, Any]], answers: List[Dict[str, Any]]) -> dict:
+    """
+    Grade a multiple-choice test locally. Questions are matched to answers by
+    id/question_id; questions without an answer count as unanswered and wrong.
+    The result keeps the TestEvaluation fields (category_scores,
+    detailed_feedback, overall_feedback, suggestions) so it can be used in its place.
+    """
+    answers_by_id = {a.get("question_id"): a for a in answers}
+    by_category = defaultdict(lambda: [0, 0])
+    by_difficulty = defaultdict(lambda: [0, 0])
+    times, correct_times, incorrect_times = [], [], []
+    per_question = []
+    detailed_feedback = []
+    correct_count = answered_count = 0
+
+    for question in questions:
+        answer = answers_by_id.get(question.get("id"), {})
+        answered = answer.get("selected_answer") is not None
+        correct = _is_correct(question, answer)
+        time_taken = answer.get("time_taken")
+
+        correct_count += correct
+        answered_count += answered
+        for bucket in (by_category[question.get("category") or "general"],
+                       by_difficulty[question.get("difficulty") or "unknown"]):
+            bucket[0] += correct
+            bucket[1] += 1
+        if isinstance(time_taken, (int, float)):
+            times.append(time_taken)
+            (correct_times if correct else incorrect_times).append(time_taken)
+
+        per_question.append({
+            "question_id": question.get("id"),
+            "category": question.get("category"),
+            "difficulty": question.get("difficulty"),
+            "answered": answered,
+            "is_correct": correct,
+            "time_taken": time_taken,
+        })
+        if correct:
+            feedback = "Correct."
+        elif not answered:
+            feedback = f"Not answered. The correct answer is: {question.get('correctAnswer')}."
+        else:
+            feedback = f"Incorrect. You chose \"{answer.get('selected_answer')}\"; the correct answer is: {question.get('correctAnswer')}."
+        detailed_feedback.append({"question_id": question.get("id"), "feedback": feedback})
+
+    total = len(questions)
+    category_scores = {c: _percent(*counts) for c, counts in by_category.items()}
+    difficulty_scores = {d: _percent(*counts) for d, counts in by_difficulty.items()}
+    overall_score = _percent(correct_count, total)
+
+    overall_feedback = f"You answered {correct_count} of {total} questions correctly ({overall_score}%)."
+    if len(category_scores) > 1:
+        strongest = max(category_scores, key=category_scores.get)
+        weakest = min(category_scores, key=category_scores.get)
+        overall_feedback += f" Strongest area: {strongest} ({category_scores[strongest]}%). Weakest area: {weakest} ({category_scores[weakest]}%)."
+
+    suggestions = [
+        f"Review {category} topics; you scored {score}% in this area."
+        for category, score in sorted(category_scores.items(), key=lambda item: item[1])
+        if score < WEAK_CATEGORY_THRESHOLD
+    ]
+    if total and answered_count < total:
+        suggestions.append(f"{total - answered_count} question(s) were left unanswered; practice pacing to finish within the time limit.")
+    if incorrect_times and correct_times and statistics.fmean(incorrect_times) < 0.5 * statistics.fmean(correct_times):
+        suggestions.append("Wrong answers were given much faster than right ones; read each question fully before answering.")
+    if not suggestions:
+        suggestions.append("Try the next difficulty level to keep improving.")
+
+    return {
+        "overall_score": overall_score,
+        "total_questions": total,
+        "answered_questions": answered_count,
+        "correct_answers": correct_count,
+        "category_scores": category_scores,
+        "difficulty_scores": difficulty_scores,
+        "timing": _timing_stats(times, correct_times, incorrect_times),
+        "per_question": per_question,
+        "detailed_feedback": detailed_feedback,
+        "overall_feedback": overall_feedback,
+        "suggestions": suggestions,
+    }
+
+
+def build_narrative_prompt(job_role: str, score: dict, questions: List[Dict[str, Any]]) -> str:
+    """A short coaching prompt from the local score; only the missed questions are included."""
+    missed_ids = {q["question_id"] for q in score["per_question"] if not q["is_correct"]}
+    missed = [
+        {"question": q.get("question"), "category": q.get("category"), "correctAnswer": q.get("correctAnswer")}
+        for q in questions if q.get("id") in missed_ids
+    ]
+    return f"""
+    You are a supportive interview coach. A candidate preparing for a '{job_role}' role just finished a multiple-choice test.
+    Score: {score['overall_score']}% ({score['correct_answers']}/{score['total_questions']} correct).
+    Category scores: {score['category_scores']}
+    Difficulty scores: {score['difficulty_scores']}
+    Timing: {score['timing']}
+    Missed questions: {missed}
+
+    Write 2-3 short paragraphs of personalised feedback: what the results say about their strengths, which concepts to study next (based on the missed questions), and one concrete study plan for the coming week. Plain text, no headings.
+    """
+
+
+if __name__ == "__main__":
+    # Scoring latency: python mock_test_scoring.py
+    import random
+    import time
+
+    categories, difficulties = ["technical", "behavioral", "system design"], ["easy", "medium", "hard"]
+    questions = [
+        {"id": i, "question": f"Q{i}", "category": random.choice(categories),
+         "difficulty": random.choice(difficulties), "options": ["A", "B", "C", "D"], "correctAnswer": "A"}
+        for i in range(20)
+    ]
+    answers = [
+        {"question_id": i, "selected_answer": random.choice(["A", "B", None]), "time_taken": random.uniform(5, 90)}
+        for i in range(20)
+    ]
+    runs = 5000
+    start = time.perf_counter()
+    for _ in range(runs):
+        score_test(questions, answers)
+    print(f"20-question test scored in {(time.perf_counter() - start) / runs * 1e6:,.1f} us")
@@ -3,23 +3,36 @@ import google.generativeai as genai
 from sentence_transformers import SentenceTransformer, CrossEncoder
 import numpy as np
 import faiss
+from shared_models import load_shared
+from inference_service import INFERENCE_BATCHING, inference_service
 
 _EMBEDDER = None
 _CROSS_ENCODER = None
 _GENERATOR = None
+_NLP = None
 
 def load_embedder():
 	global _EMBEDDER
 	if _EMBEDDER is None:
-		_EMBEDDER = SentenceTransformer('all-MiniLM-L6-v2')
+		_EMBEDDER = load_shared('all-MiniLM-L6-v2', lambda: SentenceTransformer('all-MiniLM-L6-v2'))
 	return _EMBEDDER
 
 def load_cross_encoder():
 	global _CROSS_ENCODER
 	if _CROSS_ENCODER is None:
-		_CROSS_ENCODER = CrossEncoder('cross-encoder/ms-marco-MiniLM-L-6-v2')
+		_CROSS_ENCODER = load_shared(
+			'cross-encoder/ms-marco-MiniLM-L-6-v2', lambda: CrossEncoder('cross-encoder/ms-marco-MiniLM-L-6-v2')
+		)
 	return _CROSS_ENCODER
 
+def load_nlp():
+	# spaCy pipelines are not torch modules, so they are only shared by pre-fork loading.
+	global _NLP
+	if _NLP is None:
+		import spacy
+		_NLP = load_shared('en_core_web_sm', lambda: spacy.load('en_core_web_sm'), mappable=False)
+	return _NLP
+
 def load_generator():
 	# Using a supported Gemini model as a placeholder generator.
 	global _GENERATOR
@@ -29,9 +42,25 @@ def load_generator():
 	return _GENERATOR
 
 def embed_texts(texts, model=None):
+	# The shared embedder is batched with other callers' texts by the inference service.
 	model = model or load_embedder()
+	if INFERENCE_BATCHING and model is _EMBEDDER and len(texts):
+		return inference_service.submit('embed', texts).result()
 	return model.encode(texts, convert_to_numpy=True)
 
+def rerank_pairs(pairs, model=None):
+	model = model or load_cross_encoder()
+	if INFERENCE_BATCHING and model is _CROSS_ENCODER and len(pairs):
+		return inference_service.submit('rerank', pairs).result()
+	return model.predict(pairs, show_progress_bar=False)
+
+inference_service.register(
+	'embed', lambda texts: load_embedder().encode(texts, convert_to_numpy=True, batch_size=min(len(texts), inference_service.max_batch), show_progress_bar=False)
+)
+inference_service.register(
+	'rerank', lambda pairs: load_cross_encoder().predict(pairs, batch_size=min(len(pairs), inference_service.max_batch), show_progress_bar=False)
+)
+
 def build_faiss_index(embeddings):
 	dim = embeddings.shape[1]
 	index = faiss.IndexFlatL2(dim)
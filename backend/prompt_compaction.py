@@ -0,0 +1,212 @@
+# backend/prompt_compaction.py
+import math
+import os
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+
+from utils import chunk_text
+
+PROMPT_RESUME_TOKEN_BUDGET = int(os.getenv("PROMPT_RESUME_TOKEN_BUDGET", "1800"))
+PROMPT_JD_TOKEN_BUDGET = int(os.getenv("PROMPT_JD_TOKEN_BUDGET", "1200"))
+COMPACTION_CHUNK_WORDS = 60
+
+# Paragraphs in JDs that carry no signal about the role itself.
+_BOILERPLATE_PATTERNS = [
+    r"equal (employment )?opportunity",
+    r"\beeo\b",
+    r"regardless of (race|gender|age|religion)",
+    r"without regard to",
+    r"reasonable accommodation",
+    r"e-verify",
+    r"privacy (notice|policy)",
+    r"\b401\(?k\)?",
+    r"(medical|dental|vision|health) (insurance|coverage|benefits)",
+    r"paid time off|\bpto\b",
+    r"parental leave",
+    r"(benefits|perks) (include|we offer)",
+    r"what we offer",
+    r"recruitment agencies|unsolicited (resumes|applications)",
+]
+_BOILERPLATE = re.compile("|".join(_BOILERPLATE_PATTERNS), re.IGNORECASE)
+
+COMPACTION_METRICS = defaultdict(lambda: {"requests": 0, "original_tokens": 0, "compacted_tokens": 0})
+
+
+@dataclass
+class CompactedInputs:
+    resume_text: str
+    jd_text: str
+    original_tokens: int
+    compacted_tokens: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.original_tokens - self.compacted_tokens
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough Gemini token count (~4 characters per token for English prose)."""
+    return math.ceil(len(text) / 4)
+
+
+def dedupe_lines(text: str) -> str:
+    """Drop repeated lines (OCR page headers/footers, pasted duplicates) and collapse blank runs."""
+    seen = set()
+    kept = []
+    for line in text.splitlines():
+        key = re.sub(r"\W+", " ", line).strip().lower()
+        if key:
+            if key in seen:
+                continue
+            seen.add(key)
+        elif kept and not kept[-1].strip():
+            continue
+        kept.append(line.rstrip())
+    return "\n".join(kept).strip()
+
+
+def strip_boilerplate(jd_text: str) -> str:
+    paragraphs = re.split(r"\n\s*\n", jd_text)
+    return "\n\n".join(p for p in paragraphs if not _BOILERPLATE.search(p)).strip()
+
+
+def _truncate_to_budget(text: str, budget_tokens: int) -> str:
+    max_chars = budget_tokens * 4
+    return text if len(text) <= max_chars else text[:max_chars].rsplit(" ", 1)[0]
+
+
+def _relevance_scores(chunks: List[str], query_chunks: List[str]) -> np.ndarray:
+    """Max cosine similarity of each chunk to any query chunk; lexical overlap if embeddings are unavailable."""
+    try:
+        from model_utils import embed_texts
+        embs = embed_texts(chunks + query_chunks)
+        embs = embs / (np.linalg.norm(embs, axis=1, keepdims=True) + 1e-9)
+        return (embs[:len(chunks)] @ embs[len(chunks):].T).max(axis=1)
+    except (ImportError, OSError) as e:
+        print(f"--- WARNING: embeddings unavailable for prompt compaction, using keyword overlap: {e} ---")
+        query_words = set(re.findall(r"\w+", " ".join(query_chunks).lower()))
+        return np.array([
+            len(set(re.findall(r"\w+", c.lower())) & query_words) / (len(set(c.split())) + 1)
+            for c in chunks
+        ])
+
+
+def select_relevant_text(text: str, query: str, budget_tokens: int) -> str:
+    """Keep the chunks of `text` most relevant to `query`, in original order, within the token budget."""
+    if estimate_tokens(text) <= budget_tokens:
+        return text
+    chunks = chunk_text(text, max_words=COMPACTION_CHUNK_WORDS, overlap=0)
+    query_chunks = chunk_text(query, max_words=COMPACTION_CHUNK_WORDS, overlap=0) or [query]
+    scores = _relevance_scores(chunks, query_chunks)
+
+    # The opening chunk (name, contact, summary) is always kept.
+    selected = {0}
+    used = estimate_tokens(chunks[0])
+    for index in np.argsort(-scores):
+        cost = estimate_tokens(chunks[index])
+        if index in selected or used + cost > budget_tokens:
+            continue
+        selected.add(int(index))
+        used += cost
+    return "\n...\n".join(chunks[i] for i in sorted(selected))
+
+
+def compact_inputs(resume_text: str, jd_text: str, endpoint: str, select_resume_chunks: bool = True,
+                   resume_budget: int = PROMPT_RESUME_TOKEN_BUDGET,
+                   jd_budget: int = PROMPT_JD_TOKEN_BUDGET) -> CompactedInputs:
+    """
+    Shrink the resume and JD before they go into a prompt. Endpoints that must
+    reproduce the whole resume pass select_resume_chunks=False to only dedupe it.
+    """
+    original_tokens = estimate_tokens(resume_text) + estimate_tokens(jd_text)
+
+    compact_jd = _truncate_to_budget(dedupe_lines(strip_boilerplate(jd_text)) or jd_text, jd_budget)
+    compact_resume = dedupe_lines(resume_text)
+    if select_resume_chunks:
+        compact_resume = select_relevant_text(compact_resume, compact_jd, resume_budget)
+
+    result = CompactedInputs(
+        resume_text=compact_resume,
+        jd_text=compact_jd,
+        original_tokens=original_tokens,
+        compacted_tokens=estimate_tokens(compact_resume) + estimate_tokens(compact_jd),
+    )
+    metrics = COMPACTION_METRICS[endpoint]
+    metrics["requests"] += 1
+    metrics["original_tokens"] += result.original_tokens
+    metrics["compacted_tokens"] += result.compacted_tokens
+    return result
+
+
+def get_compaction_metrics() -> dict:
+    report = {}
+    for endpoint, counts in COMPACTION_METRICS.items():
+        saved = counts["original_tokens"] - counts["compacted_tokens"]
+        report[endpoint] = {
+            **counts,
+            "tokens_saved": saved,
+            "savings_ratio": round(saved / counts["original_tokens"], 4) if counts["original_tokens"] else 0.0,
+        }
+    return report
+
+
+if __name__ == "__main__":
+    # Offline evaluation: python prompt_compaction.py pairs.jsonl [--score]
+    # Each line holds "jd_text" and either "resume_text" or "resume_path". With
+    # --score, every pair is analyzed twice (full and compacted prompt) and the
+    # score differences are reported; this calls Gemini and needs the API env.
+    import asyncio
+    import json
+    import sys
+
+    from utils import extract_text_from_path
+
+    pairs = []
+    with open(sys.argv[1], encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                pair = json.loads(line)
+                if "resume_text" not in pair:
+                    pair["resume_text"] = extract_text_from_path(pair["resume_path"])
+                pairs.append(pair)
+
+    compacted_pairs = [compact_inputs(p["resume_text"], p["jd_text"], "offline_eval") for p in pairs]
+    for index, compacted in enumerate(compacted_pairs):
+        print(f"pair {index}: {compacted.original_tokens} -> {compacted.compacted_tokens} tokens "
+              f"({compacted.tokens_saved} saved)")
+    print(f"totals: {get_compaction_metrics()['offline_eval']}")
+
+    if "--score" in sys.argv:
+        from api.main import ResumeAnalysisResult, build_analysis_prompt, genai
+        from structured_output import generate_structured
+
+        score_fields = ["overall_score", "job_match", "ats_score"]
+
+        async def analyze(jd_text, resume_text):
+            model = genai.GenerativeModel("gemini-2.5-pro")
+            return await generate_structured(
+                model, build_analysis_prompt(jd_text, resume_text), ResumeAnalysisResult, endpoint="offline_eval"
+            )
+
+        async def score_pairs():
+            deltas = {field: [] for field in score_fields}
+            keyword_overlap = []
+            for pair, compacted in zip(pairs, compacted_pairs):
+                full = await analyze(pair["jd_text"], pair["resume_text"])
+                compact = await analyze(compacted.jd_text, compacted.resume_text)
+                for field in score_fields:
+                    deltas[field].append(getattr(compact, field) - getattr(full, field))
+                full_keywords, compact_keywords = set(full.keywords_matched), set(compact.keywords_matched)
+                union = full_keywords | compact_keywords
+                keyword_overlap.append(len(full_keywords & compact_keywords) / len(union) if union else 1.0)
+            for field, values in deltas.items():
+                mean_abs = sum(abs(v) for v in values) / len(values)
+                print(f"{field}: mean delta {sum(values) / len(values):+.2f}, mean |delta| {mean_abs:.2f}, "
+                      f"max |delta| {max(abs(v) for v in values)}")
+            print(f"matched-keyword Jaccard (full vs compacted): {sum(keyword_overlap) / len(keyword_overlap):.3f}")
+
+        asyncio.run(score_pairs())
@@ -0,0 +1,454 @@
+# backend/rank_resumes.py
+"""
+Rank a directory or archive of resumes against one job description.
+
+    python rank_resumes.py jd.txt resumes/ --out ranking.csv --workers 4
+    python rank_resumes.py jd.txt export.zip --out ranking.parquet
+
+Files are streamed through a bounded queue into a process pool running
+matcher.score_resume_vs_jd, and every result is appended to the output as it
+arrives. The output doubles as the checkpoint: rerunning the same command skips
+every source already in it, so an interrupted run picks up where it stopped.
+With --retry-failed a source can appear twice; its last row is the one that
+counts, and the output is compacted to one row per source when the run ends.
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import queue
+import shutil
+import signal
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
+
+RESUME_EXTENSIONS = (".pdf", ".docx", ".doc", ".txt")
+CSV_COLUMNS = (
+    "source", "final_score_pct", "semantic_score_norm", "skill_overlap_pct", "experience_match_pct",
+    "years_experience", "resume_skills", "missing_skills", "error",
+)
+_DONE = object()
+
+
+# --- Worker Process ---
+def _init_worker():
+    """Load the matcher (spaCy + embedding models) once per worker process."""
+    # Ctrl-C reaches the whole process group; the parent decides how to stop.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".env.local"))
+    import google.generativeai as genai
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if api_key:
+        genai.configure(api_key=api_key)
+    from shared_models import configure_pool_worker
+    configure_pool_worker()
+    import matcher  # noqa: F401
+
+
+def _score(path: str, jd_text: str, weights: Optional[dict], required_years: int) -> dict:
+    from matcher import score_resume_vs_jd
+    result = score_resume_vs_jd(path, jd_text, weights=weights, required_years=required_years)
+    result.pop("candidate_path", None)
+    return result
+
+
+# --- Sources ---
+def _is_resume(name: str) -> bool:
+    return name.lower().endswith(RESUME_EXTENSIONS) and not os.path.basename(name).startswith(".")
+
+
+def count_sources(path: str) -> Optional[int]:
+    """Number of resumes in `path`, or None for tar archives, which can only be read front to back."""
+    if os.path.isdir(path):
+        return sum(_is_resume(f) for _, _, files in os.walk(path) for f in files)
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            return sum(_is_resume(n) for n in archive.namelist() if not n.endswith("/"))
+    return None
+
+
+def iter_sources(path: str, staging_dir: str, skip: Set[str]) -> Iterator[Tuple[str, str, bool]]:
+    """
+    Yield (source, local path, is_staged) for every resume not in `skip`. Archive
+    members are extracted into `staging_dir` one at a time; the consumer deletes
+    each staged copy once it has been scored.
+    """
+    def stage(source: str, fileobj) -> str:
+        staged = os.path.join(staging_dir, f"{os.urandom(6).hex()}{os.path.splitext(source)[1].lower()}")
+        with open(staged, "wb") as out:
+            shutil.copyfileobj(fileobj, out, length=1024 * 1024)
+        return staged
+
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                source = os.path.relpath(os.path.join(root, name), path)
+                if _is_resume(name) and source not in skip:
+                    yield source, os.path.join(root, name), False
+    elif zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and _is_resume(info.filename) and info.filename not in skip:
+                    with archive.open(info) as member:
+                        yield info.filename, stage(info.filename, member), True
+    elif tarfile.is_tarfile(path):
+        with tarfile.open(path, "r|*") as archive:
+            for member in archive:
+                if member.isfile() and _is_resume(member.name) and member.name not in skip:
+                    yield member.name, stage(member.name, archive.extractfile(member)), True
+    else:
+        raise ValueError(f"{path} is not a directory, zip or tar archive")
+
+
+# --- Output Writers ---
+def _summary_row(source: str, result: Optional[dict], error: Optional[str]) -> dict:
+    if result is None:
+        return {"source": source, "error": (error or "").replace("\n", " ")}
+    resume_skills = set(result.get("resume_skills", []))
+    return {
+        "source": source,
+        **{k: result[k] for k in CSV_COLUMNS[1:6]},
+        "resume_skills": "; ".join(result.get("resume_skills", [])),
+        "missing_skills": "; ".join(s for s in result.get("jd_skills", []) if s not in resume_skills),
+        "error": "",
+    }
+
+
+def _truncate_partial_line(path: str):
+    """Drop a half-written last line left by a run that was killed mid-write."""
+    with open(path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size == 0:
+            return
+        f.seek(max(0, size - 65536))
+        tail = f.read()
+        if not tail.endswith(b"\n"):
+            cut = tail.rfind(b"\n")
+            f.truncate(size - len(tail) + cut + 1 if cut >= 0 else 0)
+
+
+def _done_sources(rows: Iterable[dict], retry_failed: bool) -> Set[str]:
+    """Sources to skip; a retried source appears more than once and its last row wins."""
+    last_error = {row["source"]: row.get("error") for row in rows}
+    return {source for source, error in last_error.items() if not (retry_failed and error)}
+
+
+def _last_per_source(rows: Iterable[dict]) -> List[dict]:
+    latest = {}
+    for row in rows:
+        latest[row["source"]] = row
+    return list(latest.values())
+
+
+class CsvWriter:
+    def __init__(self, path: str):
+        self.path = path
+
+    def completed(self, retry_failed: bool) -> Set[str]:
+        if not os.path.exists(self.path):
+            return set()
+        _truncate_partial_line(self.path)
+        with open(self.path, newline="", encoding="utf-8") as f:
+            return _done_sources(csv.DictReader(f), retry_failed)
+
+    def compact(self):
+        """Rewrite the file with only the last row for each source."""
+        with open(self.path, newline="", encoding="utf-8") as f:
+            rows = _last_per_source(csv.DictReader(f))
+        with open(self.path + ".tmp", "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS)
+            writer.writeheader()
+            writer.writerows(rows)
+        os.replace(self.path + ".tmp", self.path)
+
+    def open(self):
+        is_new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self._file = open(self.path, "a", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=CSV_COLUMNS)
+        if is_new:
+            self._writer.writeheader()
+
+    def write(self, source: str, result: Optional[dict], error: Optional[str]):
+        self._writer.writerow(_summary_row(source, result, error))
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class JsonlWriter:
+    """One full result per line, including snippet alignments and LLM suggestions."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def completed(self, retry_failed: bool) -> Set[str]:
+        if not os.path.exists(self.path):
+            return set()
+        _truncate_partial_line(self.path)
+        with open(self.path, encoding="utf-8") as f:
+            return _done_sources((json.loads(line) for line in f), retry_failed)
+
+    def compact(self):
+        """Rewrite the file with only the last line for each source."""
+        with open(self.path, encoding="utf-8") as f:
+            rows = _last_per_source(json.loads(line) for line in f)
+        with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        os.replace(self.path + ".tmp", self.path)
+
+    def open(self):
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def write(self, source: str, result: Optional[dict], error: Optional[str]):
+        row = {"source": source, **(result or {}), "error": error}
+        self._file.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetWriter:
+    """
+    Parquet files cannot be appended to, so `path` is a directory of part files
+    written every `rows_per_part` results; rows still buffered when a run dies
+    are scored again on resume.
+    """
+
+    def __init__(self, path: str, rows_per_part: int = 200):
+        self.path = path
+        self.rows_per_part = rows_per_part
+        self._rows = []
+
+    def _parts(self) -> List[str]:
+        # Part names carry their write time, so sorting them gives write order.
+        return sorted(os.path.join(self.path, name) for name in os.listdir(self.path) if name.endswith(".parquet"))
+
+    def completed(self, retry_failed: bool) -> Set[str]:
+        if not os.path.isdir(self.path):
+            return set()
+        import pyarrow.parquet as pq
+        return _done_sources(
+            (row for part in self._parts() for row in pq.read_table(part, columns=["source", "error"]).to_pylist()),
+            retry_failed
+        )
+
+    def compact(self):
+        """Replace the part files with one holding only the last row for each source."""
+        import pyarrow.parquet as pq
+        parts = self._parts()
+        self._rows = _last_per_source(row for part in parts for row in pq.read_table(part).to_pylist())
+        # The new part sorts last, so a crash before the old parts are removed still reads correctly.
+        self._flush()
+        for part in parts:
+            os.remove(part)
+
+    def open(self):
+        os.makedirs(self.path, exist_ok=True)
+
+    def write(self, source: str, result: Optional[dict], error: Optional[str]):
+        self._rows.append(_summary_row(source, result, error))
+        if len(self._rows) >= self.rows_per_part:
+            self._flush()
+
+    def _flush(self):
+        if not self._rows:
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pylist([{c: row.get(c) for c in CSV_COLUMNS} for row in self._rows])
+        name = f"part-{time.time_ns()}.parquet"
+        pq.write_table(table, os.path.join(self.path, name + ".tmp"))
+        os.replace(os.path.join(self.path, name + ".tmp"), os.path.join(self.path, name))
+        self._rows = []
+
+    def close(self):
+        self._flush()
+
+
+def open_writer(path: str):
+    if path.endswith(".csv"):
+        return CsvWriter(path)
+    if path.endswith(".jsonl"):
+        return JsonlWriter(path)
+    if path.endswith(".parquet"):
+        return ParquetWriter(path)
+    raise ValueError("--out must end in .csv, .jsonl or .parquet")
+
+
+# --- Progress ---
+class Progress:
+    def __init__(self, total: Optional[int], already_done: int, interval: float = 5.0):
+        self.total = total
+        self.already_done = already_done
+        self.interval = interval
+        self.done = 0
+        self.failed = 0
+        self._started = time.monotonic()
+        self._last_report = 0.0
+
+    def update(self, failed: bool, force: bool = False):
+        self.done += 1
+        self.failed += failed
+        now = time.monotonic()
+        if force or now - self._last_report >= self.interval:
+            self._last_report = now
+            print(self.line(), file=sys.stderr, flush=True)
+
+    def line(self) -> str:
+        elapsed = time.monotonic() - self._started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        finished = self.already_done + self.done
+        if self.total is None:
+            position, eta = f"{finished}", "?"
+        else:
+            remaining = max(0, self.total - finished)
+            position = f"{finished}/{self.total}"
+            eta = time.strftime("%H:%M:%S", time.gmtime(remaining / rate)) if rate > 0 else "?"
+        return f"{position} resumes, {self.failed} failed, {rate:.2f}/s, ETA {eta}"
+
+
+# --- Pipeline ---
+def rank(jd_text: str, input_path: str, writer, workers: int, queue_size: int, weights: Optional[dict],
+         required_years: int, retry_failed: bool = False) -> bool:
+    """Score every resume in `input_path` not already in the output; False if interrupted first."""
+    done = writer.completed(retry_failed)
+    total = count_sources(input_path)
+    if done:
+        print(f"--- Resuming: {len(done)} resumes already in the output ---", file=sys.stderr)
+    progress = Progress(total, len(done))
+
+    staging_dir = tempfile.mkdtemp(prefix="rank_resumes_")
+    sources = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for item in iter_sources(input_path, staging_dir, done):
+                while not stop.is_set():
+                    try:
+                        sources.put(item, timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    return
+        except Exception as e:
+            sources.put(e)
+        sources.put(_DONE)
+
+    # First Ctrl-C stops feeding new files and lets the ones in progress finish
+    # and be written; a second one aborts immediately.
+    interrupted = threading.Event()
+
+    def on_interrupt(signum, frame):
+        if interrupted.is_set():
+            raise KeyboardInterrupt
+        interrupted.set()
+        print("\n--- Stopping after the resumes in progress; Ctrl-C again to abort ---", file=sys.stderr)
+
+    previous_handler = signal.signal(signal.SIGINT, on_interrupt)
+    producer = threading.Thread(target=produce, daemon=True)
+    executor = ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker
+    )
+    writer.open()
+    in_flight = {}
+    clean_exit = False
+    try:
+        producer.start()
+        exhausted = False
+        while not exhausted or in_flight:
+            # Keep every worker busy plus one queued task each; the queue bounds staged files.
+            while not exhausted and not interrupted.is_set() and len(in_flight) < 2 * workers:
+                try:
+                    item = sources.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if item is _DONE:
+                    exhausted = True
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    source, path, staged = item
+                    future = executor.submit(_score, path, jd_text, weights, required_years)
+                    in_flight[future] = (source, path, staged)
+            if interrupted.is_set():
+                exhausted = True
+            if not in_flight:
+                continue
+            finished, _ = wait(in_flight, timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in finished:
+                source, path, staged = in_flight.pop(future)
+                try:
+                    result, error = future.result(), None
+                except BrokenProcessPool:
+                    # A dead worker says nothing about this resume; stop without checkpointing it.
+                    raise
+                except Exception as e:
+                    result, error = None, str(e) or type(e).__name__
+                writer.write(source, result, error)
+                progress.update(failed=error is not None)
+                if staged:
+                    os.remove(path)
+        print(progress.line(), file=sys.stderr)
+        clean_exit = True
+    finally:
+        stop.set()
+        signal.signal(signal.SIGINT, previous_handler)
+        executor.shutdown(wait=clean_exit, cancel_futures=True)
+        writer.close()
+        shutil.rmtree(staging_dir, ignore_errors=True)
+    if retry_failed and clean_exit:
+        writer.compact()
+    return not interrupted.is_set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rank a directory or archive of resumes against a job description.")
+    parser.add_argument("jd", help="text file with the job description")
+    parser.add_argument("input", help="directory, .zip or .tar[.gz] of PDF/DOCX/TXT resumes")
+    parser.add_argument("--out", required=True, help="output path ending in .csv, .jsonl or .parquet")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--queue-size", type=int, default=32, help="max files staged ahead of the workers")
+    parser.add_argument("--required-years", type=int, default=0)
+    parser.add_argument("--weights", help="skills,semantic,experience weights, e.g. 0.35,0.45,0.2")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="score again resumes that failed last run; each retried resume's new row replaces "
+                             "its old one, and the output is compacted to one row per resume at the end")
+    args = parser.parse_args(argv)
+
+    weights = None
+    if args.weights:
+        skills, semantic, experience = (float(w) for w in args.weights.split(","))
+        norm = skills + semantic + experience
+        weights = {"skills": skills / norm, "semantic": semantic / norm, "experience": experience / norm}
+    with open(args.jd, encoding="utf-8") as f:
+        jd_text = f.read()
+
+    try:
+        completed = rank(jd_text, args.input, open_writer(args.out), args.workers, args.queue_size, weights,
+                         args.required_years, args.retry_failed)
+    except KeyboardInterrupt:
+        completed = False
+    if not completed:
+        print(f"--- Interrupted; rerun the same command to resume into {args.out} ---", file=sys.stderr)
+        return 130
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
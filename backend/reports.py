@@ -0,0 +1,142 @@
+# backend/reports.py
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from fpdf import FPDF
+
+REPORT_CACHE_MAX_ENTRIES = int(os.getenv("REPORT_CACHE_MAX_ENTRIES", "256"))
+REPORT_CACHE_MAX_BYTES = int(os.getenv("REPORT_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+
+class ReportCache:
+    """Thread-safe LRU of rendered PDFs bounded by entry count and total bytes."""
+
+    def __init__(self, max_entries=REPORT_CACHE_MAX_ENTRIES, max_bytes=REPORT_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            pdf_bytes = self._entries.get(key)
+            if pdf_bytes is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return pdf_bytes
+
+    def put(self, key, pdf_bytes):
+        if len(pdf_bytes) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._size -= len(self._entries.pop(key))
+            self._entries[key] = pdf_bytes
+            self._size += len(pdf_bytes)
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._size, "hits": self.hits, "misses": self.misses}
+
+
+report_cache = ReportCache()
+
+
+def _new_document(font_size):
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", size=font_size)
+    return pdf
+
+
+def _to_bytes(pdf):
+    # fpdf 1.x returns a latin-1 str, fpdf2 returns a bytearray.
+    output = pdf.output(dest="S")
+    if isinstance(output, str):
+        return output.encode("latin-1")
+    return bytes(output)
+
+
+def _render_analysis(data):
+    pdf = _new_document(12)
+    pdf.cell(200, 10, txt="AI Resume Analysis Report", ln=True, align='C')
+    pdf.cell(200, 10, txt=f"Overall Score: {data.get('overall_score', 'N/A')}", ln=True)
+    pdf.cell(200, 10, txt=f"ATS Score: {data.get('ats_score', 'N/A')}", ln=True)
+    pdf.cell(200, 10, txt=f"Job Match: {data.get('job_match', 'N/A')}", ln=True)
+    return pdf
+
+
+def _render_optimized_resume(data):
+    pdf = _new_document(10)
+    pdf.multi_cell(0, 5, txt=data["optimized_resume_text"])
+    return pdf
+
+
+def _render_test_report(data):
+    pdf = _new_document(12)
+    pdf.cell(200, 10, txt=f"{data['job_role']} Mock Test Report", ln=True, align='C')
+    pdf.cell(200, 10, txt=f"Overall Score: {data['overall_score']}/{data['total_questions']}", ln=True)
+    pdf.cell(200, 10, txt=f"Difficulty: {data['difficulty'].capitalize()}", ln=True)
+    return pdf
+
+
+RENDERERS = {
+    "analysis": _render_analysis,
+    "optimized_resume": _render_optimized_resume,
+    "test_report": _render_test_report,
+}
+
+
+def payload_hash(kind, data):
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(f"{kind}:{canonical}".encode("utf-8")).hexdigest()
+
+
+def render_report(kind, data):
+    """Render a report of the given kind to PDF bytes, served from the cache when possible."""
+    key = payload_hash(kind, data)
+    pdf_bytes = report_cache.get(key)
+    if pdf_bytes is None:
+        pdf_bytes = _to_bytes(RENDERERS[kind](data))
+        report_cache.put(key, pdf_bytes)
+    return pdf_bytes
+
+
+if __name__ == "__main__":
+    # Quick benchmark: python reports.py
+    import tempfile
+
+    temp_dir = tempfile.gettempdir()
+    files_before = set(os.listdir(temp_dir))
+    payloads = [
+        {"overall_score": i % 100, "ats_score": (i * 7) % 100, "job_match": (i * 3) % 100}
+        for i in range(500)
+    ]
+
+    start = time.perf_counter()
+    for payload in payloads:
+        render_report("analysis", payload)
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(10):
+        for payload in payloads:
+            render_report("analysis", payload)
+    warm = time.perf_counter() - start
+
+    print(f"uncached renders/sec: {len(payloads) / cold:,.0f}")
+    print(f"cached renders/sec:   {10 * len(payloads) / warm:,.0f}")
+    print(f"cache: {report_cache.stats()} (limits: {REPORT_CACHE_MAX_ENTRIES} entries, {REPORT_CACHE_MAX_BYTES} bytes)")
+    print(f"new files in {temp_dir}: {len(set(os.listdir(temp_dir)) - files_before)}")
@@ -0,0 +1,275 @@
+# backend/result_store.py
+import json
+import os
+import tempfile
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from documents import compress_text, decompress_text
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+SCORE_COLUMNS = ("final_score_pct", "semantic_score_norm", "skill_overlap_pct", "experience_match_pct")
+SKILL_COLUMNS = ("resume_skills", "jd_skills")
+# Everything else in a score_resume_vs_jd result is only needed when a candidate is opened.
+DETAIL_FIELDS = ("top_matches", "missing_skills_ranked", "bullet_suggestions", "learning_plan", "resume_preview")
+
+
+def _dumps(value) -> str:
+    if orjson is not None:
+        return orjson.dumps(value).decode("utf-8")
+    return json.dumps(value)
+
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+
+class SkillVocabulary:
+    """Interns skill strings as dense int32 IDs shared by every candidate in a store."""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.names: List[str] = []
+
+    def intern(self, skills: Iterable[str]) -> List[int]:
+        out = []
+        for skill in skills:
+            skill_id = self.ids.get(skill)
+            if skill_id is None:
+                skill_id = self.ids[skill] = len(self.names)
+                self.names.append(skill)
+            out.append(skill_id)
+        return out
+
+    def lookup(self, ids) -> List[str]:
+        return [self.names[i] for i in ids]
+
+
+class _GrowableArray:
+    """Append-only NumPy array that doubles its capacity."""
+
+    def __init__(self, dtype, capacity: int = 256):
+        self._data = np.empty(capacity, dtype=dtype)
+        self.size = 0
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=self._data.dtype)
+        needed = self.size + len(values)
+        if needed > len(self._data):
+            grown = np.empty(max(needed, 2 * len(self._data)), dtype=self._data.dtype)
+            grown[:self.size] = self._data[:self.size]
+            self._data = grown
+        self._data[self.size:needed] = values
+        self.size = needed
+
+    def append(self, value):
+        self.extend([value])
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._data[:self.size]
+
+
+class _SkillColumn:
+    """Per-candidate skill lists in CSR form: flat IDs plus row offsets."""
+
+    def __init__(self):
+        self.ids = _GrowableArray(np.int32, 4096)
+        self.offsets = _GrowableArray(np.int64)
+        self.offsets.append(0)
+
+    def append(self, skill_ids: List[int]):
+        self.ids.extend(skill_ids)
+        self.offsets.append(self.ids.size)
+
+    def row(self, index: int) -> np.ndarray:
+        offsets = self.offsets.values
+        return self.ids.values[offsets[index]:offsets[index + 1]]
+
+
+class CandidateResultStore:
+    """
+    Columnar store for matcher results. Scores live in NumPy columns, skills are
+    interned IDs in CSR arrays, and the heavy per-candidate detail (preview,
+    snippet alignments, LLM suggestions) is compressed into an append-only file
+    and read back only when a candidate is opened.
+    """
+
+    def __init__(self, detail_path: Optional[str] = None):
+        self.vocabulary = SkillVocabulary()
+        self.candidates: List[str] = []
+        self.scores = {name: _GrowableArray(np.float32) for name in SCORE_COLUMNS}
+        self.years = _GrowableArray(np.int16)
+        self.skills = {name: _SkillColumn() for name in SKILL_COLUMNS}
+        self._detail_offsets = _GrowableArray(np.int64)
+        self._detail_lengths = _GrowableArray(np.int32)
+        self._detail_codec = None
+        if detail_path is None:
+            self._detail_file = tempfile.TemporaryFile()
+        else:
+            self._detail_file = open(detail_path, "w+b")
+
+    def __len__(self) -> int:
+        return len(self.candidates)
+
+    def add(self, result: dict, candidate: Optional[str] = None) -> int:
+        """Store one score_resume_vs_jd result; returns its row index."""
+        self.candidates.append(candidate or result.get("candidate") or os.path.basename(result.get("candidate_path", "")))
+        for name in SCORE_COLUMNS:
+            self.scores[name].append(result[name])
+        self.years.append(result["years_experience"])
+        for name in SKILL_COLUMNS:
+            self.skills[name].append(self.vocabulary.intern(result[name]))
+
+        codec, body = compress_text(_dumps({field: result.get(field) for field in DETAIL_FIELDS}))
+        self._detail_codec = codec
+        self._detail_file.seek(0, os.SEEK_END)
+        self._detail_offsets.append(self._detail_file.tell())
+        self._detail_lengths.append(len(body))
+        self._detail_file.write(body)
+        return len(self.candidates) - 1
+
+    def column(self, name: str) -> np.ndarray:
+        if name == "years_experience":
+            return self.years.values
+        return self.scores[name].values
+
+    # --- Selection ---
+    def top_n(self, n: int, by: str = "final_score_pct", mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """Row indices of the `n` highest values of `by`, best first, optionally within `mask`."""
+        values = self.column(by)
+        rows = np.arange(len(values)) if mask is None else np.flatnonzero(mask)
+        if n < len(rows):
+            rows = rows[np.argpartition(-values[rows], n - 1)[:n]]
+        return rows[np.argsort(-values[rows], kind="stable")]
+
+    def has_skills(self, skills: Iterable[str], column: str = "resume_skills") -> np.ndarray:
+        """Boolean mask of candidates whose `column` contains every skill in `skills`."""
+        wanted = [self.vocabulary.ids.get(skill) for skill in skills]
+        if any(skill_id is None for skill_id in wanted):
+            return np.zeros(len(self), dtype=bool)
+        skill_column = self.skills[column]
+        offsets = skill_column.offsets.values
+        counts = np.zeros(len(self), dtype=np.int32)
+        hits = np.isin(skill_column.ids.values, wanted)
+        if hits.any():
+            rows = np.searchsorted(offsets, np.flatnonzero(hits), side="right") - 1
+            np.add.at(counts, rows, 1)
+        return counts >= len(set(wanted))
+
+    def filter(self, min_score: float = 0.0, min_years: int = 0, required_skills: Iterable[str] = ()) -> np.ndarray:
+        mask = (self.column("final_score_pct") >= min_score) & (self.years.values >= min_years)
+        required_skills = list(required_skills)
+        if required_skills:
+            mask &= self.has_skills(required_skills)
+        return mask
+
+    # --- Row Access ---
+    def summary(self, index: int) -> dict:
+        row = {"candidate": self.candidates[index]}
+        for name in SCORE_COLUMNS:
+            row[name] = round(float(self.scores[name].values[index]), 2)
+        row["years_experience"] = int(self.years.values[index])
+        return row
+
+    def detail(self, index: int) -> dict:
+        """Read one candidate's heavy fields back from the detail file."""
+        self._detail_file.seek(int(self._detail_offsets.values[index]))
+        body = self._detail_file.read(int(self._detail_lengths.values[index]))
+        return _loads(decompress_text(self._detail_codec, body))
+
+    def result(self, index: int) -> dict:
+        """The full result dict, in the shape score_resume_vs_jd returned it."""
+        full = self.summary(index)
+        for name in SKILL_COLUMNS:
+            full[name] = self.vocabulary.lookup(self.skills[name].row(index))
+        full.update(self.detail(index))
+        return full
+
+    # --- Export ---
+    def to_frame(self, rows: Optional[np.ndarray] = None):
+        import pandas as pd
+        rows = np.arange(len(self)) if rows is None else rows
+        frame = {"candidate": [self.candidates[i] for i in rows]}
+        for name in SCORE_COLUMNS + ("years_experience",):
+            frame[name] = self.column(name)[rows]
+        return pd.DataFrame(frame)
+
+    def to_arrow(self):
+        """Scores plus skill lists as dictionary-encoded list columns; detail stays out."""
+        import pyarrow as pa
+        vocabulary = pa.array(self.vocabulary.names, type=pa.string())
+        columns = {"candidate": pa.array(self.candidates, type=pa.string())}
+        for name in SCORE_COLUMNS + ("years_experience",):
+            columns[name] = pa.array(self.column(name))
+        for name in SKILL_COLUMNS:
+            skill_column = self.skills[name]
+            values = pa.DictionaryArray.from_arrays(pa.array(skill_column.ids.values), vocabulary)
+            columns[name] = pa.ListArray.from_arrays(pa.array(skill_column.offsets.values.astype(np.int32)), values)
+        return pa.table(columns)
+
+    def to_parquet(self, path: str):
+        import pyarrow.parquet as pq
+        pq.write_table(self.to_arrow(), path)
+
+    def nbytes(self) -> int:
+        arrays = [*self.scores.values(), self.years, self._detail_offsets, self._detail_lengths]
+        for skill_column in self.skills.values():
+            arrays += [skill_column.ids, skill_column.offsets]
+        return sum(a.values.nbytes for a in arrays)
+
+    def close(self):
+        self._detail_file.close()
+
+
+if __name__ == "__main__":
+    # Memory and sort/top-N time, list of result dicts vs the columnar store: python result_store.py [candidates]
+    import random
+    import sys
+    import time
+    import tracemalloc
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    skill_pool = [f"skill {i}" for i in range(800)]
+    rng = random.Random(7)
+
+    def fake_result(i):
+        return {
+            "candidate": f"resume_{i:05d}.pdf",
+            "final_score_pct": rng.uniform(0, 100), "semantic_score_norm": rng.uniform(0, 100),
+            "skill_overlap_pct": rng.uniform(0, 100), "experience_match_pct": rng.uniform(0, 100),
+            "years_experience": rng.randint(0, 20),
+            "resume_skills": rng.sample(skill_pool, 40), "jd_skills": skill_pool[:25],
+            "top_matches": [{"jd_snippet": "x" * 300, "resume_snippet": "y" * 300, "score": 0.5}] * 4,
+            "missing_skills_ranked": ["a missing skill line"] * 8,
+            "bullet_suggestions": {s: ["a suggested bullet point"] * 3 for s in skill_pool[:5]},
+            "learning_plan": "plan " * 300,
+            "resume_preview": "".join(rng.choice("abcdefgh ") for _ in range(4000)),
+        }
+
+    tracemalloc.start()
+    results = [fake_result(i) for i in range(count)]
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    top_dicts = sorted(results, key=lambda r: r["final_score_pct"], reverse=True)[:50]
+    dict_sort_ms = (time.perf_counter() - started) * 1000
+
+    store = CandidateResultStore()
+    for r in results:
+        store.add(r)
+    del results, r
+    store_bytes = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    top_rows = store.top_n(50)
+    store_sort_ms = (time.perf_counter() - started) * 1000
+    assert np.allclose(store.column("final_score_pct")[top_rows], [r["final_score_pct"] for r in top_dicts])
+
+    print(f"{count} candidates")
+    print(f"  result dicts: {dict_bytes / 1e6:7.1f} MB in memory, top-50 in {dict_sort_ms:.2f} ms")
+    print(f"  column store: {store_bytes / 1e6:7.1f} MB in memory (columns {store.nbytes() / 1e6:.2f} MB), "
+          f"top-50 in {store_sort_ms:.2f} ms")
+    store.close()
@@ -0,0 +1,170 @@
+# backend/resume_sections.py
+import asyncio
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from structured_output import generate_structured
+
+IMPROVE_SECTION_CONCURRENCY = int(os.getenv("IMPROVE_SECTION_CONCURRENCY", "4"))
+SECTION_CACHE_MAX_ENTRIES = int(os.getenv("SECTION_CACHE_MAX_ENTRIES", "5000"))
+# Bump when the prompt changes so cached rewrites from the old prompt are not reused.
+SECTION_PROMPT_VERSION = "1"
+
+
+class ImprovedSection(BaseModel):
+    text: str
+
+
+@dataclass
+class SectionUnit:
+    kind: str  # "summary", "experience" or "project"
+    item_id: str
+    context: str
+    text: str
+
+    @property
+    def cache_key(self) -> str:
+        payload = "\x1f".join([SECTION_PROMPT_VERSION, self.kind, self.context, self.text.strip()])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SectionCache:
+    """Thread-safe LRU of improved section text keyed by SectionUnit.cache_key."""
+
+    def __init__(self, max_entries: int = SECTION_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        with self._lock:
+            text = self._entries.get(key)
+            if text is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return text
+
+    def put(self, key: str, text: str):
+        with self._lock:
+            self._entries[key] = text
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+section_cache = SectionCache()
+
+
+def split_units(resume: dict) -> List[SectionUnit]:
+    """The independently improvable parts of a resume-builder document; empty text is skipped."""
+    units = []
+    if resume.get("summary", "").strip():
+        units.append(SectionUnit("summary", "summary", "", resume["summary"]))
+    for item in resume.get("experience", []):
+        if item.get("description", "").strip():
+            context = f"{item.get('title', '')} at {item.get('company', '')}"
+            units.append(SectionUnit("experience", item["id"], context, item["description"]))
+    for item in resume.get("projects", []):
+        if item.get("description", "").strip():
+            units.append(SectionUnit("project", item["id"], item.get("name", ""), item["description"]))
+    return units
+
+
+def build_section_prompt(unit: SectionUnit) -> str:
+    label = {
+        "summary": "professional summary",
+        "experience": f"description of the role '{unit.context}'",
+        "project": f"description of the project '{unit.context}'",
+    }[unit.kind]
+    return f"""
+    **Task:** You are an expert career coach and professional resume writer. Rewrite the {label} below to be more action-oriented and results-driven.
+
+    **Instructions:**
+    1.  Use the STAR (Situation, Task, Action, Result) method where applicable and incorporate quantifiable metrics where reasonable.
+    2.  Only enhance the existing text. Do not invent new jobs, skills, or projects.
+    3.  Keep one point per line if the original is written as a list.
+    4.  Return a JSON object with a single `text` field holding the rewritten text.
+
+    **ORIGINAL TEXT:**
+    {unit.text}
+    """
+
+
+def merge_units(resume: dict, improved: Dict[Tuple[str, str], str]) -> dict:
+    """Write improved text back into a copy of `resume`, matching items by kind and id."""
+    merged = {**resume}
+    if ("summary", "summary") in improved:
+        merged["summary"] = improved[("summary", "summary")]
+    for section, kind in (("experience", "experience"), ("projects", "project")):
+        merged[section] = [
+            {**item, "description": improved.get((kind, item["id"]), item["description"])}
+            for item in resume.get(section, [])
+        ]
+    return merged
+
+
+async def improve_resume_sections(model, resume: dict, user_id: str,
+                                  acquire_slot: Callable[[], Awaitable],
+                                  charge: Optional[Callable[[int], None]] = None,
+                                  concurrency: int = IMPROVE_SECTION_CONCURRENCY) -> Tuple[dict, dict]:
+    """
+    Improve each section of `resume` independently and merge the results.
+    Sections seen before (same kind, context and text) come from the cache; the
+    rest are generated concurrently, each under its own `acquire_slot()` ticket.
+    `charge(n)` is called with the number of sections to generate before any call is made.
+    Returns (merged resume, {"sections", "cached", "generated"}).
+    """
+    units = split_units(resume)
+    improved = {}
+    pending: Dict[str, List[SectionUnit]] = {}
+    for unit in units:
+        cached = section_cache.get(unit.cache_key)
+        if cached is not None:
+            improved[(unit.kind, unit.item_id)] = cached
+        else:
+            pending.setdefault(unit.cache_key, []).append(unit)
+    if charge and pending:
+        charge(len(pending))
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def improve(key: str, unit: SectionUnit):
+        async with semaphore:
+            ticket = await acquire_slot()
+            try:
+                result = await generate_structured(
+                    model, build_section_prompt(unit), ImprovedSection, endpoint="improve-resume-section", user_id=user_id
+                )
+            finally:
+                ticket.release()
+        section_cache.put(key, result.text)
+        # Map the rewrite to itself too, so resubmitting an already improved section is a cache hit.
+        section_cache.put(SectionUnit(unit.kind, unit.item_id, unit.context, result.text).cache_key, result.text)
+        for same in pending[key]:
+            improved[(same.kind, same.item_id)] = result.text
+
+    tasks = [asyncio.create_task(improve(key, group[0])) for key, group in pending.items()]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+    stats = {"sections": len(units), "cached": len(units) - sum(len(g) for g in pending.values()),
+             "generated": len(pending)}
+    return merge_units(resume, improved), stats
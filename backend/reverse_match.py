@@ -0,0 +1,239 @@
+# backend/reverse_match.py
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+from documents import document_hash, normalize_text
+
+PREPARED_JD_CACHE_SIZE = int(os.getenv("PREPARED_JD_CACHE_SIZE", "512"))
+# Shared by every match worker on the node; empty keeps prepared JDs in memory only.
+PREPARED_JD_DIR = os.getenv("PREPARED_JD_DIR", "prepared_jds")
+REVERSE_MATCH_RERANK_TOP = int(os.getenv("REVERSE_MATCH_RERANK_TOP", "5"))
+# Bump when preparation changes so stale entries on disk are not reused.
+PREPARATION_VERSION = "1"
+DEFAULT_WEIGHTS = {"skills": 0.35, "semantic": 0.45, "experience": 0.20}
+
+
+@dataclass
+class PreparedText:
+    """Acronym-expanded chunks, their unit-length embeddings and extracted skills."""
+    chunks: List[str]
+    embeddings: np.ndarray
+    skills: List[str]
+    years: int
+
+
+def prepare_text(text: str, max_words: int, overlap: int) -> PreparedText:
+    from matcher import EMBEDDER, expand_acronyms_via_llm, extract_experience_years, extract_skills_dynamic
+    from model_utils import embed_texts
+    from utils import chunk_text, clean_whitespace
+
+    expanded = expand_acronyms_via_llm(clean_whitespace(text))
+    chunks = chunk_text(expanded, max_words=max_words, overlap=overlap) or [expanded]
+    embeddings = embed_texts(chunks, model=EMBEDDER).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-12
+    return PreparedText(chunks, embeddings, extract_skills_dynamic(expanded), extract_experience_years(expanded, use_llm=False))
+
+
+class PreparedJDCache:
+    """
+    LRU of prepared JDs keyed by content hash, backed by .npz files in
+    PREPARED_JD_DIR so workers share preparations and keep them across restarts.
+    """
+
+    def __init__(self, max_entries: int = PREPARED_JD_CACHE_SIZE, directory: str = PREPARED_JD_DIR):
+        self.max_entries = max_entries
+        self.directory = directory
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(jd_text: str) -> str:
+        return document_hash(PREPARATION_VERSION + "\x1f" + normalize_text(jd_text))
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def _load(self, key: str) -> Optional[PreparedText]:
+        if not self.directory or not os.path.exists(self._path(key)):
+            return None
+        try:
+            with np.load(self._path(key)) as data:
+                return PreparedText(data["chunks"].tolist(), data["embeddings"], data["skills"].tolist(),
+                                    int(data["years"]))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"--- ERROR reading prepared JD {key}: {e} ---")
+            return None
+
+    def _save(self, key: str, prepared: PreparedText):
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, chunks=np.array(prepared.chunks), embeddings=prepared.embeddings,
+                     skills=np.array(prepared.skills, dtype=str), years=np.array(prepared.years))
+        os.replace(tmp_path, self._path(key))
+
+    def cached(self, jd_text: str) -> bool:
+        """Whether `jd_text` is already prepared, in memory or on disk, so `get` needs no LLM calls."""
+        key = self.key(jd_text)
+        with self._lock:
+            if key in self._entries:
+                return True
+        return bool(self.directory) and os.path.exists(self._path(key))
+
+    def get(self, jd_text: str) -> PreparedText:
+        key = self.key(jd_text)
+        with self._lock:
+            prepared = self._entries.get(key)
+            if prepared is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return prepared
+        prepared = self._load(key)
+        if prepared is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            prepared = prepare_text(jd_text, max_words=60, overlap=10)
+            self._save(key, prepared)
+        with self._lock:
+            self._entries[key] = prepared
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return prepared
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+prepared_jds = PreparedJDCache()
+
+
+def _experience_match(years: int, required_years: int) -> float:
+    if required_years:
+        return min(years / required_years, 1.0)
+    return 1.0 if years else 0.0
+
+
+def rank_jds(resume: PreparedText, jds: List[PreparedText], weights: Optional[dict] = None,
+             rerank_top: int = REVERSE_MATCH_RERANK_TOP, top_k_chunks: int = 4) -> List[dict]:
+    """
+    Score one prepared resume against many prepared JDs. Every JD chunk is
+    compared with every resume chunk in a single matrix product; the best resume
+    chunk per JD chunk, averaged per JD, gives the bi-encoder semantic score. The
+    top `rerank_top` JDs are then rescored with the cross-encoder, in one batch,
+    using the same pairing as score_resume_vs_jd. Each JD's required years come
+    from its own text. Returns one row per JD, in input order.
+    """
+    weights = weights or DEFAULT_WEIGHTS
+    counts = np.array([len(jd.chunks) for jd in jds])
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    similarity = np.vstack([jd.embeddings for jd in jds]) @ resume.embeddings.T
+    semantic = np.clip(np.add.reduceat(similarity.max(axis=1), starts) / counts, 0.0, 1.0)
+
+    resume_skills = set(resume.skills)
+    rows = []
+    for index, jd in enumerate(jds):
+        matched = sorted(resume_skills & set(jd.skills))
+        overlap = len(matched) / (len(set(jd.skills)) + 1e-6)
+        exp_match = _experience_match(resume.years, jd.years)
+        rows.append({
+            "index": index,
+            "semantic": float(semantic[index]),
+            "skill_overlap": overlap,
+            "experience_match": exp_match,
+            "score": weights["skills"] * overlap + weights["semantic"] * semantic[index] + weights["experience"] * exp_match,
+            "matched_skills": matched,
+            "missing_skills": sorted(set(jd.skills) - resume_skills),
+            "required_years": jd.years,
+            "reranked": False,
+            "top_matches": [],
+        })
+
+    finalists = sorted(range(len(jds)), key=lambda i: rows[i]["score"], reverse=True)[:rerank_top]
+    pairs, owners = [], []
+    for index in finalists:
+        block = similarity[starts[index]:starts[index] + counts[index]]
+        for j_idx, hits in enumerate(np.argsort(-block, axis=1)[:, :top_k_chunks]):
+            for r_idx in hits:
+                pairs.append((jds[index].chunks[j_idx][:512], resume.chunks[r_idx][:512]))
+                owners.append((index, j_idx, int(r_idx)))
+    if pairs:
+        from matcher import CROSS_ENCODER
+        from model_utils import rerank_pairs
+        cross_scores = rerank_pairs(pairs, model=CROSS_ENCODER)
+        best = {}
+        for (index, j_idx, r_idx), score in zip(owners, cross_scores):
+            best.setdefault(index, {})
+            if score > best[index].get(j_idx, (-np.inf,))[0]:
+                best[index][j_idx] = (float(score), r_idx)
+        for index, per_chunk in best.items():
+            row = rows[index]
+            mean_score = float(np.mean([s for s, _ in per_chunk.values()]))
+            row["semantic"] = float(1 / (1 + np.exp(-(mean_score - 2))))
+            row["score"] = (weights["skills"] * row["skill_overlap"] + weights["semantic"] * row["semantic"]
+                            + weights["experience"] * row["experience_match"])
+            row["reranked"] = True
+            row["top_matches"] = [
+                {"jd_snippet": jds[index].chunks[j], "resume_snippet": resume.chunks[r], "score": round(s, 3)}
+                for j, (s, r) in sorted(per_chunk.items(), key=lambda item: item[1][0], reverse=True)[:3]
+            ]
+
+    for row in rows:
+        row["final_score_pct"] = round(float(row.pop("score")) * 100, 2)
+        row["semantic_score_norm"] = round(row.pop("semantic") * 100, 2)
+        row["skill_overlap_pct"] = round(row.pop("skill_overlap") * 100, 2)
+        row["experience_match_pct"] = round(row.pop("experience_match") * 100, 2)
+    return rows
+
+
+def match_resume_to_jds(resume_path: str, jd_texts: List[str], weights: Optional[dict] = None,
+                        rerank_top: int = REVERSE_MATCH_RERANK_TOP) -> dict:
+    """
+    Worker entry point: prepare the resume once, fetch or prepare each JD, and
+    rank. Reranked JDs come first (by cross-encoder score), then the rest by
+    bi-encoder score, so the two scales are never compared directly.
+    """
+    from utils import extract_text_from_path
+
+    hits_before, misses_before = prepared_jds.hits, prepared_jds.misses
+    resume = prepare_text(extract_text_from_path(resume_path), max_words=90, overlap=20)
+    rows = rank_jds(resume, [prepared_jds.get(jd) for jd in jd_texts], weights, rerank_top)
+    rows.sort(key=lambda r: (r["reranked"], r["final_score_pct"]), reverse=True)
+    return {
+        "results": rows,
+        "resume_skills": resume.skills,
+        "years_experience": resume.years,
+        "prepared_jds": {"cached": prepared_jds.hits - hits_before, "prepared": prepared_jds.misses - misses_before},
+    }
+
+
+if __name__ == "__main__":
+    # Cost per additional JD once the resume is prepared: python reverse_match.py [jds]
+    import sys
+    import time
+
+    n_jds, dim = (int(sys.argv[1]) if len(sys.argv) > 1 else 50), 384
+    rng = np.random.default_rng(0)
+
+    def fake(n_chunks):
+        emb = rng.standard_normal((n_chunks, dim)).astype(np.float32)
+        emb /= np.linalg.norm(emb, axis=1, keepdims=True)
+        return PreparedText([f"chunk {i}" for i in range(n_chunks)], emb, [f"s{i}" for i in rng.choice(60, 20)], 3)
+
+    resume = fake(12)
+    jds = [fake(int(rng.integers(4, 12))) for _ in range(n_jds)]
+    for n in (1, n_jds):
+        started = time.perf_counter()
+        for _ in range(20):
+            rank_jds(resume, jds[:n], rerank_top=0)
+        print(f"{n:4d} JDs: {(time.perf_counter() - started) / 20 * 1000:.2f} ms (bi-encoder stage, cached JDs)")
@@ -0,0 +1,223 @@
+# backend/shared_models.py
+import ctypes
+import gc
+import json
+import mmap
+import os
+import struct
+from typing import Callable, Dict
+
+# "default" keeps the weights each library loads in private memory; "mmap" swaps
+# them for tensors mapped from a safetensors file, so every process on the node
+# reads the same page-cache pages instead of holding its own copy.
+MODEL_LOAD_MODE = os.getenv("MODEL_LOAD_MODE", "default")
+MODEL_WEIGHTS_DIR = os.getenv("MODEL_WEIGHTS_DIR", "model_weights")
+MODEL_PRELOAD = os.getenv("MODEL_PRELOAD", "0") == "1"
+
+MODEL_LOAD_REPORT: Dict[str, dict] = {}
+_MAPPINGS = []  # keeps every mmap alive for the life of the process
+_preloaded = False
+
+
+# --- Memory Reporting ---
+def process_memory() -> dict:
+    """
+    RSS of this process split into anonymous (private) and file-backed pages,
+    plus PSS, which divides shared pages between the processes mapping them.
+    """
+    fields = {}
+    try:
+        for path in ("/proc/self/status", "/proc/self/smaps_rollup"):
+            with open(path) as f:
+                for line in f:
+                    key, _, value = line.partition(":")
+                    if key in ("VmRSS", "RssAnon", "RssFile", "Pss"):
+                        fields[key] = int(value.split()[0])  # kB
+    except OSError:
+        import resource
+        return {"max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+    names = {"VmRSS": "rss_mb", "RssAnon": "rss_anon_mb", "RssFile": "rss_file_mb", "Pss": "pss_mb"}
+    return {names[k]: round(v / 1024, 1) for k, v in fields.items()}
+
+
+def _release_freed_memory():
+    """Hand freed heap pages back to the OS so RSS reflects the dropped private copies."""
+    gc.collect()
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+# --- Safetensors Mapping ---
+def weights_path(name: str) -> str:
+    return os.path.join(MODEL_WEIGHTS_DIR, name.replace("/", "--") + ".safetensors")
+
+
+def _torch_module(model):
+    import torch
+    # CrossEncoder wraps a transformers model in older sentence-transformers releases.
+    return model if isinstance(model, torch.nn.Module) else model.model
+
+
+def export_weights(model, name: str) -> str:
+    """Write the model's state dict as safetensors; the rename makes concurrent exports safe."""
+    from safetensors.torch import save_model
+    path = weights_path(name)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    save_model(_torch_module(model), tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def map_safetensors(path: str) -> dict:
+    """
+    Tensors backed directly by a mapping of `path`. safetensors' own loaders copy
+    each tensor out of the file, so the header is parsed here and the data is
+    viewed in place. The mapping is copy-on-write: inference never writes to the
+    weights, so the pages stay shared with the page cache.
+    """
+    import torch
+    dtypes = {
+        "F64": torch.float64, "F32": torch.float32, "F16": torch.float16, "BF16": torch.bfloat16,
+        "I64": torch.int64, "I32": torch.int32, "I16": torch.int16, "I8": torch.int8,
+        "U8": torch.uint8, "BOOL": torch.bool,
+    }
+    with open(path, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    _MAPPINGS.append(mapping)
+    header_size = struct.unpack("<Q", mapping[:8])[0]
+    header = json.loads(mapping[8:8 + header_size])
+    data_start = 8 + header_size
+
+    tensors = {}
+    for key, info in header.items():
+        if key == "__metadata__":
+            continue
+        dtype = dtypes[info["dtype"]]
+        start, end = info["data_offsets"]
+        count = (end - start) // dtype.itemsize
+        if count == 0:
+            tensor = torch.empty(0, dtype=dtype)
+        else:
+            tensor = torch.frombuffer(mapping, dtype=dtype, count=count, offset=data_start + start)
+        tensors[key] = tensor.reshape(info["shape"])
+    return tensors
+
+
+def share_weights(model, name: str):
+    """Replace the model's parameters and buffers with mapped tensors (exporting them on first use)."""
+    module = _torch_module(model)
+    path = weights_path(name)
+    if not os.path.exists(path):
+        export_weights(model, name)
+    tensors = map_safetensors(path)
+    if not set(tensors) <= set(module.state_dict()):
+        # Written by a different library version; rewrite it from the model just loaded.
+        print(f"--- WARNING: {path} does not match {name}, re-exporting ---")
+        export_weights(model, name)
+        tensors = map_safetensors(path)
+    # assign=True (torch>=2.1) adopts the mapped tensors instead of copying into the existing ones.
+    module.load_state_dict(tensors, strict=False, assign=True)
+    return model
+
+
+# --- Loading ---
+def load_shared(name: str, factory: Callable, mappable: bool = True):
+    """
+    Build a model with `factory`, map its weights when MODEL_LOAD_MODE is "mmap",
+    and record this process's memory before and after under MODEL_LOAD_REPORT.
+    """
+    before = process_memory()
+    model = factory()
+    mode = MODEL_LOAD_MODE if mappable else "default"
+    if mode == "mmap":
+        try:
+            model = share_weights(model, name)
+        except Exception as e:
+            mode = "default"
+            print(f"--- ERROR mapping weights for {name}, keeping private copy: {e} ---")
+        _release_freed_memory()
+    MODEL_LOAD_REPORT[name] = {"mode": mode, "before": before, "after": process_memory()}
+    return model
+
+
+def preload_models():
+    """
+    Load every model before the server forks its workers (gunicorn --preload),
+    so workers inherit them copy-on-write. gc.freeze() moves the loaded objects
+    out of the collector's reach; otherwise collections in each worker touch
+    their headers and copy the pages anyway. Matcher pool workers are spawned,
+    not forked, and inherit nothing; see configure_pool_worker.
+    """
+    global _preloaded
+    from model_utils import load_cross_encoder, load_embedder, load_nlp
+    load_nlp()
+    load_embedder()
+    load_cross_encoder()
+    gc.collect()
+    gc.freeze()
+    _preloaded = True
+
+
+def configure_pool_worker():
+    """
+    Call from a spawned pool worker before it loads any model. With MODEL_PRELOAD
+    set, the worker maps its weights (MODEL_LOAD_MODE=mmap) so all pool workers
+    on the node share one page-cache copy instead of each holding its own.
+    """
+    global MODEL_LOAD_MODE
+    if MODEL_PRELOAD:
+        MODEL_LOAD_MODE = "mmap"
+
+
+def _compare_worker(mode: str, barrier, results):
+    import shared_models
+    shared_models.MODEL_LOAD_MODE = mode
+    import model_utils
+    model_utils.load_nlp()
+    model_utils.load_embedder()
+    model_utils.load_cross_encoder()
+    barrier.wait()  # PSS only reflects sharing while every sibling is alive
+    results.put(shared_models.process_memory())
+    barrier.wait()
+
+
+def memory_report() -> dict:
+    return {
+        "pid": os.getpid(),
+        "load_mode": MODEL_LOAD_MODE,
+        "preloaded": _preloaded,
+        "process": process_memory(),
+        "models": MODEL_LOAD_REPORT,
+    }
+
+
+if __name__ == "__main__":
+    # python shared_models.py export             write safetensors for the embedder and cross-encoder
+    # python shared_models.py compare [workers]  total RSS/PSS of N loaded processes, default vs mmap
+    import multiprocessing
+    import sys
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "compare"
+    if command == "export":
+        import model_utils
+        for model_name, loader in (("all-MiniLM-L6-v2", model_utils.load_embedder),
+                                   ("cross-encoder/ms-marco-MiniLM-L-6-v2", model_utils.load_cross_encoder)):
+            print(f"{model_name}: {export_weights(loader(), model_name)}")
+    else:
+        workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+        ctx = multiprocessing.get_context("spawn")
+        for mode in ("default", "mmap"):
+            barrier, results = ctx.Barrier(workers), ctx.Queue()
+            procs = [ctx.Process(target=_compare_worker, args=(mode, barrier, results)) for _ in range(workers)]
+            for p in procs:
+                p.start()
+            stats = [results.get() for _ in procs]
+            for p in procs:
+                p.join()
+            total_rss = sum(s.get("rss_mb", 0) for s in stats)
+            total_pss = sum(s.get("pss_mb", 0) for s in stats)
+            print(f"{mode:8s} {workers} workers: total RSS {total_rss:.0f} MB, total PSS {total_pss:.0f} MB, "
+                  f"per worker {stats[0]}")
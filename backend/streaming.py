@@ -0,0 +1,169 @@
+# backend/streaming.py
+import asyncio
+import json
+import os
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_DISCONNECT_POLL_SECONDS = float(os.getenv("SSE_DISCONNECT_POLL_SECONDS", "1"))
+SSE_HEARTBEAT = ": heartbeat\n\n"
+
+
+def sse_event(data: Any, event: Optional[str] = None) -> str:
+    """Format a payload as a single Server-Sent Events frame."""
+    if not isinstance(data, str):
+        data = json.dumps(data)
+    lines = []
+    if event:
+        lines.append(f"event: {event}")
+    for line in data.splitlines() or [""]:
+        lines.append(f"data: {line}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def relay_until_disconnect(source: AsyncIterator[str], is_disconnected: Callable[[], Awaitable[bool]],
+                                 heartbeat_seconds: float = SSE_HEARTBEAT_SECONDS,
+                                 poll_seconds: float = SSE_DISCONNECT_POLL_SECONDS) -> AsyncIterator[str]:
+    """
+    Relay SSE frames from `source`, sending a heartbeat comment whenever it has
+    been idle for `heartbeat_seconds`. `source` runs in its own task, so when the
+    client disconnects (checked after every frame and every `poll_seconds`) the
+    task is cancelled and whatever upstream call it is awaiting goes with it.
+    Exceptions raised by `source` are re-raised here.
+    """
+    queue = asyncio.Queue()
+    finished = object()
+
+    async def pump():
+        try:
+            async for frame in source:
+                await queue.put(frame)
+        finally:
+            await queue.put(finished)
+
+    loop = asyncio.get_running_loop()
+    task = asyncio.create_task(pump())
+    last_sent = loop.time()
+    try:
+        while True:
+            try:
+                frame = await asyncio.wait_for(queue.get(), timeout=poll_seconds)
+            except asyncio.TimeoutError:
+                if await is_disconnected():
+                    return
+                if loop.time() - last_sent >= heartbeat_seconds:
+                    last_sent = loop.time()
+                    yield SSE_HEARTBEAT
+                continue
+            if frame is finished:
+                await task
+                return
+            last_sent = loop.time()
+            yield frame
+            if await is_disconnected():
+                return
+    finally:
+        if not task.done():
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+
+class IncrementalJSONParser:
+    """
+    Scans a JSON object as it streams in and reports each top-level field
+    as soon as its value is complete. Anything before the first '{' (such as
+    a markdown fence) is ignored.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._pos = 0
+        self._started = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._expecting = "key"
+        self._key_start = None
+        self._key = None
+        self._value_start = None
+        self._value_done = False
+
+    @property
+    def finished(self) -> bool:
+        return self._finished
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Append a chunk of model output and return the fields completed by it."""
+        self.text += chunk
+        completed = []
+        text = self.text
+        while self._pos < len(text) and not self._finished:
+            ch = text[self._pos]
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._depth = 1
+                self._pos += 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._close_top_level_string(completed)
+                self._pos += 1
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expecting == "key":
+                    self._key_start = self._pos
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._expecting == "value":
+                    self._emit(text[self._value_start:self._pos + 1], completed)
+                elif self._depth == 0:
+                    if self._expecting == "value" and not self._value_done:
+                        self._emit(text[self._value_start:self._pos], completed)
+                    self._finished = True
+            elif self._depth == 1:
+                if ch == ":" and self._expecting == "colon":
+                    self._expecting = "value"
+                    self._value_start = self._pos + 1
+                    self._value_done = False
+                elif ch == ",":
+                    if self._expecting == "value" and not self._value_done:
+                        self._emit(text[self._value_start:self._pos], completed)
+                    self._expecting = "key"
+            self._pos += 1
+        return completed
+
+    def _close_top_level_string(self, completed):
+        if self._expecting == "key":
+            try:
+                self._key = json.loads(self.text[self._key_start:self._pos + 1])
+            except json.JSONDecodeError:
+                self._key = None
+            self._expecting = "colon"
+        elif self._expecting == "value":
+            self._emit(self.text[self._value_start:self._pos + 1], completed)
+
+    def _emit(self, raw_value: str, completed):
+        self._value_done = True
+        if self._key is None:
+            return
+        try:
+            completed.append((self._key, json.loads(raw_value.strip())))
+        except json.JSONDecodeError:
+            # Malformed field; the final validation of the full object reports it.
+            pass
@@ -0,0 +1,226 @@
+# backend/structured_output.py
+import json
+import re
+from collections import defaultdict
+from typing import Any, Dict, Optional
+
+from pydantic import TypeAdapter, ValidationError
+
+from llm_usage import usage_recorder
+
+_FENCED_BLOCK = re.compile(r"```(?:json|JSON)?\s*(.*?)```", re.DOTALL)
+_GEMINI_SCHEMA_KEYS = ("description", "enum", "format")
+
+# Per-endpoint counters: calls, responses that needed recovery or a repair
+# retry, and generations that could not be used at all.
+PARSE_METRICS: Dict[str, Dict[str, int]] = defaultdict(
+    lambda: {"calls": 0, "parsed": 0, "recovered": 0, "repaired": 0, "failed": 0}
+)
+
+
+class StructuredOutputError(Exception):
+    """Raised when the model output cannot be turned into the expected schema."""
+
+    def __init__(self, message: str, raw_text: str = ""):
+        super().__init__(message)
+        self.raw_text = raw_text
+
+
+# --- Schema Conversion ---
+class _UnsupportedSchema(Exception):
+    pass
+
+
+def _resolve(node: Dict[str, Any], defs: Dict[str, Any]) -> Dict[str, Any]:
+    if "$ref" in node:
+        return defs[node["$ref"].split("/")[-1]]
+    return node
+
+
+def _to_gemini_schema(node: Dict[str, Any], defs: Dict[str, Any]) -> Dict[str, Any]:
+    node = _resolve(node, defs)
+    if "anyOf" in node:
+        variants = [v for v in node["anyOf"] if v.get("type") != "null"]
+        if len(variants) != 1:
+            raise _UnsupportedSchema("union types")
+        converted = _to_gemini_schema(variants[0], defs)
+        converted["nullable"] = True
+        return converted
+
+    node_type = node.get("type")
+    if node_type is None:
+        raise _UnsupportedSchema("untyped value")
+
+    schema = {"type": node_type.upper()}
+    for key in _GEMINI_SCHEMA_KEYS:
+        if key in node:
+            schema[key] = node[key]
+    if node_type == "object":
+        properties = node.get("properties")
+        if not properties:
+            # Free-form dicts (e.g. Dict[str, int]) have no Gemini equivalent.
+            raise _UnsupportedSchema("object without properties")
+        schema["properties"] = {name: _to_gemini_schema(prop, defs) for name, prop in properties.items()}
+        if node.get("required"):
+            schema["required"] = list(node["required"])
+    elif node_type == "array":
+        schema["items"] = _to_gemini_schema(node.get("items", {}), defs)
+    return schema
+
+
+def gemini_response_schema(schema_type) -> Optional[Dict[str, Any]]:
+    """
+    Convert a Pydantic model (or List[Model]) into a Gemini response schema.
+    Returns None if the model uses constructs Gemini schemas cannot express.
+    """
+    json_schema = TypeAdapter(schema_type).json_schema()
+    defs = json_schema.get("$defs", {})
+    try:
+        return _to_gemini_schema(json_schema, defs)
+    except _UnsupportedSchema:
+        return None
+
+
+def json_generation_config(schema_type) -> Dict[str, Any]:
+    config = {"response_mime_type": "application/json"}
+    response_schema = gemini_response_schema(schema_type)
+    if response_schema is not None:
+        config["response_schema"] = response_schema
+    return config
+
+
+# --- Tolerant Parsing ---
+def recover_partial_json(text: str) -> Any:
+    """
+    Extract the first JSON value from text, ignoring any surrounding prose and
+    closing brackets/strings left open by a truncated generation.
+    """
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        raise ValueError("No JSON object or array found in model output.")
+    start = min(starts)
+
+    stack = []
+    in_string = False
+    escape = False
+    cut_points = []
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                return json.loads(text[start:i + 1])
+            cut_points.append((i + 1, "".join(reversed(stack))))
+        elif ch == ",":
+            cut_points.append((i, "".join(reversed(stack))))
+
+    candidates = [text[start:].rstrip() + ('"' if in_string else "") + "".join(reversed(stack))]
+    candidates += [text[start:end] + closers for end, closers in reversed(cut_points[-50:])]
+    for candidate in candidates:
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+    raise ValueError("Could not recover JSON from truncated model output.")
+
+
+def parse_json_text(text: str):
+    """
+    Parse model output as JSON. Returns (value, recovered) where `recovered`
+    is True if fences, prose or truncation had to be worked around.
+    """
+    stripped = text.strip()
+    try:
+        return json.loads(stripped), False
+    except json.JSONDecodeError:
+        pass
+    for block in _FENCED_BLOCK.findall(stripped):
+        try:
+            return json.loads(block.strip()), True
+        except json.JSONDecodeError:
+            continue
+    return recover_partial_json(stripped), True
+
+
+# --- Generation ---
+def _repair_prompt(schema_type, raw_text: str, error: Exception) -> str:
+    return f"""
+    The following output was supposed to be a JSON value matching the JSON schema below, but it could not be used.
+    Error: {error}
+
+    JSON Schema:
+    {json.dumps(TypeAdapter(schema_type).json_schema())}
+
+    Output to fix:
+    {raw_text}
+
+    Return ONLY the corrected JSON, with no explanations or markdown formatting.
+    """
+
+
+def _parse_and_validate(adapter: TypeAdapter, text: str):
+    value, recovered = parse_json_text(text)
+    return adapter.validate_python(value), recovered
+
+
+async def generate_structured(model, prompt: str, schema_type, endpoint: str, user_id: Optional[str] = None):
+    """
+    Generate JSON constrained to `schema_type` and return it validated.
+    A response that still fails to parse or validate gets one repair retry
+    before StructuredOutputError is raised.
+    """
+    metrics = PARSE_METRICS[endpoint]
+    metrics["calls"] += 1
+    adapter = TypeAdapter(schema_type)
+    generation_config = json_generation_config(schema_type)
+
+    with usage_recorder.call(endpoint, user_id, model) as call:
+        response = await model.generate_content_async(prompt, generation_config=generation_config)
+        call.set_usage(response)
+        try:
+            result, recovered = _parse_and_validate(adapter, response.text)
+            metrics["recovered" if recovered else "parsed"] += 1
+            return result
+        except (ValueError, ValidationError) as e:
+            call.outcome = "invalid_output"
+            first_error = e
+            raw_text = response.text
+            print(f"--- WARNING: unusable structured output from {endpoint}, attempting repair: {e} ---")
+
+    with usage_recorder.call(endpoint, user_id, model) as call:
+        repair = await model.generate_content_async(
+            _repair_prompt(schema_type, raw_text, first_error), generation_config=generation_config
+        )
+        call.set_usage(repair)
+        try:
+            result, _ = _parse_and_validate(adapter, repair.text)
+            metrics["repaired"] += 1
+            return result
+        except (ValueError, ValidationError) as e:
+            call.outcome = "invalid_output"
+            metrics["failed"] += 1
+            raise StructuredOutputError(f"Model output did not match the expected schema: {e}", raw_text=repair.text)
+
+
+def get_parse_metrics() -> Dict[str, Dict[str, Any]]:
+    report = {}
+    for endpoint, counts in PARSE_METRICS.items():
+        calls = counts["calls"] or 1
+        report[endpoint] = {
+            **counts,
+            "first_pass_failure_rate": round((counts["repaired"] + counts["failed"]) / calls, 4),
+            "failure_rate": round(counts["failed"] / calls, 4),
+        }
+    return report
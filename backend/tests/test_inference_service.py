@@ -0,0 +1,54 @@
+# backend/tests/test_inference_service.py
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inference_service import InferenceService
+
+
+def make_service(max_batch=10):
+    service = InferenceService(max_batch=max_batch, max_wait_ms=1)
+    sizes = []
+
+    def embed(texts):
+        sizes.append(len(texts))
+        return np.array([[float(text)] for text in texts])
+
+    def rerank(pairs):
+        sizes.append(len(pairs))
+        return [a + b for a, b in pairs]
+
+    service.register("embed", embed)
+    service.register("rerank", rerank)
+    return service, sizes
+
+
+def test_oversized_request_runs_in_bounded_batches():
+    service, sizes = make_service(max_batch=10)
+    result = service.submit("embed", [str(i) for i in range(35)]).result(timeout=5)
+    assert len(sizes) >= 4
+    assert max(sizes) <= 10
+    assert sum(sizes) == 35
+    assert isinstance(result, np.ndarray)
+    assert result[:, 0].tolist() == [float(i) for i in range(35)]
+
+
+def test_oversized_list_results_keep_order():
+    service, sizes = make_service(max_batch=4)
+    result = service.submit("rerank", [(i, i) for i in range(9)]).result(timeout=5)
+    assert max(sizes) <= 4
+    assert result == [2 * i for i in range(9)]
+
+
+def test_failure_in_one_slice_fails_the_request():
+    service, _ = make_service(max_batch=3)
+    future = service.submit("embed", ["1", "2", "3", "not a number"])
+    try:
+        future.result(timeout=5)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("expected the failing slice to fail the whole request")
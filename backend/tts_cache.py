@@ -0,0 +1,150 @@
+# backend/tts_cache.py
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterator, Optional
+
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "temp_audio")
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+TTS_CACHE_TTL_SECONDS = int(os.getenv("TTS_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+TTS_SWEEP_INTERVAL_SECONDS = int(os.getenv("TTS_SWEEP_INTERVAL_SECONDS", "300"))
+MAX_PENDING_SYNTHESES = 1024
+PARTIAL_SUFFIX = ".partial"
+
+
+# --- TTS Engines ---
+class GTTSEngine:
+    """Google Translate TTS via gTTS; yields MP3 bytes sentence by sentence."""
+
+    def stream(self, text: str, lang: str, tld: str) -> Iterator[bytes]:
+        from gtts import gTTS
+        yield from gTTS(text=text, lang=lang, tld=tld, slow=False).stream()
+
+
+class OfflineEngine:
+    """Deterministic, network-free stand-in for tests and load runs (not real audio)."""
+
+    def stream(self, text: str, lang: str, tld: str) -> Iterator[bytes]:
+        for word in text.split():
+            yield hashlib.sha256(f"{lang}:{tld}:{word}".encode("utf-8")).digest()
+
+
+TTS_ENGINES = {
+    "gtts": GTTSEngine,
+    "offline": OfflineEngine,
+}
+
+
+def get_tts_engine(name: Optional[str] = None):
+    name = name or os.getenv("TTS_ENGINE", "gtts")
+    if name not in TTS_ENGINES:
+        raise ValueError(f"Unknown TTS engine '{name}'. Available: {', '.join(TTS_ENGINES)}")
+    return TTS_ENGINES[name]()
+
+
+# --- Content-Addressed Cache ---
+def audio_key(text: str, lang: str, tld: str) -> str:
+    return hashlib.sha256(f"{lang}\x00{tld}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """
+    MP3 files in `directory` named by the hash of (text, lang, tld). Misses are
+    synthesized on demand and written to the cache while streaming to the client.
+    """
+
+    def __init__(self, directory=TTS_CACHE_DIR, engine=None,
+                 max_bytes=TTS_CACHE_MAX_BYTES, ttl_seconds=TTS_CACHE_TTL_SECONDS):
+        self.directory = directory
+        self.engine = engine or get_tts_engine()
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._pending = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def lookup(self, key: str) -> Optional[str]:
+        path = self.path_for(key)
+        try:
+            # Touch on hit so the size sweep evicts least-recently-used audio first.
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def register_pending(self, key: str, text: str, lang: str, tld: str):
+        with self._lock:
+            self._pending[key] = (text, lang, tld)
+            self._pending.move_to_end(key)
+            while len(self._pending) > MAX_PENDING_SYNTHESES:
+                self._pending.popitem(last=False)
+
+    def get_pending(self, key: str):
+        with self._lock:
+            return self._pending.get(key)
+
+    def stream_and_store(self, key: str, text: str, lang: str, tld: str) -> Iterator[bytes]:
+        """Yield audio from the engine while writing it to the cache; commit on completion."""
+        final_path = self.path_for(key)
+        partial_path = f"{final_path}.{os.getpid()}.{threading.get_ident()}{PARTIAL_SUFFIX}"
+        completed = False
+        try:
+            with open(partial_path, "wb") as f:
+                for chunk in self.engine.stream(text, lang, tld):
+                    f.write(chunk)
+                    yield chunk
+            os.replace(partial_path, final_path)
+            completed = True
+            with self._lock:
+                self._pending.pop(key, None)
+        finally:
+            if not completed and os.path.exists(partial_path):
+                os.remove(partial_path)
+
+    def sweep(self) -> dict:
+        """Delete expired files, then least-recently-used ones until under the size cap."""
+        now = time.time()
+        removed = 0
+        files = []
+        for entry in os.scandir(self.directory):
+            if not entry.is_file():
+                continue
+            stat = entry.stat()
+            if entry.name.endswith(PARTIAL_SUFFIX):
+                # Abandoned partial writes; live ones are touched on every chunk.
+                if now - stat.st_mtime > 3600:
+                    os.remove(entry.path)
+                    removed += 1
+                continue
+            if now - stat.st_mtime > self.ttl_seconds:
+                os.remove(entry.path)
+                removed += 1
+            else:
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return {"removed": removed, "bytes": total}
+
+
+async def run_sweeper(cache: AudioCache, interval: int = TTS_SWEEP_INTERVAL_SECONDS):
+    while True:
+        try:
+            await asyncio.to_thread(cache.sweep)
+        except Exception as e:
+            print(f"--- ERROR sweeping TTS cache: {e} ---")
+        await asyncio.sleep(interval)
@@ -31,7 +31,7 @@ const getClerkAuthHeaders = async (getToken: GetTokenFn) => {
 
 const createAuthenticatedRequest = async (
   getToken: GetTokenFn,
-  method: "POST" | "GET" | "DELETE" | "PUT",
+  method: "POST" | "GET" | "DELETE" | "PUT" | "PATCH",
   body?: any
 ): Promise<RequestInit> => {
   const headers = await getClerkAuthHeaders(getToken);
@@ -50,6 +50,38 @@ const createAuthenticatedRequest = async (
   return config;
 };
 
+/**
+ * Reads a Server-Sent Events response, calling `onEvent` with each event name
+ * and its JSON payload. Heartbeat comments are skipped.
+ */
+const readServerSentEvents = async (
+  response: Response,
+  onEvent: (event: string, payload: any) => void
+) => {
+  const reader = response.body?.getReader();
+  if (!reader) throw new Error("Failed to read response stream.");
+
+  const decoder = new TextDecoder();
+  let buffer = "";
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const frames = buffer.split("\n\n");
+    buffer = frames.pop() ?? "";
+    for (const frame of frames) {
+      let event = "message";
+      const dataLines: string[] = [];
+      for (const line of frame.split("\n")) {
+        if (line.startsWith("event:")) event = line.slice(6).trim();
+        else if (line.startsWith("data:")) dataLines.push(line.slice(5));
+      }
+      if (dataLines.length === 0) continue;
+      onEvent(event, JSON.parse(dataLines.join("\n")));
+    }
+  }
+};
+
 // =========================================================================
 // --- API MODULES ---
 // =========================================================================
@@ -95,15 +127,11 @@ export const resumeAPI = {
       throw new Error(`Failed to generate cover letter: ${errorText}`);
     }
 
-    const reader = response.body?.getReader();
-    if (!reader) throw new Error("Failed to read response stream.");
-
-    const decoder = new TextDecoder();
-    while (true) {
-      const { done, value } = await reader.read();
-      if (done) break;
-      onChunk(decoder.decode(value, { stream: true }));
-    }
+    // `data: {"text": ...}` frames, then a final `done` or `error` event.
+    await readServerSentEvents(response, (event, payload) => {
+      if (event === "error") throw new Error(payload.message);
+      if (event === "message") onChunk(payload.text);
+    });
   },
 
   async generateOptimizedResume(
@@ -195,6 +223,47 @@ export const resumeAPI = {
 };
 
 
+/** The resume was saved elsewhere since `etag` was loaded; reload before saving again. */
+export class ResumeConflictError extends Error {
+  constructor(public currentEtag: string) {
+    super("The resume was changed elsewhere. Reload it and apply your edits again.");
+    this.name = "ResumeConflictError";
+  }
+}
+
+const escapePointer = (key: string) => key.replace(/~/g, "~0").replace(/\//g, "~1");
+
+/**
+ * RFC 6902 operations turning `previous` into `current`, descending into
+ * objects and arrays so one edited field is one small `replace`.
+ */
+export const createJsonPatch = (previous: any, current: any, path = ""): any[] => {
+  if (JSON.stringify(previous) === JSON.stringify(current)) return [];
+  const isObject = (value: any) => value !== null && typeof value === "object" && !Array.isArray(value);
+
+  if (isObject(previous) && isObject(current)) {
+    const operations: any[] = Object.keys(previous)
+      .filter((key) => !(key in current))
+      .sort()
+      .map((key) => ({ op: "remove", path: `${path}/${escapePointer(key)}` }));
+    for (const [key, value] of Object.entries(current)) {
+      const child = `${path}/${escapePointer(key)}`;
+      if (key in previous) operations.push(...createJsonPatch(previous[key], value, child));
+      else operations.push({ op: "add", path: child, value });
+    }
+    return operations;
+  }
+  if (Array.isArray(previous) && Array.isArray(current)) {
+    const common = Math.min(previous.length, current.length);
+    const operations: any[] = [];
+    for (let i = 0; i < common; i++) operations.push(...createJsonPatch(previous[i], current[i], `${path}/${i}`));
+    for (let i = previous.length - 1; i >= common; i--) operations.push({ op: "remove", path: `${path}/${i}` });
+    for (const value of current.slice(common)) operations.push({ op: "add", path: `${path}/-`, value });
+    return operations;
+  }
+  return [{ op: "replace", path, value: current }];
+};
+
 /**
  * ## Resume Builder API
  */
@@ -218,6 +287,79 @@ export const resumeBuilderAPI = {
     return response.json();
   },
 
+  async rewriteDescriptions(
+    getToken: GetTokenFn,
+    items: { title: string; description: string }[],
+    onItem: (index: number, rewrittenDescription: string) => void,
+    onItemError?: (index: number, message: string) => void
+  ) {
+    const config = await createAuthenticatedRequest(getToken, "POST", { items });
+    const response = await fetch(
+      `${API_BASE_URL}/resume-builder/rewrite-descriptions/`,
+      config
+    );
+
+    if (!response.ok) {
+      const errorText = await response.text();
+      throw new Error(`Failed to rewrite descriptions: ${errorText}`);
+    }
+
+    // One `item` or `item_error` event per input index, in completion order.
+    await readServerSentEvents(response, (event, payload) => {
+      if (event === "item") onItem(payload.index, payload.rewritten_description);
+      if (event === "item_error") onItemError?.(payload.index, payload.message);
+    });
+  },
+
+  /**
+   * Loads the saved resume. Pass the last ETag to get `{ notModified: true }`
+   * (a 304 with no body) when nothing changed since.
+   */
+  async loadResume(
+    getToken: GetTokenFn,
+    etag?: string
+  ): Promise<{ data?: any; etag: string; notModified: boolean }> {
+    const config = await createAuthenticatedRequest(getToken, "GET");
+    if (etag) config.headers = { ...config.headers, "If-None-Match": etag };
+    const response = await fetch(`${API_BASE_URL}/resume-builder/load`, config);
+
+    if (response.status === 304) {
+      return { etag: response.headers.get("ETag") ?? etag ?? "", notModified: true };
+    }
+    if (!response.ok) throw new Error("Failed to load resume.");
+    return { data: await response.json(), etag: response.headers.get("ETag") ?? "", notModified: false };
+  },
+
+  /** Saves the whole document; with an ETag, fails with a ResumeConflictError if it changed elsewhere. */
+  async saveResume(getToken: GetTokenFn, resumeData: any, etag?: string): Promise<string> {
+    const config = await createAuthenticatedRequest(getToken, "POST", resumeData);
+    if (etag) config.headers = { ...config.headers, "If-Match": etag };
+    const response = await fetch(`${API_BASE_URL}/resume-builder/save`, config);
+
+    if (response.status === 412) throw new ResumeConflictError(response.headers.get("ETag") ?? "");
+    if (!response.ok) throw new Error("Failed to save resume.");
+    return response.headers.get("ETag") ?? "";
+  },
+
+  /**
+   * Autosave: sends only the JSON Patch from `previous` to `current` and
+   * returns the new ETag. Nothing is sent when they are equal.
+   */
+  async patchResume(getToken: GetTokenFn, previous: any, current: any, etag: string): Promise<string> {
+    const operations = createJsonPatch(previous, current);
+    if (operations.length === 0) return etag;
+    const config = await createAuthenticatedRequest(getToken, "PATCH", operations);
+    config.headers = { ...config.headers, "Content-Type": "application/json-patch+json", "If-Match": etag };
+    const response = await fetch(`${API_BASE_URL}/resume-builder/document`, config);
+
+    if (response.status === 412) throw new ResumeConflictError(response.headers.get("ETag") ?? "");
+    if (!response.ok) {
+      const errorText = await response.text();
+      throw new Error(`Failed to save resume changes: ${errorText}`);
+    }
+    return response.headers.get("ETag") ?? "";
+  },
+
   async improveResume(getToken: GetTokenFn, resumeData: any): Promise<any> {
     const config = await createAuthenticatedRequest(
       getToken,
@@ -435,4 +577,23 @@ export const jobAPI = {
     const response = await fetch(`${API_BASE_URL}/jobs/${jobId}`, config);
     if (!response.ok) throw new Error("Failed to delete job.");
   },
+
+  /** Ranks job descriptions by how well one resume fits each of them, best first. */
+  async matchResumeToJobs(
+    getToken: GetTokenFn,
+    resumeFile: File,
+    jobs: { id?: string; title?: string; description: string }[]
+  ) {
+    const formData = new FormData();
+    formData.append("jobs", JSON.stringify(jobs));
+    formData.append("file", resumeFile);
+
+    const config = await createAuthenticatedRequest(getToken, "POST", formData);
+    const response = await fetch(`${API_BASE_URL}/match/reverse`, config);
+    if (!response.ok) {
+      const errorText = await response.text();
+      throw new Error(`Failed to match resume to jobs: ${errorText}`);
+    }
+    return response.json();
+  },
 };
\ No newline at end of file